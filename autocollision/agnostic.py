@@ -1,3 +1,4 @@
+import timeit
 from PySide2 import QtWidgets, QtCore
 
 
@@ -16,6 +17,124 @@ class DoubleButton(QtWidgets.QHBoxLayout):
         self.addWidget(right_button)
 
 
+class NodeListModel(QtCore.QAbstractListModel):
+    """
+    List model over a plain list of nodes, so that thousands of nodes can be assigned and read back at once.
+    Nodes are kept as given, such as UUIDs, and shown by their display names.
+    Shows the given empty text as its only row when there are no nodes.
+    """
+    def __init__(self, empty_text, parent=None):
+        super(NodeListModel, self).__init__(parent)
+        self.empty_text = empty_text
+        self.nodes = []
+        self.names = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+
+        return len(self.nodes) or 1
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+
+        return self.names[index.row()] if self.nodes else self.empty_text
+
+    def setNodes(self, nodes, names=None):
+        """
+        Replaces all the nodes in the model in one reset instead of one insert per node.
+
+        Args:
+            nodes (list): Names or UUIDs of the nodes.
+
+            names (list): OPTIONAL. Name shown for each node, the nodes themselves if None.
+        """
+        self.beginResetModel()
+        self.nodes = list(nodes)
+        self.names = list(names) if names is not None else list(nodes)
+        self.endResetModel()
+
+    def addNodes(self, nodes, names=None):
+        """
+        Adds the given nodes to the end of the model in one insert, skipping nodes already in it.
+
+        Args:
+            nodes (list): Names or UUIDs of the nodes to add.
+
+            names (list): OPTIONAL. Name shown for each node, the nodes themselves if None.
+        """
+        existing = set(self.nodes)
+        added = []
+        added_names = []
+        for node, name in zip(nodes, names if names is not None else nodes):
+            if node not in existing:
+                existing.add(node)
+                added.append(node)
+                added_names.append(name)
+
+        if not added:
+            return
+
+        if not self.nodes:
+            self.setNodes(added, added_names)
+            return
+
+        self.beginInsertRows(QtCore.QModelIndex(), len(self.nodes), len(self.nodes) + len(added) - 1)
+        self.nodes += added
+        self.names += added_names
+        self.endInsertRows()
+
+    def clear(self):
+        """
+        Removes all the nodes.
+        """
+        self.setNodes([])
+
+
+class NodeListView(QtWidgets.QWidget):
+    """
+    Filter line edit above a list view of a NodeListModel. The view uses uniform item sizes so it only lays out the
+    rows on screen, and filtering goes through a proxy so the model's list of nodes is never copied.
+    """
+    def __init__(self, empty_text, parent=None):
+        super(NodeListView, self).__init__(parent)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.model = NodeListModel(empty_text, self)
+        self.proxy = QtCore.QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+
+        self.filter = QtWidgets.QLineEdit()
+        self.filter.setPlaceholderText('Filter')
+        self.filter.setClearButtonEnabled(True)
+        self.filter.textChanged.connect(self.proxy.setFilterFixedString)
+        layout.addWidget(self.filter)
+
+        self.view = QtWidgets.QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+        self.view.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        layout.addWidget(self.view)
+
+    def nodes(self):
+        """
+        Gets the nodes in the list, ignoring the filter.
+
+        Returns:
+            (list): Names or UUIDs of the nodes, empty if none are assigned.
+        """
+        return self.model.nodes
+
+    def setStyleSheet(self, stylesheet):
+        self.view.setStyleSheet(stylesheet)
+
+    def styleSheet(self):
+        return self.view.styleSheet()
+
+
 class GUI(QtWidgets.QDialog):
     """
     GUI for user to input variables for auto collision
@@ -34,8 +153,21 @@ class GUI(QtWidgets.QDialog):
         self.geometry_list = None
         self.geometry_parent = None
         self.is_geometry_driven_checkbox = None
+        self.direction_mode = None
+        self.reach = None
+        self.activation_distance = None
+        self.proxy_tolerance = None
+        self.lean_checkbox = None
         self.line_edit_stylesheet = None
         self.list_stylesheet = None
+        self.create_collisions_button = None
+        self.progress_bar = None
+        self.progress_label = None
+        self.cancel_button = None
+        self.build_timer = None
+        self.build_steps = None
+        self.build_start = None
+        self.chunk_seconds = 0.05
         self.build()
 
     def build(self):
@@ -71,10 +203,8 @@ class GUI(QtWidgets.QDialog):
         controls_layout.addWidget(controls_label)
 
         # controls list
-        self.controls_list = QtWidgets.QListWidget()
-        self.controls_list.addItem(self.empty_controls_text)
+        self.controls_list = NodeListView(self.empty_controls_text)
         self.list_stylesheet = self.controls_list.styleSheet()
-        self.controls_list.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
         controls_layout.addWidget(self.controls_list)
 
         # assign controls button
@@ -109,9 +239,7 @@ class GUI(QtWidgets.QDialog):
         geometry_layout.addWidget(geometry_label)
 
         # geometry list
-        self.geometry_list = QtWidgets.QListWidget()
-        self.geometry_list.addItem(self.empty_geometry_text)
-        self.geometry_list.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.geometry_list = NodeListView(self.empty_geometry_text)
         geometry_layout.addWidget(self.geometry_list)
 
         # geometry button
@@ -148,10 +276,50 @@ class GUI(QtWidgets.QDialog):
         source_text_layout.addWidget(source_button)
         source_layout.addLayout(source_text_layout)
 
+        # build options, the optional distances are left empty to turn them off
+        options_layout = QtWidgets.QFormLayout()
+        self.direction_mode = QtWidgets.QComboBox()
+        self.direction_mode.addItems(['source', 'surface'])
+        self.direction_mode.setToolTip('Push controls away from the collision source or along the surface normal')
+        options_layout.addRow('Direction', self.direction_mode)
+
+        self.reach = self.numberLineEdit('(OPTIONAL) Only connect controls this close to the bounds of a geometry')
+        options_layout.addRow('Reach', self.reach)
+
+        self.activation_distance = self.numberLineEdit('(OPTIONAL) Bypass collisions further than this from the '
+                                                       'geometry, needs an offset and blend attribute')
+        options_layout.addRow('Activation Distance', self.activation_distance)
+
+        self.proxy_tolerance = self.numberLineEdit('(OPTIONAL) Collide with low poly proxies of the geometry, '
+                                                   'needs numpy')
+        options_layout.addRow('Proxy Tolerance', self.proxy_tolerance)
+
+        self.lean_checkbox = QtWidgets.QCheckBox('Lean')
+        self.lean_checkbox.setToolTip('Build every control with as few nodes as possible')
+        options_layout.addRow(self.lean_checkbox)
+        source_layout.addLayout(options_layout)
+
         # create collisions button
-        create_collisions_button = QtWidgets.QPushButton('Create Collisions')
-        create_collisions_button.clicked.connect(self.createCollisions)
-        source_layout.addWidget(create_collisions_button)
+        self.create_collisions_button = QtWidgets.QPushButton('Create Collisions')
+        self.create_collisions_button.clicked.connect(self.createCollisions)
+        source_layout.addWidget(self.create_collisions_button)
+
+        # build progress, only shown while building
+        progress_layout = QtWidgets.QHBoxLayout()
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setVisible(False)
+        progress_layout.addWidget(self.progress_bar)
+        self.progress_label = QtWidgets.QLabel()
+        progress_layout.addWidget(self.progress_label)
+        self.cancel_button = QtWidgets.QPushButton('Cancel')
+        self.cancel_button.clicked.connect(self.cancelBuild)
+        self.cancel_button.setVisible(False)
+        progress_layout.addWidget(self.cancel_button)
+        source_layout.addLayout(progress_layout)
+
+        # builds a chunk of controls whenever the event loop is idle
+        self.build_timer = QtCore.QTimer(self)
+        self.build_timer.timeout.connect(self.buildChunk)
 
         # controls splitter
         controls_splitter = QtWidgets.QSplitter(QtCore.Qt.Vertical)
@@ -192,14 +360,19 @@ class GUI(QtWidgets.QDialog):
         self.module_name.setText('')
         self.resetNameStylesheet()
         self.resetControls(force=True)
-        self.parent_control.setText('')
+        self.setNode(self.parent_control, '')
         self.parent_control.setStyleSheet(self.line_edit_stylesheet)
         self.create_offset_checkbox.setChecked(True)
         self.create_blend_checkbox.setChecked(True)
         self.resetGeometry(force=True)
-        self.geometry_parent.setText('')
+        self.setNode(self.geometry_parent, '')
         self.is_geometry_driven_checkbox.setChecked(True)
-        self.collision_source.setText('')
+        self.setNode(self.collision_source, '')
+        self.direction_mode.setCurrentIndex(0)
+        self.reach.setText('')
+        self.activation_distance.setText('')
+        self.proxy_tolerance.setText('')
+        self.lean_checkbox.setChecked(False)
 
     def resetNameStylesheet(self):
         """
@@ -222,22 +395,79 @@ class GUI(QtWidgets.QDialog):
         return False
 
     @staticmethod
-    def getItems(widget, text=False):
+    def getItems(widget):
+        """
+        Convenience method for getting the nodes of a NodeListView without copying them.
+
+        Args:
+            widget (NodeListView): List to get nodes from.
+
+        Returns:
+            (list): Names or UUIDs of the nodes in given widget, empty if none are assigned.
+        """
+        return widget.nodes()
+
+    @staticmethod
+    def numberLineEdit(placeholder):
+        """
+        Convenience method for making a line edit that only takes positive numbers.
+
+        Args:
+            placeholder (string): Text shown while the line edit is empty.
+
+        Returns:
+            (QtWidgets.QLineEdit): Line edit made.
+        """
+        line_edit = QtWidgets.QLineEdit()
+        validator = QtWidgets.QDoubleValidator(0.0, 1e9, 6, line_edit)
+        validator.setLocale(QtCore.QLocale.c())
+        line_edit.setValidator(validator)
+        line_edit.setPlaceholderText(placeholder)
+        return line_edit
+
+    @staticmethod
+    def getNumber(widget):
+        """
+        Convenience method for getting the number typed in a line edit made with numberLineEdit.
+
+        Args:
+            widget (QtWidgets.QLineEdit): Line edit to get number from.
+
+        Returns:
+            (float): Number typed in, None if the line edit is empty.
+        """
+        return float(widget.text()) if widget.text() else None
+
+    @staticmethod
+    def setNode(widget, node, name=None):
         """
-        Convenience method for getting the items of a QListWidget.
+        Assigns a node to a line edit, showing its name while keeping the node itself to build with.
 
         Args:
-            widget (QListWidget): List widget to get items from.
+            widget (QtWidgets.QLineEdit): Line edit to assign node to.
+
+            node (string): Name or UUID of the node, empty to clear the line edit.
+
+            name (string): OPTIONAL. Name shown for the node, the node itself if None.
+        """
+        widget.setProperty('node', node)
+        widget.setText(node and (name or node))
+
+    @staticmethod
+    def getNode(widget):
+        """
+        Gets the node assigned to a line edit with setNode.
 
-            text (boolean): Whether we should get the item as a string instead of a QListWidgetItem.
+        Args:
+            widget (QtWidgets.QLineEdit): Line edit to get node from.
 
         Returns:
-            (list): List of items in given widget
+            (string): Name or UUID of the node, empty if none is assigned.
         """
-        if text:
-            return [widget.item(i).text() for i in range(widget.count())]
-        else:
-            return [widget.item(i) for i in range(widget.count())]
+        if not widget.text():
+            return ''
+
+        return widget.property('node') or widget.text()
 
     def validate(self):
         """
@@ -247,9 +477,9 @@ class GUI(QtWidgets.QDialog):
             (boolean): True if everything is valid, false if missing variables.
         """
         name_check = True if self.module_name.text() else self.failed(self.module_name)
-        controls_list_check = True if self.getItems(self.controls_list)[0].text() != self.empty_controls_text else self.failed(self.controls_list)
+        controls_list_check = True if self.getItems(self.controls_list) else self.failed(self.controls_list)
         parent_control_check = True if self.parent_control.text() else self.failed(self.parent_control)
-        geometry_list_check = True if self.getItems(self.geometry_list)[0].text() != self.empty_geometry_text else self.failed(self.geometry_list)
+        geometry_list_check = True if self.getItems(self.geometry_list) else self.failed(self.geometry_list)
 
         return name_check and controls_list_check and parent_control_check and geometry_list_check
 
@@ -260,9 +490,8 @@ class GUI(QtWidgets.QDialog):
         Args:
             force (boolean): If True, will reset regardless of items in it.
         """
-        if force or self.controls_list.count() == 0:
-            self.controls_list.clear()
-            self.controls_list.addItem(self.empty_controls_text)
+        if force or not self.getItems(self.controls_list):
+            self.controls_list.model.clear()
             self.controls_list.setStyleSheet(self.list_stylesheet)
 
     def resetGeometry(self, force=False):
@@ -272,9 +501,8 @@ class GUI(QtWidgets.QDialog):
         Args:
             force (boolean): If True, will reset regardless of items in it.
         """
-        if force or self.geometry_list.count() == 0:
-            self.geometry_list.clear()
-            self.geometry_list.addItem(self.empty_geometry_text)
+        if force or not self.getItems(self.geometry_list):
+            self.geometry_list.model.clear()
             self.geometry_list.setStyleSheet(self.list_stylesheet)
 
     def assignControls(self):
@@ -307,6 +535,97 @@ class GUI(QtWidgets.QDialog):
         """
         pass
 
+    def startBuild(self, steps):
+        """
+        Starts building in chunks between UI events, showing the progress and a cancel button until done.
+
+        Args:
+            steps (generator): Steps of the build, such as builder.createSteps. Each step yields the amount of controls
+            built, the total amount of controls and the nodes created so far.
+        """
+        self.build_steps = steps
+        self.build_start = timeit.default_timer()
+        self.create_collisions_button.setEnabled(False)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.progress_label.setText('Starting')
+        self.cancel_button.setVisible(True)
+        self.beginBuild()
+        self.build_timer.start(0)
+
+    def buildChunk(self):
+        """
+        Runs build steps until the chunk's time is used up, then updates the progress and the estimated time left.
+        A failing step rolls the build back before raising its error.
+        """
+        chunk_start = timeit.default_timer()
+        try:
+            done, total, nodes = next(self.build_steps)
+            while timeit.default_timer() - chunk_start < self.chunk_seconds:
+                done, total, nodes = next(self.build_steps)
+        except StopIteration:
+            elapsed = timeit.default_timer() - self.build_start
+            self.stopBuild(rollback=False)
+            self.progress_label.setText('Built in {:.1f}s'.format(elapsed))
+            return
+        except Exception:
+            self.stopBuild(rollback=True)
+            self.progress_label.setText('Failed, scene restored')
+            raise
+
+        elapsed = timeit.default_timer() - self.build_start
+        remaining = elapsed / done * (total - done) if done else 0.0
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.progress_label.setText('{} / {} controls, {:.0f}s left'.format(done, total, remaining))
+
+    def closeEvent(self, event):
+        """
+        Cancels any build in progress before closing, so the build is never left half done.
+        """
+        self.cancelBuild()
+        super(GUI, self).closeEvent(event)
+
+    def cancelBuild(self):
+        """
+        Stops the build and rolls the scene back to how it was before building.
+        """
+        if self.build_steps is None:
+            return
+
+        self.stopBuild(rollback=True)
+        self.progress_label.setText('Cancelled, scene restored')
+
+    def stopBuild(self, rollback):
+        """
+        Stops scheduling build steps and hides the progress.
+
+        Args:
+            rollback (boolean): If True, everything done by the build is undone.
+        """
+        self.build_timer.stop()
+        self.build_steps.close()
+        self.build_steps = None
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+        self.create_collisions_button.setEnabled(True)
+        self.endBuild(rollback)
+
+    def beginBuild(self):
+        """
+        App dependent, called before the first build step so everything the build does can be undone at once.
+        """
+        pass
+
+    def endBuild(self, rollback):
+        """
+        App dependent, called after the last build step or after the build is cancelled or fails.
+
+        Args:
+            rollback (boolean): If True, everything done since beginBuild should be undone.
+        """
+        pass
+
     def createCollisions(self):
         """
         Performs a validate and then creates collisions. This function must be overwritten in DCC.
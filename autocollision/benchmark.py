@@ -0,0 +1,387 @@
+import sys
+import json
+import math
+import random
+import argparse
+import platform
+import itertools
+import timeit
+import tracemalloc
+from . import builder
+from . import profiler
+from . import scene
+
+
+case_keys = ['controls', 'meshes', 'triangles', 'lean', 'activation_distance']
+
+
+def sphere(center, radius, triangles):
+    """
+    Gets a closed sphere mesh with outward facing triangles, made of as many rings as sectors.
+
+    Args:
+        center (list): World position of the sphere's center.
+
+        radius (float): Radius of the sphere.
+
+        triangles (int): Rough amount of triangles to make, at least 12.
+
+    Returns:
+        (tuple): List of vertex positions and list of vertex index triples of each triangle.
+    """
+    # a sphere of n rings and n sectors has 2n(n - 1) triangles
+    count = max(3, int(round(0.5 + math.sqrt(triangles / 2.0))))
+    points = [(center[0], center[1], center[2] + radius)]
+    for ring in range(1, count):
+        theta = math.pi * ring / count
+        for sector in range(count):
+            phi = 2.0 * math.pi * sector / count
+            points.append((center[0] + radius * math.sin(theta) * math.cos(phi),
+                           center[1] + radius * math.sin(theta) * math.sin(phi),
+                           center[2] + radius * math.cos(theta)))
+
+    points.append((center[0], center[1], center[2] - radius))
+    bottom = len(points) - 1
+
+    def vertex(ring, sector):
+        return 1 + (ring - 1) * count + sector % count
+
+    faces = []
+    for sector in range(count):
+        faces.append((0, vertex(1, sector), vertex(1, sector + 1)))
+        for ring in range(1, count - 1):
+            corners = [vertex(ring, sector), vertex(ring + 1, sector), vertex(ring + 1, sector + 1),
+                       vertex(ring, sector + 1)]
+            faces.append((corners[0], corners[1], corners[2]))
+            faces.append((corners[0], corners[2], corners[3]))
+
+        faces.append((vertex(count - 1, sector), bottom, vertex(count - 1, sector + 1)))
+
+    return points, faces
+
+
+def syntheticRig(scene, controls, meshes, triangles, seed=0):
+    """
+    Makes a synthetic setup to build collisions on. The collision meshes are unit spheres laid out on a grid and
+    every control sits around one of them, some inside and some outside, all under one parent control at the origin.
+
+    Args:
+        scene (scene.Scene): Scene to make the setup in.
+
+        controls (int): Amount of controls to make.
+
+        meshes (int): Amount of collision meshes to make.
+
+        triangles (int): Rough amount of triangles of each collision mesh.
+
+        seed (int): Seed of the control placement, the same seed always gives the same setup.
+
+    Returns:
+        (tuple): Handles of the parent control, the controls and the collision meshes.
+    """
+    generator = random.Random(seed)
+    columns = int(math.ceil(math.sqrt(meshes)))
+    centers = [(3.0 * (index % columns), 3.0 * (index // columns), 0.0) for index in range(meshes)]
+    geometry = [scene.createMesh('bench_geo' + str(index), *sphere(center, 1.0, triangles))
+                for index, center in enumerate(centers)]
+
+    parent_control = scene.group('bench_parent_ctl')
+    created = []
+    for index in range(controls):
+        center = centers[index % meshes]
+        direction = [generator.gauss(0.0, 1.0) for _ in range(3)]
+        length = math.sqrt(sum([value * value for value in direction])) or 1.0
+        distance = generator.uniform(0.8, 1.2)
+        translation = [value + axis / length * distance for value, axis in zip(center, direction)]
+        created.append(scene.group('bench' + str(index) + '_ctl', parent_control, translation))
+
+    return parent_control, created, geometry
+
+
+def measureBuild(case, repeat=1):
+    """
+    Builds a synthetic setup in a MemoryScene and measures the build.
+
+    Args:
+        case (dictionary): "controls", "meshes" and "triangles" of the setup, "lean" and "activation_distance"
+        given to builder.create.
+
+        repeat (int): Amount of builds to time, the fastest is kept.
+
+    Returns:
+        (dictionary): Fastest build "time" in seconds, time of each build "phases", amount of "nodes" and
+        "connections" in the scene with the setup, amount of nodes "created" by the build, "nodes_per_control" and
+        "peak_memory" in bytes of one build.
+    """
+    def build(profile=None):
+        memory_scene = scene.MemoryScene()
+        parent_control, controls, geometry = syntheticRig(memory_scene, case['controls'], case['meshes'],
+                                                          case['triangles'])
+        start = timeit.default_timer()
+        created = builder.create(memory_scene, 'bench', controls, parent_control, geometry,
+                                 activation_distance=case['activation_distance'], lean=case['lean'], profiler=profile)
+        return timeit.default_timer() - start, memory_scene, created
+
+    times = []
+    for _ in range(max(1, repeat)):
+        profile = profiler.Profiler()
+        seconds, memory_scene, created = build(profile)
+        times.append((seconds, profile))
+
+    seconds, profile = min(times, key=lambda item: item[0])
+
+    # measured on its own build, tracing slows everything down
+    tracemalloc.start()
+    try:
+        build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'time': seconds, 'phases': dict([(name, entry['time']) for name, entry in profile.phases.items()]),
+            'nodes': len(memory_scene.nodes), 'connections': len(memory_scene.connections), 'created': len(created),
+            'nodes_per_control': float(len(created)) / case['controls'], 'peak_memory': peak}
+
+
+def measureEvaluation(case, frames=24):
+    """
+    Times the offline solver on a synthetic setup, as a stand in for the cost of evaluating the keepOuts each frame.
+    Every mesh moves back and forth over the frames, which are played once then scrubbed through again, see
+    offline.Evaluator. Needs numpy.
+
+    Args:
+        case (dictionary): "controls", "meshes" and "triangles" of the setup.
+
+        frames (int): Amount of frames to evaluate.
+
+    Returns:
+        (dictionary): "first_frame_time" in seconds, which builds the BVHs, average "frame_time" and slowest
+        "frame_time_max" of the frames played after it, and average "rescrub_time" of the frames scrubbed again.
+    """
+    import numpy
+    from . import offline
+    from . import solver
+
+    memory_scene = scene.MemoryScene()
+    parent_control, controls, geometry = syntheticRig(memory_scene, case['controls'], case['meshes'],
+                                                      case['triangles'])
+    positions = numpy.array([control.translation for control in controls])
+    directions = solver.directions(positions, parent_control.translation)
+    meshes = [numpy.array(mesh.points) for mesh in geometry]
+    evaluator = offline.Evaluator([mesh.triangles for mesh in geometry], cache_size=frames)
+
+    def solve(frame):
+        offset = numpy.array([0.0, 0.0, 0.25 * math.sin(frame * 0.5)])
+        start = timeit.default_timer()
+        evaluator.solve(frame, positions, directions, [points + offset for points in meshes])
+        return timeit.default_timer() - start
+
+    first_frame_time = solve(0)
+    times = [solve(frame) for frame in range(1, frames)]
+    rescrub_times = [solve(frame) for frame in reversed(range(frames))]
+    return {'first_frame_time': first_frame_time, 'frame_time': sum(times) / len(times) if times else 0.0,
+            'frame_time_max': max(times) if times else 0.0,
+            'rescrub_time': sum(rescrub_times) / len(rescrub_times)}
+
+
+def cases(controls, meshes, triangles, lean=(False,), activation_distance=(None,)):
+    """
+    Gets every combination of the given setup sizes and build options.
+
+    Args:
+        controls (list): Amounts of controls.
+
+        meshes (list): Amounts of collision meshes.
+
+        triangles (list): Rough amounts of triangles per mesh.
+
+        lean (list): Values of lean to build with.
+
+        activation_distance (list): Values of activation_distance to build with.
+
+    Returns:
+        (list): Dictionaries with a value for each of case_keys.
+    """
+    return [dict(zip(case_keys, values))
+            for values in itertools.product(controls, meshes, triangles, lean, activation_distance)]
+
+
+def run(benchmark_cases, repeat=1, frames=24, evaluate=True, progress=None):
+    """
+    Measures every given case.
+
+    Args:
+        benchmark_cases (list): Cases to measure, see cases.
+
+        repeat (int): Amount of builds to time for each case, the fastest is kept.
+
+        frames (int): Amount of frames to time evaluation over.
+
+        evaluate (bool): If True, also times evaluation, see measureEvaluation. Needs numpy.
+
+        progress (function): OPTIONAL. Called with each case's result as it finishes.
+
+    Returns:
+        (dictionary): "environment" the results were measured in and "results" of each case, a copy of the case
+        with its "build" and "evaluation" measurements. "evaluation" is None when not evaluated.
+    """
+    if evaluate:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('numpy is needed to time evaluation, install it or run without evaluating')
+
+    environment = {'python': platform.python_version(), 'platform': platform.platform(),
+                   'numpy': numpy.__version__ if evaluate else None}
+    results = []
+    for case in benchmark_cases:
+        result = dict(case)
+        result['build'] = measureBuild(case, repeat)
+        result['evaluation'] = measureEvaluation(case, frames) if evaluate else None
+        results.append(result)
+        if progress:
+            progress(result)
+
+    return {'environment': environment, 'results': results}
+
+
+def caseName(case):
+    """
+    Gets a short printable name of the given case.
+
+    Args:
+        case (dictionary): Case or result of a case.
+
+    Returns:
+        (string): Name holding the value of each of case_keys.
+    """
+    name = '{}c {}m {}t'.format(case['controls'], case['meshes'], case['triangles'])
+    name += ' lean' if case['lean'] else ''
+    name += ' gate' if case['activation_distance'] is not None else ''
+    return name
+
+
+def summary(report):
+    """
+    Gets a printable summary of benchmark results.
+
+    Args:
+        report (dictionary): Results given by run.
+
+    Returns:
+        (string): One line per case.
+    """
+    lines = ['Case                           Build (s)    Nodes  Connections  Memory (MB)  Frame (ms)']
+    for result in report['results']:
+        build = result['build']
+        frame = '{:>11.3f}'.format(result['evaluation']['frame_time'] * 1000.0) if result['evaluation'] else ' ' * 11
+        lines.append('{:<30} {:>9.4f} {:>8} {:>12} {:>12.2f} {}'.format(
+            caseName(result), build['time'], build['nodes'], build['connections'],
+            build['peak_memory'] / 1048576.0, frame))
+
+    return '\n'.join(lines)
+
+
+def compare(previous, current, threshold=1.2):
+    """
+    Compares two benchmark reports case by case, cases are matched on their case_keys.
+
+    Args:
+        previous (dictionary): Results given by run with an older version, the baseline.
+
+        current (dictionary): Results given by run with the version to check.
+
+        threshold (float): Ratio of current over previous above which a measurement counts as a regression.
+
+    Returns:
+        (tuple): Printable comparison with one line per matched case and a list of "case: measurement" for
+        every regression found.
+    """
+    def key(result):
+        return tuple([result[name] for name in case_keys])
+
+    def measurements(result):
+        values = [('build time', result['build']['time']), ('nodes', result['build']['nodes']),
+                  ('memory', result['build']['peak_memory'])]
+        if result.get('evaluation'):
+            values.append(('frame time', result['evaluation']['frame_time']))
+
+        return values
+
+    baseline = dict([(key(result), result) for result in previous['results']])
+    lines = ['Case                           Measurement        Previous      Current   Ratio']
+    regressions = []
+    for result in current['results']:
+        if key(result) not in baseline:
+            continue
+
+        old = dict(measurements(baseline[key(result)]))
+        for measurement, value in measurements(result):
+            if measurement not in old:
+                continue
+
+            ratio = value / old[measurement] if old[measurement] else 1.0
+            lines.append('{:<30} {:<15} {:>11.4g} {:>12.4g} {:>7.2f}'.format(
+                caseName(result), measurement, old[measurement], value, ratio))
+            if ratio > threshold:
+                regressions.append(caseName(result) + ': ' + measurement)
+
+    return '\n'.join(lines), regressions
+
+
+def main(arguments=None):
+    """
+    Command line entry point, run with python -m autocollision.benchmark. Maya is not needed.
+
+    Args:
+        arguments (list): OPTIONAL. Command line arguments, sys.argv if None.
+
+    Returns:
+        (int): 0 if nothing regressed against the --compare report, 1 if something did.
+    """
+    parser = argparse.ArgumentParser(description='Measures how building and evaluating collisions scale on synthetic '
+                                                 'setups, without Maya.')
+    parser.add_argument('--controls', nargs='+', type=int, default=[10, 100, 500, 2000], help='Amounts of controls.')
+    parser.add_argument('--meshes', nargs='+', type=int, default=[1, 10, 50], help='Amounts of collision meshes.')
+    parser.add_argument('--triangles', nargs='+', type=int, default=[960], help='Rough triangles per mesh.')
+    parser.add_argument('--lean', action='store_true', help='Also measure every case built lean.')
+    parser.add_argument('--activation-distance', type=float, help='Also measure every case built with gates.')
+    parser.add_argument('--repeat', type=int, default=1, help='Builds timed per case, the fastest is kept.')
+    parser.add_argument('--frames', type=int, default=24, help='Frames to time evaluation over.')
+    parser.add_argument('--no-evaluate', action='store_true', help='Only measure builds, numpy is not needed.')
+    parser.add_argument('--output', help='Path of a JSON file to write the results to.')
+    parser.add_argument('--compare', help='Path of a JSON file written by an earlier run to compare against.')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Ratio over the --compare results that counts '
+                                                                      'as a regression.')
+    arguments = parser.parse_args(arguments)
+
+    benchmark_cases = cases(arguments.controls, arguments.meshes, arguments.triangles,
+                            [False, True] if arguments.lean else [False],
+                            [None] if arguments.activation_distance is None else [None, arguments.activation_distance])
+
+    def progress(result):
+        print('{:<30} done'.format(caseName(result)))
+        sys.stdout.flush()
+
+    report = run(benchmark_cases, arguments.repeat, arguments.frames, not arguments.no_evaluate, progress)
+    print(summary(report))
+
+    if arguments.output:
+        with open(arguments.output, 'w') as open_file:
+            json.dump(report, open_file, indent=4)
+
+    if not arguments.compare:
+        return 0
+
+    with open(arguments.compare) as open_file:
+        text, regressions = compare(json.load(open_file), report, arguments.threshold)
+
+    print(text)
+    if regressions:
+        print('Regressed: ' + ', '.join(regressions))
+
+    return int(bool(regressions))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1582 @@
+import json
+from collections import OrderedDict
+
+
+manifest_attribute = 'autoCollisionManifest'
+proxy_attribute = 'autoCollisionProxy'
+proxy_group_name = 'autoCollision_proxy_grp'
+direction_modes = ['source', 'surface']
+mirror_axes = ['x', 'y', 'z']
+
+
+def reachable(positions, bounds, reach=0.0):
+    """
+    Broad phase check of which bounding boxes each position can reach.
+
+    Args:
+        positions (list): Positions to check.
+
+        bounds (list): (minimum, maximum) corners of each bounding box.
+
+        reach (float): Distance to grow every bounding box by.
+
+    Returns:
+        (list): For each position, the indices of the bounding boxes it can reach.
+    """
+    return [[index for index, (minimum, maximum) in enumerate(bounds)
+             if all([minimum[axis] - reach <= position[axis] <= maximum[axis] + reach for axis in range(3)])]
+            for position in positions]
+
+
+def broadPhase(scene, positions, collision_geometry, reach=None, frame_range=None):
+    """
+    Finds which collision geometry each position should be connected to.
+
+    Args:
+        scene (scene.Scene): Scene the geometry is in.
+
+        positions (list): World position of each control.
+
+        collision_geometry (list): Handles of the collision geometry.
+
+        reach (float): OPTIONAL. Distance to grow every geometry's bounding box by. If None, every position is
+        connected to every geometry.
+
+        frame_range (list): OPTIONAL. Start and end frame to sweep the geometry's bounding boxes over.
+
+    Returns:
+        (list): For each position, the indices of the geometry to connect it to.
+    """
+    if reach is None:
+        return [range(len(collision_geometry))] * len(positions)
+
+    frames = range(int(frame_range[0]), int(frame_range[1]) + 1) if frame_range else None
+    bounds = scene.boundingBox(collision_geometry, frames)
+    reaches = reachable(positions, bounds, reach)
+    total = len(positions) * len(collision_geometry)
+    skipped = total - sum([len(indices) for indices in reaches])
+    scene.info('Broad phase skipped ' + str(skipped) + ' of ' + str(total) + ' connections')
+    return reaches
+
+
+def directions(scene, positions, collision_source_translation, collision_geometry, direction_mode='source'):
+    """
+    Gets the direction each control should be pushed along when it collides with the collision geometry.
+
+    Args:
+        scene (scene.Scene): Scene the geometry is in.
+
+        positions (list): World position of each control.
+
+        collision_source_translation (list): World translation of the collision source.
+
+        collision_geometry (list): Handles of the collision geometry.
+
+        direction_mode (string): "source" pushes every control away from the collision source. "surface" pushes every
+        control along the normal of the closest point on the collision geometry, falling back to the collision source
+        where no surface is found. Surface needs numpy.
+
+    Returns:
+        (list): Normalized direction of each control.
+    """
+    if direction_mode not in direction_modes:
+        scene.error('Direction mode must be one of ' + ', '.join(direction_modes) + ', not ' + str(direction_mode))
+
+    result = []
+    for position in positions:
+        direction = [control_axis - source_axis for control_axis, source_axis in zip(position, collision_source_translation)]
+        length = sum([axis * axis for axis in direction]) ** 0.5
+        result.append([axis / length for axis in direction] if length else direction)
+
+    if direction_mode == 'surface' and positions:
+        from . import nearest
+        surface, _ = nearest.surfaceDirections(positions, scene.meshData(collision_geometry))
+        result = [list(map(float, normal)) if any(normal) else direction for normal, direction in zip(surface, result)]
+
+    return result
+
+
+def gateSpheres(scene, collision_geometry):
+    """
+    Gets the sphere around the bounding box of each geometry, kept in the geometry's space so it follows the geometry
+    around. Gates measure one distance per geometry a control collides with, since geometry can move on its own.
+
+    Args:
+        scene (scene.Scene): Scene the geometry is in.
+
+        collision_geometry (list): Handles of the geometry.
+
+    Returns:
+        (list): For each geometry, the center of its sphere in its space and its radius.
+    """
+    if not collision_geometry:
+        return []
+
+    bounds = scene.boundingBox(collision_geometry)
+    centers = [[(low + high) * 0.5 for low, high in zip(minimum, maximum)] for minimum, maximum in bounds]
+    radii = [sum([(high - low) ** 2 for low, high in zip(minimum, maximum)]) ** 0.5 * 0.5 for minimum, maximum in bounds]
+
+    # distanceBetween brings the center out of the geometry's space through its full world matrix, scale included
+    return list(zip(scene.localPoints(collision_geometry, centers), radii))
+
+
+def createGate(scene, control, keep_out, keep_out_shape, constraint, blend, collision_geometry, spheres,
+               activation_distance, blend_attributes=('blender',)):
+    """
+    Bypasses the keepOut and point constraint of a control while its autoCollisionWeight is zero or while it is
+    further than the activation distance from the sphere of every geometry it collides with, see gateSpheres.
+    The blend is driven to zero at the same time, so the stale output of the bypassed nodes never moves the control.
+    Every geometry gets its own distanceBetween, so geometry moving on its own still opens the gate, and a condition
+    that lets the weight through when it is near, or passes on the previous geometry's result when it is not.
+    The spheres are measured at build time, deforming geometry should be given a larger activation distance.
+
+    Args:
+        scene (scene.Scene): Scene to build the gate in.
+
+        control (object): Handle of the control, holding the autoCollisionWeight attribute.
+
+        keep_out (object): Handle of the control's keepOut transform. Distances are measured from it rather than
+        from anything the keepOut moves, which would make a cycle through the node state.
+
+        keep_out_shape (object): Handle of the control's keepOut node.
+
+        constraint (object): Handle of the point constraint driving the control's offset, None for lean controls.
+
+        blend (object): Handle of the blend node between collision and the control's rest position.
+
+        collision_geometry (list): Handles of the geometry the control collides with. Without any, the control
+        stays bypassed.
+
+        spheres (list): Center in the geometry's space and radius of each geometry's sphere.
+
+        activation_distance (float): Distance from the spheres at which the keepOut starts evaluating.
+
+        blend_attributes (list): Attributes of the blend node driven by the weight, see blendAttributes.
+
+    Returns:
+        (list): Nodes created.
+    """
+    control_name = scene.name(control)
+    created = []
+    gate = None
+
+    # without geometry the gate never lets the weight through
+    if not collision_geometry:
+        gate = scene.shadingNode('condition', control_name + '_collision_gate')
+        scene.setAttr(gate, 'firstTerm', 1)
+        scene.setAttr(gate, 'secondTerm', 0)
+        scene.setAttr(gate, 'operation', 4)
+        scene.setAttr(gate, 'colorIfFalse', (0, 0, 0))
+        scene.connect(control, 'autoCollisionWeight', gate, 'colorIfTrueR')
+        created.append(gate)
+
+    # the weight goes through while the control is near any sphere, operation 4 is less than
+    for geometry, (center, radius) in zip(collision_geometry, spheres):
+        name = control_name + '_' + scene.name(geometry)
+        distance = scene.shadingNode('distanceBetween', name + '_collision_distance')
+        scene.connect(keep_out, 'worldMatrix[0]', distance, 'inMatrix1')
+        scene.connect(geometry, 'worldMatrix[0]', distance, 'inMatrix2')
+        scene.setAttr(distance, 'point2', center)
+
+        near = scene.shadingNode('condition', name + '_collision_gate')
+        scene.connect(distance, 'distance', near, 'firstTerm')
+        scene.setAttr(near, 'secondTerm', radius + activation_distance)
+        scene.setAttr(near, 'operation', 4)
+        scene.setAttr(near, 'colorIfFalse', (0, 0, 0))
+        scene.connect(control, 'autoCollisionWeight', near, 'colorIfTrueR')
+        if gate:
+            scene.connect(gate, 'outColorR', near, 'colorIfFalseR')
+
+        created += [distance, near]
+        gate = near
+
+    [scene.connect(gate, 'outColorR', blend, attribute) for attribute in blend_attributes]
+
+    # node state 1 is HasNoEffect, used whenever the gated weight is zero, operation 2 is greater than
+    state = scene.shadingNode('condition', control_name + '_collision_state')
+    scene.connect(gate, 'outColorR', state, 'firstTerm')
+    scene.setAttr(state, 'operation', 2)
+    scene.setAttr(state, 'colorIfTrue', (0, 0, 0))
+    scene.setAttr(state, 'colorIfFalse', (1, 0, 0))
+    scene.connect(state, 'outColorR', keep_out_shape, 'nodeState')
+    if constraint:
+        scene.connect(state, 'outColorR', constraint, 'nodeState')
+
+    created.append(state)
+    return created
+
+
+def regate(scene, manifest):
+    """
+    Builds the gates of every gated control of the given module again, to match the module's current geometry.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        manifest (dictionary): Manifest of the module, its control records are updated with their new gates.
+
+    Returns:
+        (list): Nodes created.
+    """
+    options = manifest['options']
+    records = [record for record in manifest['controls'] if record.get('gate') is not None]
+    if not records:
+        return []
+
+    scene.delete([scene.node(node) for record in records for node in record['gate']])
+    collision_geometry = [scene.node(record.get('uuid') or record['geometry']) for record in manifest['geometry']]
+    keep_outs = [scene.node(record['keep_out']) for record in records]
+    positions = [translation for translation, _ in scene.xform(keep_outs)]
+    reaches = broadPhase(scene, positions, collision_geometry, options['reach'], options['frame_range'])
+
+    spheres = gateSpheres(scene, collision_geometry)
+    created = []
+    for record, keep_out, indices in zip(records, keep_outs, reaches):
+        constraint = scene.node(record['constraint']) if record['constraint'] else None
+        record['gate'] = createGate(scene, scene.node(record.get('uuid') or record['control']), keep_out,
+                                    scene.node(record['keep_out_shape']), constraint, scene.node(record['blend']),
+                                    [collision_geometry[index] for index in indices],
+                                    [spheres[index] for index in indices], options['activation_distance'],
+                                    blendAttributes(options.get('lean')))
+        created += record['gate']
+
+    return created
+
+
+def findProxies(scene, proxy_group):
+    """
+    Gets the proxies in the given group by the key of the geometry they were made from, see createProxies.
+
+    Args:
+        scene (scene.Scene): Scene the proxies are in.
+
+        proxy_group (object): Handle of the group holding the proxies.
+
+    Returns:
+        (dictionary): Handle of the proxy and its data for each key.
+    """
+    proxies = {}
+    for mesh in scene.children(proxy_group, 'transform'):
+        data = scene.getData(mesh, proxy_attribute)
+        if data:
+            proxies[tuple(data['key'])] = (mesh, data)
+
+    return proxies
+
+
+def createProxies(scene, name, collision_geometry, tolerance, modules=None):
+    """
+    Makes a low poly proxy of each given geometry by clustering its vertices, see proxy.cluster, and wraps it to the
+    geometry so it follows any deformation. Proxies are made muscle objects instead of the geometry so keepOuts
+    collide against fewer triangles. Needs numpy.
+    Proxies are shared by every module, a geometry that already has a proxy of the same tolerance made while its mesh
+    had the same topology reuses it, see scene.Scene.meshKeys, so only new geometry is read, clustered and wrapped.
+
+    Args:
+        scene (scene.Scene): Scene the geometry is in.
+
+        name (string): Name of the collision module.
+
+        collision_geometry (list): Handles of the geometry to make proxies of.
+
+        tolerance (float): Size of the cubes vertices are merged in, larger makes lighter and less accurate proxies.
+
+        modules (list): OPTIONAL. Names of the modules using each geometry, when more than one module is built at once.
+        Only the given module if None.
+
+    Returns:
+        (tuple): Handle of the proxy group, nodes created, and a record for each geometry with its "proxy", "wrap"
+        nodes, the largest "deviation" between proxy and geometry, and the geometry and proxy "triangles" counts.
+    """
+    created = []
+    proxies = {}
+    if scene.exists(proxy_group_name):
+        proxy_group = scene.node(proxy_group_name)
+        proxies = findProxies(scene, proxy_group)
+    else:
+        proxy_group = scene.group(proxy_group_name)
+        scene.setAttr(proxy_group, 'visibility', 0)
+        created.append(proxy_group)
+
+    keys = [tuple(key) + (tolerance,) for key in scene.meshKeys(collision_geometry)]
+    missing = [geometry for geometry, key in zip(collision_geometry, keys) if key not in proxies]
+    meshes = iter(scene.meshData(missing) if missing else [])
+
+    records = []
+    modules = modules or [[name]] * len(collision_geometry)
+    for geometry, key, users in zip(collision_geometry, keys, modules):
+        geometry_name = scene.name(geometry)
+        if key not in proxies:
+            mesh, wrap, data = createProxy(scene, geometry, next(meshes), tolerance, proxy_group)
+            data['key'] = list(key)
+            created += [mesh] + wrap
+            proxies[key] = (mesh, data)
+        else:
+            mesh, data = proxies[key]
+            scene.info('{} reuses proxy {}'.format(geometry_name, scene.name(mesh)))
+
+        data['modules'] += users
+        scene.setData(mesh, proxy_attribute, data)
+        records.append({'proxy': mesh, 'wrap': data['wrap'], 'deviation': data['deviation'],
+                        'triangles': data['triangles']})
+
+    return proxy_group, created, records
+
+
+def createProxy(scene, geometry, mesh_data, tolerance, proxy_group):
+    """
+    Makes the proxy of a single geometry, see createProxies.
+
+    Args:
+        scene (scene.Scene): Scene the geometry is in.
+
+        geometry (object): Handle of the geometry to make a proxy of.
+
+        mesh_data (tuple): World points and triangles of the geometry, see scene.Scene.meshData.
+
+        tolerance (float): Size of the cubes vertices are merged in.
+
+        proxy_group (object): Handle of the group to put the proxy in.
+
+    Returns:
+        (tuple): Handle of the proxy, wrap nodes made, and the data to store on the proxy.
+    """
+    from . import proxy
+
+    points, triangles = mesh_data
+    geometry_name = scene.name(geometry)
+    proxy_points, proxy_triangles = proxy.cluster(points, triangles, tolerance)
+    if not len(proxy_triangles):
+        scene.error(geometry_name + ' has no triangles left at a proxy tolerance of ' + str(tolerance))
+
+    mesh = scene.createMesh(geometry_name + '_proxy', proxy_points.tolist(), proxy_triangles.tolist(), proxy_group)
+    wrap = scene.wrap(mesh, geometry)
+    deviation = proxy.deviation(points, triangles, proxy_points, proxy_triangles)
+    scene.info('{} proxy has {} of {} triangles, deviating up to {:.4g}'.format(
+        geometry_name, len(proxy_triangles), len(triangles), deviation))
+
+    return mesh, wrap, {'wrap': wrap, 'deviation': deviation, 'triangles': [len(triangles), len(proxy_triangles)],
+                        'modules': []}
+
+
+def releaseProxies(scene, name, manifest, records):
+    """
+    Stops the given module from using the proxies of the given geometry records. The proxy group is let go of once
+    none of its proxies are left.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+        manifest (dictionary): Manifest of the module, its "proxy_group" is set to None if the group is let go of.
+
+        records (list): Manifest records of the geometry.
+
+    Returns:
+        (list): Handles of the proxies and wrap nodes no other module uses, and of the proxy group if it is left empty,
+        to be deleted.
+    """
+    nodes = []
+    released = 0
+    for record in records:
+        if not record.get('proxy'):
+            continue
+
+        mesh = scene.node(record['proxy'])
+        data = scene.getData(mesh, proxy_attribute)
+        if data and name in data['modules']:
+            data['modules'].remove(name)
+
+        # proxies made before they were shared have no data and belong to their module only
+        if data and data['modules']:
+            scene.setData(mesh, proxy_attribute, data)
+        else:
+            nodes += [scene.node(node) for node in record.get('wrap') or []] + [mesh]
+            released += 1
+
+    if released and manifest.get('proxy_group'):
+        proxy_group = scene.node(manifest['proxy_group'])
+        if len(scene.children(proxy_group, 'transform')) <= released:
+            nodes.append(proxy_group)
+            manifest['proxy_group'] = None
+
+    return nodes
+
+
+def proxyReport(scene, name):
+    """
+    Gets a printable report of the triangles saved by each proxy of the given module and how far it deviates.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+    Returns:
+        (string): One line per geometry with a proxy.
+    """
+    lines = ['Geometry                       Triangles     Proxy  Deviation']
+    for record in getManifest(scene, name)['geometry']:
+        if record.get('proxy'):
+            lines.append('{:<30} {:>9} {:>9} {:>10.4g}'.format(record['geometry'].split('|')[-1], record['triangles'][0],
+                                                                record['triangles'][1], record['deviation']))
+
+    return '\n'.join(lines)
+
+
+def blendAttributes(lean=False):
+    """
+    Gets the attributes of a control's blend node that the control's weight drives.
+
+    Args:
+        lean (bool): Whether the control was built lean, see createLeanControl.
+
+    Returns:
+        (list): Names of the attributes.
+    """
+    return ['input2X', 'input2Y', 'input2Z'] if lean else ['blender']
+
+
+def createLeanControl(scene, control, control_translation, muscles, direction, create_blender=True):
+    """
+    Creates the collision nodes of a single control with as few nodes as possible. The keepOut is rigged on an offset
+    above the control, so it moves the control directly instead of through a locator and point constraint, and the
+    blend is a single multiply of the keepOut's output. The keepOut is aligned to the world rather than the control.
+
+    Args:
+        scene (scene.Scene): Scene to build the collisions in.
+
+        control (object): Handle of the control that will be driven by collision.
+
+        control_translation (list): World translation of the control.
+
+        muscles (list): Muscle objects the control collides with.
+
+        direction (list): Normalized direction the control is pushed along when it collides, see directions.
+
+        create_blender (bool): If True, will create a weight attribute on the control to blend the collision.
+
+    Returns:
+        (tuple): List of nodes created and the control's manifest record.
+    """
+    control_name = scene.name(control)
+    with scene.phase('keepOut'):
+        # the keepOut transform is put where the offset is and the offset is moved by the keepOut's driven group
+        parent = scene.getParent(control)
+        offset = scene.group(control_name + '_collision_offset', parent, control_translation)
+        keep_out, keep_out_shape, driven = scene.rigKeepOut(offset)
+        control = scene.parent(control, offset)
+        scene.setAttr(keep_out_shape, 'inDirection', direction)
+        created = [keep_out, keep_out_shape, driven, offset]
+        record = {'control': control, 'parent': parent, 'group': None, 'locator': None, 'keep_out': keep_out,
+                  'keep_out_shape': keep_out_shape, 'driven': driven, 'offset': offset, 'constraint': None,
+                  'blend': None, 'gate': None}
+
+    if muscles:
+        with scene.phase('muscle connections'):
+            scene.keepOutAddMuscle(offset, muscles)
+
+    if create_blender:
+        with scene.phase('blend'):
+            # scales the keepOut's push by the weight on its way to the driven group
+            scene.addAttr(control, 'autoCollisionWeight', 0, 1, 1)
+            blend_node = scene.shadingNode('multiplyDivide', control_name + '_collision_weight')
+            scene.connect(keep_out_shape, 'outTranslateLocal', blend_node, 'input1')
+            [scene.connect(control, 'autoCollisionWeight', blend_node, attribute) for attribute in blendAttributes(True)]
+            scene.connect(blend_node, 'output', driven, 'translate')
+            created.append(blend_node)
+            record['blend'] = blend_node
+
+    return created, record
+
+
+def nodeReport(scene, name):
+    """
+    Gets a printable report of the nodes made for each control of the given module, shapes not included.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+    Returns:
+        (string): One line per control and the total.
+    """
+    keys = ['group', 'locator', 'keep_out', 'keep_out_shape', 'driven', 'offset', 'constraint', 'blend']
+    lines = ['Control                            Nodes']
+    total = 0
+    controls = getManifest(scene, name)['controls']
+    for record in controls:
+        count = len([key for key in keys if record[key]]) + len(record.get('gate') or [])
+        lines.append('{:<30} {:>9}'.format(record['control'].split('|')[-1], count))
+        total += count
+
+    lines.append('{} nodes for {} controls'.format(total, len(controls)))
+    return '\n'.join(lines)
+
+
+def createControl(scene, control, control_translation, control_rotation, muscles_group, muscles, direction, create_offset=True, create_blender=True, lean=False):
+    """
+    Creates the collision nodes of a single control.
+
+    Args:
+        scene (scene.Scene): Scene to build the collisions in.
+
+        control (object): Handle of the control that will be driven by collision.
+
+        control_translation (list): World translation of the control.
+
+        control_rotation (list): World rotation of the control.
+
+        muscles_group (object): Handle of the module's muscles master group.
+
+        muscles (list): Muscle objects the control collides with.
+
+        direction (list): Normalized direction the control is pushed along when it collides, see directions.
+
+        create_offset (bool): If True, will create an offset transform group above the control.
+
+        create_blender (bool): If True, will create a blender node and attribute to blend the collision.
+
+        lean (bool): If True, builds the control with createLeanControl instead, which always makes an offset.
+
+    Returns:
+        (tuple): List of nodes created and the control's manifest record.
+    """
+    if lean:
+        return createLeanControl(scene, control, control_translation, muscles, direction, create_blender)
+
+    # create a group and locator at our control's location
+    # group is the one that is going to be driven by collision
+    # locator will drive our controls
+    created = []
+    control_name = scene.name(control)
+    with scene.phase('keepOut'):
+        group = scene.group(control_name + '_muscle_grp', muscles_group, control_translation, control_rotation)
+        muscle_nodes = scene.rigKeepOut(group)
+        muscle_node = muscle_nodes[1]
+        locator = scene.spaceLocator(control_name + '_muscle_locator', group)
+        created.append(group)
+        created.append(locator)
+        created += muscle_nodes
+        record = {'control': control, 'parent': None, 'group': group, 'locator': locator, 'keep_out': muscle_nodes[0],
+                  'keep_out_shape': muscle_node, 'driven': muscle_nodes[2], 'offset': None, 'constraint': None,
+                  'blend': None, 'gate': None}
+
+        # setting the direction the muscles should move when they collide with the collision geometry
+        scene.setAttr(muscle_node, 'inDirection', direction)
+
+    # making the connection between the muscles and the collision geometry
+    if muscles:
+        with scene.phase('muscle connections'):
+            scene.keepOutAddMuscle(group, muscles)
+
+    if create_offset:
+        # if create offset, make a group that will be driven by the muscle collision
+        # that will then drive the given controls
+        with scene.phase('offset'):
+            record['parent'] = scene.getParent(control)
+            offset = scene.group(control_name + '_collision_offset', record['parent'], control_translation)
+            control = scene.parent(control, offset)
+            point_constraint = scene.pointConstraint(locator, offset)
+            created.append(offset)
+            created.append(point_constraint)
+            record.update({'control': control, 'offset': offset, 'constraint': point_constraint})
+
+        if create_blender:
+            with scene.phase('blend'):
+                # create attribute to connect to blender node
+                scene.addAttr(control, 'autoCollisionWeight', 0, 1, 1)
+
+                # creates a blender attribute to blend between muscle collision and regular control position
+                blend_node = scene.shadingNode('blendColors', control_name + '_collision_offset_Blend_T_Collision')
+                scene.setAttr(blend_node, 'color1', (0, 0, 0))
+                scene.setAttr(blend_node, 'color2', (0, 0, 0))
+                created.append(blend_node)
+                record['blend'] = blend_node
+
+                # connect control attribute to blender
+                scene.connect(control, 'autoCollisionWeight', blend_node, 'blender')
+                scene.connect(point_constraint, 'constraintTranslate', blend_node, 'color1')
+
+                # make sure to disconnect the point constraint from the offset
+                # before hooking up the values from the blender
+                scene.disconnect(offset, 'translateX')
+                scene.disconnect(offset, 'translateY')
+                scene.disconnect(offset, 'translateZ')
+                scene.connect(blend_node, 'output', offset, 'translate')
+
+    else:
+        # if not creating a blender, drive the controls with a good ol' parent constraint
+        with scene.phase('offset'):
+            parent_constraint = scene.parentConstraint(locator, control)
+            created.append(parent_constraint)
+            record['constraint'] = parent_constraint
+
+    return created, record
+
+
+def createGeometryGroup(scene, name, geometry, geometry_parent, master_collision_group):
+    """
+    Puts the given collision geometry under a group driven by the geometry parent.
+
+    Args:
+        scene (scene.Scene): Scene to build the collisions in.
+
+        name (string): Name of the collision module.
+
+        geometry (object): Handle of the collision geometry's transform.
+
+        geometry_parent (object): Handle of the transform that will drive the geometry.
+
+        master_collision_group (object): Handle of the module's collision group.
+
+    Returns:
+        (dictionary): Original parent of the geometry, collision group and its constraint, for the geometry's record.
+    """
+    # making an offset group so that we don't mess with the geometry's transform
+    # parent constraining each geometry's offset group
+    parent = scene.getParent(geometry)
+    collision_group = scene.group(name + '_' + scene.name(geometry) + '_grp')
+    collision_parent = scene.parentConstraint(geometry_parent, collision_group)
+    collision_group = scene.parent(collision_group, master_collision_group)
+    scene.parent(geometry, collision_group)
+    return {'parent': parent, 'group': collision_group, 'constraint': collision_parent}
+
+
+def create(scene, name, controls, parent_control, collision_geometry, geometry_parent=None, collision_source=None, create_offset=True, create_blender=True, is_geometry_driven=True, reach=None, frame_range=None, direction_mode='source', activation_distance=None, proxy_tolerance=None, lean=False, profiler=None):
+    """
+    Creates the collision nodes at the given control's position, with given parent control driving them and given
+    collision geometry colliding with them. Works with any scene backend, see scene.Scene.
+    Everything created is recorded in a manifest stored on the muscles master group, see getManifest.
+    Nodes can be given by name, full path, UUID or scene handle, and are recorded with their UUIDs.
+
+    Args:
+        scene (scene.Scene): Scene to build the collisions in.
+
+        name (string): Name to add to groups to differentiate.
+
+        controls (list): Controls that will be driven by collision.
+
+        parent_control (string): Name of the transform that will drive all our of collisions so they stay in the right space.
+
+        collision_geometry (list): All the transforms of the meshes that will collide with our given controls.
+
+        geometry_parent (string): OPTIONAL. The name of the transform that will drive the given collision geometry so they stay in the right space.
+
+        collision_source (string): OPTIONAL. The name of the transform for the point in space to figure out collision direction. If none given, will use parent_control as collision source.
+
+        create_offset (bool): If True, will create an offset transform group above each control to be driven by the collision and drive the control.
+
+        create_blender (bool): If True, will create a blender node and attribute for each control to blend between using collision or not.
+
+        is_geometry_driven (bool): If True, will set up constraints for the given collision geometry.
+
+        reach (float): OPTIONAL. If given, each control is only connected to the geometry whose bounding box, grown by
+        this distance, holds the control. If None, every control is connected to every geometry.
+
+        frame_range (list): OPTIONAL. Start and end frame to sweep the geometry's bounding boxes over when using reach.
+
+        direction_mode (string): "source" pushes controls away from the collision source, "surface" along the normal
+        of the closest point on the collision geometry, see directions.
+
+        activation_distance (float): OPTIONAL. If given, each control's keepOut is bypassed while its weight is zero
+        or while it is further than this distance from the bounds of its geometry, see createGate. Needs create_blender
+        and create_offset or lean.
+
+        proxy_tolerance (float): OPTIONAL. If given, the controls collide with a low poly proxy of each geometry
+        instead of the geometry itself, made by merging the vertices in cubes of this size, see createProxies.
+        Use proxyReport to see how far the proxies deviate.
+
+        lean (bool): If True, builds every control with as few nodes as possible, see createLeanControl.
+        Use nodeReport to see the nodes made for each control.
+
+        profiler (profiler.Profiler): OPTIONAL. If given, records the time and scene operations of each phase and
+        each control of the build.
+
+    Returns:
+        (list): Nodes created.
+    """
+    created = []
+    steps = createSteps(scene, name, controls, parent_control, collision_geometry, geometry_parent, collision_source,
+                        create_offset, create_blender, is_geometry_driven, reach, frame_range, direction_mode,
+                        activation_distance, proxy_tolerance, lean, profiler)
+    for _, _, created in steps:
+        pass
+
+    return created
+
+
+def createSteps(scene, name, controls, parent_control, collision_geometry, geometry_parent=None, collision_source=None, create_offset=True, create_blender=True, is_geometry_driven=True, reach=None, frame_range=None, direction_mode='source', activation_distance=None, proxy_tolerance=None, lean=False, profiler=None):
+    """
+    Builds the collisions like create, one control at a time, so that the caller can do other work between controls,
+    such as keeping a GUI responsive, showing progress or cancelling. Takes the same arguments as create.
+    Nothing is done until the first step is asked for.
+
+    Yields:
+        (tuple): Amount of controls built, total amount of controls and the nodes created so far. The last step is
+        yielded after the module is committed and holds the nodes given back by the scene's commit.
+    """
+    if profiler:
+        scene = profiler.wrap(scene)
+
+    activation_distance = checkArguments(scene, controls, parent_control, collision_geometry, create_offset,
+                                         create_blender, activation_distance, lean)
+    layout = measure(scene, controls, parent_control, collision_geometry, collision_source, reach, frame_range,
+                     direction_mode, activation_distance)
+
+    # low poly proxies stand in for the collision geometry, following it with a wrap
+    proxy_group = None
+    proxies = [{'proxy': None, 'wrap': None, 'deviation': None, 'triangles': None} for _ in collision_geometry]
+    created = []
+    if proxy_tolerance is not None:
+        with scene.phase('proxies'):
+            proxy_group, created, proxies = createProxies(scene, name, layout['collision_geometry'], proxy_tolerance)
+
+    # makes collision geometry a muscle, geometry left a muscle by a deleted or other module is reused
+    with scene.phase('makeMuscle'):
+        muscles = getMuscles(scene, [proxy['proxy'] or geometry
+                                     for proxy, geometry in zip(proxies, layout['collision_geometry'])])
+
+    options = {'parent_control': layout['parent_control'], 'geometry_parent': geometry_parent,
+               'collision_source': collision_source, 'create_offset': create_offset, 'create_blender': create_blender,
+               'is_geometry_driven': is_geometry_driven, 'reach': reach,
+               'frame_range': list(frame_range) if frame_range else None, 'direction_mode': direction_mode,
+               'activation_distance': activation_distance, 'proxy_tolerance': proxy_tolerance, 'lean': lean}
+
+    for step in buildSteps(scene, name, layout, options, muscles, proxies, proxy_group, created):
+        yield step
+
+
+def checkArguments(scene, controls, parent_control, collision_geometry, create_offset, create_blender,
+                   activation_distance, lean):
+    """
+    Errors if a module cannot be built from the given arguments of create, warns about options that will be ignored.
+    Takes the arguments of create of the same names.
+
+    Returns:
+        (float): Activation distance to build with, None if gates cannot be built.
+    """
+    if not controls:
+        scene.error('Please specify controls')
+
+    if not collision_geometry:
+        scene.error('Please specify collision geometry')
+
+    if not parent_control:
+        scene.error('Please specify parent control')
+
+    if activation_distance is not None and not (create_blender and (create_offset or lean)):
+        scene.warning('Gating needs an offset and blend attribute, building without gates')
+        return None
+
+    return activation_distance
+
+
+def measure(scene, controls, parent_control, collision_geometry, collision_source=None, reach=None, frame_range=None,
+            direction_mode='source', activation_distance=None):
+    """
+    Resolves the nodes of a module and queries everything its controls are built from, see create for the arguments.
+
+    Returns:
+        (dictionary): Handles of the "controls", their "control_uuids", world "transforms", the geometry "reaches"
+        and push "directions" of each control, handles of the "parent_control" and "collision_geometry", the
+        "geometry_uuids" and gate "spheres" of each geometry, see gateSpheres, the spheres are None if there is no
+        activation distance.
+    """
+    # resolve all the nodes we are given once, then query every control's world transform in one pass
+    with scene.phase('resolve'):
+        controls = [scene.node(control) for control in controls]
+        collision_geometry = [scene.node(geometry) for geometry in collision_geometry]
+        parent_control = scene.node(parent_control)
+        collision_node = scene.node(collision_source) if collision_source else parent_control
+        transforms = scene.xform(controls + [collision_node])
+        collision_source_translation = transforms.pop()[0]
+
+        # UUIDs stay the same when nodes are renamed or reparented, so records can always be matched to their nodes
+        uuids = scene.uuids(controls + collision_geometry)
+
+    # broad phase, only connect controls to the geometry they could ever collide with
+    with scene.phase('broad phase'):
+        reaches = broadPhase(scene, [translation for translation, _ in transforms], collision_geometry, reach, frame_range)
+
+    # gates compare every control against the spheres around the geometry it collides with
+    spheres = None
+    if activation_distance is not None:
+        with scene.phase('gate spheres'):
+            spheres = gateSpheres(scene, collision_geometry)
+
+    # directions are found for every control at once so surface queries are batched
+    with scene.phase('directions'):
+        control_directions = directions(scene, [translation for translation, _ in transforms],
+                                        collision_source_translation, collision_geometry, direction_mode)
+
+    return {'controls': controls, 'control_uuids': uuids[:len(controls)], 'transforms': transforms,
+            'reaches': reaches, 'directions': control_directions, 'parent_control': parent_control,
+            'collision_geometry': collision_geometry, 'geometry_uuids': uuids[len(controls):],
+            'spheres': spheres}
+
+
+def buildControls(scene, layout, options, muscles, muscles_group):
+    """
+    Builds the collisions of every control of the given layout, one control at a time. Used by both create and
+    addControls, so controls added later are built the same way.
+
+    Args:
+        scene (scene.Scene): Scene to build the collisions in.
+
+        layout (dictionary): Nodes and queries of the controls, see measure.
+
+        options (dictionary): Options of the module as stored in its manifest, see getManifest.
+
+        muscles (list): Muscle object of each collision geometry.
+
+        muscles_group (object): Handle of the module's muscles master group.
+
+    Yields:
+        (tuple): Nodes created for a control and its manifest record.
+    """
+    activation_distance = options.get('activation_distance')
+    lean = options.get('lean', False)
+    for control, uuid, (control_translation, control_rotation), indices, direction in zip(
+            layout['controls'], layout['control_uuids'], layout['transforms'], layout['reaches'], layout['directions']):
+        with scene.phase('control', scene.name(control)):
+            nodes, record = createControl(scene, control, control_translation, control_rotation, muscles_group,
+                                          [muscles[index] for index in indices], direction, options['create_offset'],
+                                          options['create_blender'], lean)
+            record['uuid'] = uuid
+
+            if activation_distance is not None:
+                with scene.phase('gate'):
+                    record['gate'] = createGate(scene, record['control'], record['keep_out'], record['keep_out_shape'],
+                                                record['constraint'], record['blend'],
+                                                [layout['collision_geometry'][index] for index in indices],
+                                                [layout['spheres'][index] for index in indices], activation_distance,
+                                                blendAttributes(lean))
+                    nodes += record['gate']
+
+        yield nodes, record
+
+
+def buildSteps(scene, name, layout, options, muscles, proxies, proxy_group=None, created=None, grouped=None,
+               commit=True):
+    """
+    Builds a module one control at a time from what measure found, see createSteps.
+
+    Args:
+        scene (scene.Scene): Scene to build the collisions in.
+
+        name (string): Name of the collision module.
+
+        layout (dictionary): Nodes and queries of the module, see measure.
+
+        options (dictionary): Options of the module as stored in its manifest, see getManifest.
+
+        muscles (list): Muscle object of each collision geometry.
+
+        proxies (list): Proxy record of each collision geometry, see createProxies.
+
+        proxy_group (object): OPTIONAL. Handle of the group holding the proxies.
+
+        created (list): OPTIONAL. Nodes already made for the module, such as its proxies.
+
+        grouped (list): OPTIONAL. Whether each geometry is put under the module's collision group when the module is
+        geometry driven, all of them if None.
+
+        commit (bool): If False, the last step holds the nodes created without committing them, so more can be
+        built before one commit.
+
+    Yields:
+        (tuple): Amount of controls built, total amount of controls and the nodes created so far.
+    """
+    controls = layout['controls']
+    collision_geometry = layout['collision_geometry']
+    parent_control = layout['parent_control']
+    created = list(created or [])
+
+    # muscles group will hold all our nodes, this would usually go in the extras category of a rig
+    with scene.phase('master group'):
+        muscles_group = scene.group(name + '_muscles_master_grp')
+        scale_constraint = scene.scaleConstraint(parent_control, muscles_group)
+        created.append(scale_constraint)
+        created.append(muscles_group)
+
+    # the manifest records what was made for each control and geometry so the module can be found without searching
+    manifest = {'name': name, 'muscles_group': muscles_group, 'collision_group': None, 'proxy_group': proxy_group,
+                'controls': [],
+                'geometry': [dict([('geometry', geometry), ('uuid', uuid), ('muscle', muscle), ('parent', None),
+                                   ('group', None), ('constraint', None)] + list(proxy.items()))
+                             for geometry, uuid, muscle, proxy in zip(collision_geometry, layout['geometry_uuids'],
+                                                                      muscles, proxies)],
+                'options': options}
+
+    # iterate over all the controls and make collisions for each
+    counts = []
+    for nodes, record in buildControls(scene, layout, options, muscles, muscles_group):
+        counts.append(len(nodes))
+        created += nodes
+        manifest['controls'].append(record)
+        yield len(manifest['controls']), len(controls), created
+
+    scene.info('Built {} controls with {} to {} nodes each, {:.1f} on average'.format(
+        len(counts), min(counts), max(counts), float(sum(counts)) / len(counts)))
+
+    if options['is_geometry_driven']:
+        with scene.phase('geometry'):
+
+            # if no geometry parent is driven, the parent control will drive our geometry then
+            geometry_parent = scene.node(options['geometry_parent']) if options['geometry_parent'] else parent_control
+
+            # create a group for all our collision geometry
+            master_collision_group = scene.group(name + '_collision_grp')
+            scale_constraint = scene.scaleConstraint(geometry_parent, master_collision_group)
+            created.append(master_collision_group)
+            created.append(scale_constraint)
+            manifest['collision_group'] = master_collision_group
+
+            for index, record in enumerate(manifest['geometry']):
+                if grouped is None or grouped[index]:
+                    record.update(createGeometryGroup(scene, name, record['geometry'], geometry_parent,
+                                                      master_collision_group))
+                    created.append(record['group'])
+                    created.append(record['constraint'])
+
+    with scene.phase('manifest'):
+        scene.setData(muscles_group, manifest_attribute, manifest)
+
+    # scenes that queue operations run them all here
+    if commit:
+        with scene.phase('commit'):
+            created = scene.commit(created)
+
+    yield len(controls), len(controls), created
+
+
+def mirrorName(name, sides=('L', 'R')):
+    """
+    Gets the name of the node on the other side, swapping every underscore separated token of a side for the other.
+    With the default sides, L_arm_ctl becomes R_arm_ctl and arm_R_ctl becomes arm_L_ctl. Every name of a path is
+    mirrored and namespaces are kept, so |rig:L_arm_grp|rig:L_arm_ctl becomes |rig:R_arm_grp|rig:R_arm_ctl.
+
+    Args:
+        name (string): Name or full path to mirror.
+
+        sides (list): Left and right side tokens.
+
+    Returns:
+        (string): Mirrored name or path, the same if it has no side, such as nodes on the mirror plane.
+    """
+    left, right = sides
+    swap = {left: right, right: left}
+    names = []
+    for part in name.split('|'):
+        namespace, separator, short_name = part.rpartition(':')
+        names.append(namespace + separator + '_'.join([swap.get(token, token) for token in short_name.split('_')]))
+
+    return '|'.join(names)
+
+
+def mirrorNode(scene, node, sides=('L', 'R')):
+    """
+    Gets the node on the other side of the given node by its mirrored full path, see mirrorName, so short names
+    shared by several nodes, such as in referenced rigs, still find the right node.
+
+    Args:
+        scene (scene.Scene): Scene the nodes are in.
+
+        node (object): Handle of the node to mirror.
+
+        sides (list): Left and right side tokens.
+
+    Returns:
+        (object): Handle of the mirrored node, the given node if its name has no side.
+    """
+    path = scene.path(node)
+    mirrored = mirrorName(path, sides)
+    return node if mirrored == path else scene.node(mirrored)
+
+
+def mirrorLayout(scene, layout, mirror_axis='x', sides=('L', 'R')):
+    """
+    Gets the layout of the other side of a module by reflecting the given one across the plane through the world origin
+    facing the mirror axis, see measure. Only the names and UUIDs of the mirrored nodes are looked up, their
+    transforms, push directions, broad phase and gate spheres are reflected, so the rig and collision geometry
+    are expected to be symmetric.
+
+    Args:
+        scene (scene.Scene): Scene the nodes are in.
+
+        layout (dictionary): Layout of the side that was measured.
+
+        mirror_axis (string): World axis the mirror plane faces, "x", "y" or "z".
+
+        sides (list): Left and right side tokens, see mirrorName.
+
+    Returns:
+        (dictionary): Layout of the mirrored side.
+    """
+    axis = mirror_axes.index(mirror_axis)
+    controls = [mirrorNode(scene, control, sides) for control in layout['controls']]
+    for control, mirrored in zip(layout['controls'], controls):
+        if mirrored == control:
+            scene.error(scene.name(control) + ' has no side to mirror, controls on the mirror plane cannot be mirrored')
+
+    collision_geometry = [mirrorNode(scene, geometry, sides) for geometry in layout['collision_geometry']]
+    uuids = scene.uuids(controls + collision_geometry)
+
+    # reflecting a position flips the axis the plane faces, reflecting a rotation keeps the angle around that axis
+    # and flips the other two, whatever the rotation order
+    def reflect(vector):
+        return [-value if index == axis else value for index, value in enumerate(vector)]
+
+    def reflectRotation(rotation):
+        return [value if index == axis else -value for index, value in enumerate(rotation)]
+
+    # gate spheres are in the space of their geometry, which is mirrored along with them, so only the center flips,
+    # geometry without a side is shared by both modules and keeps its sphere
+    spheres = layout['spheres'] and [sphere if mirrored == geometry else (reflect(sphere[0]), sphere[1])
+                                     for geometry, mirrored, sphere in zip(layout['collision_geometry'],
+                                                                           collision_geometry, layout['spheres'])]
+
+    return {'controls': controls, 'control_uuids': uuids[:len(controls)],
+            'transforms': [(reflect(translation), reflectRotation(rotation)) for translation, rotation in layout['transforms']],
+            'reaches': layout['reaches'], 'directions': [reflect(direction) for direction in layout['directions']],
+            'parent_control': mirrorNode(scene, layout['parent_control'], sides),
+            'collision_geometry': collision_geometry, 'geometry_uuids': uuids[len(controls):],
+            'spheres': spheres}
+
+
+def createMirrored(scene, name, controls, parent_control, collision_geometry, geometry_parent=None, collision_source=None, create_offset=True, create_blender=True, is_geometry_driven=True, reach=None, frame_range=None, direction_mode='source', activation_distance=None, proxy_tolerance=None, lean=False, mirror_axis='x', sides=('L', 'R'), mirror_name=None, profiler=None):
+    """
+    Creates a collision module for the given controls and a second module for the controls on the other side of the
+    mirror plane, found by name, see mirrorName. Only the given side is queried, the other side's transforms and
+    push directions are reflected from it, see mirrorLayout, and both modules are committed at once, so a pair costs
+    about as much as one module. Geometry whose name has no side, such as a body on the mirror plane, is used by
+    both modules and only put under the given side's collision group.
+    Takes the same arguments as create, and:
+
+    Args:
+        mirror_axis (string): World axis the mirror plane through the origin faces, "x", "y" or "z".
+
+        sides (list): Left and right side tokens swapped in the names of the nodes to find the other side.
+
+        mirror_name (string): OPTIONAL. Name of the mirrored module, the given name mirrored if None.
+
+    Returns:
+        (list): Nodes created for both modules.
+    """
+    created = []
+    steps = createMirroredSteps(scene, name, controls, parent_control, collision_geometry, geometry_parent,
+                                collision_source, create_offset, create_blender, is_geometry_driven, reach,
+                                frame_range, direction_mode, activation_distance, proxy_tolerance, lean, mirror_axis,
+                                sides, mirror_name, profiler)
+    for _, _, created in steps:
+        pass
+
+    return created
+
+
+def createMirroredSteps(scene, name, controls, parent_control, collision_geometry, geometry_parent=None, collision_source=None, create_offset=True, create_blender=True, is_geometry_driven=True, reach=None, frame_range=None, direction_mode='source', activation_distance=None, proxy_tolerance=None, lean=False, mirror_axis='x', sides=('L', 'R'), mirror_name=None, profiler=None):
+    """
+    Builds a mirrored pair of modules like createMirrored, one control at a time, see createSteps.
+    Takes the same arguments as createMirrored.
+
+    Yields:
+        (tuple): Amount of controls built, total amount of controls of both sides and the nodes created so far.
+        The last step is yielded after both modules are committed.
+    """
+    if profiler:
+        scene = profiler.wrap(scene)
+
+    activation_distance = checkArguments(scene, controls, parent_control, collision_geometry, create_offset,
+                                         create_blender, activation_distance, lean)
+    if mirror_axis not in mirror_axes:
+        scene.error('Mirror axis must be one of ' + ', '.join(mirror_axes) + ', not ' + str(mirror_axis))
+
+    mirror_name = mirror_name or mirrorName(name, sides)
+    if mirror_name == name:
+        scene.error(name + ' has no side to mirror, please specify a mirror name')
+
+    layout = measure(scene, controls, parent_control, collision_geometry, collision_source, reach, frame_range,
+                     direction_mode, activation_distance)
+    with scene.phase('mirror'):
+        mirrored = mirrorLayout(scene, layout, mirror_axis, sides)
+
+    for control, uuid in zip(mirrored['controls'], mirrored['control_uuids']):
+        if uuid in layout['control_uuids']:
+            scene.error(scene.name(control) + ' is given along with its mirror, only give the controls of one side')
+
+    # geometry on the mirror plane is shared, so proxies and muscles are made once for both sides
+    geometry = OrderedDict()
+    for side, layout_side in [(name, layout), (mirror_name, mirrored)]:
+        for node, uuid in zip(layout_side['collision_geometry'], layout_side['geometry_uuids']):
+            geometry.setdefault(uuid, (node, []))[1].append(side)
+
+    nodes = [node for node, _ in geometry.values()]
+    proxy_group = None
+    proxies = dict([(uuid, {'proxy': None, 'wrap': None, 'deviation': None, 'triangles': None}) for uuid in geometry])
+    created = []
+    if proxy_tolerance is not None:
+        with scene.phase('proxies'):
+            proxy_group, created, records = createProxies(scene, name, nodes, proxy_tolerance,
+                                                          [users for _, users in geometry.values()])
+            proxies = dict(zip(geometry, records))
+
+    with scene.phase('makeMuscle'):
+        muscles = dict(zip(geometry, getMuscles(scene, [proxies[uuid]['proxy'] or node
+                                                        for uuid, (node, _) in geometry.items()])))
+
+    def mirrorOption(node):
+        return mirrorNode(scene, scene.node(node), sides) if node else None
+
+    options = {'parent_control': layout['parent_control'], 'geometry_parent': geometry_parent,
+               'collision_source': collision_source, 'create_offset': create_offset, 'create_blender': create_blender,
+               'is_geometry_driven': is_geometry_driven, 'reach': reach,
+               'frame_range': list(frame_range) if frame_range else None, 'direction_mode': direction_mode,
+               'activation_distance': activation_distance, 'proxy_tolerance': proxy_tolerance, 'lean': lean}
+    mirrored_options = dict(options, parent_control=mirrored['parent_control'],
+                            geometry_parent=mirrorOption(geometry_parent),
+                            collision_source=mirrorOption(collision_source))
+
+    total = len(layout['controls']) * 2
+    done = 0
+    for side, layout_side, side_options, grouped in [
+            (name, layout, options, None),
+            (mirror_name, mirrored, mirrored_options, [uuid not in layout['geometry_uuids']
+                                                       for uuid in mirrored['geometry_uuids']])]:
+        steps = buildSteps(scene, side, layout_side, side_options,
+                           [muscles[uuid] for uuid in layout_side['geometry_uuids']],
+                           [proxies[uuid] for uuid in layout_side['geometry_uuids']],
+                           proxy_group, created, grouped, commit=False)
+        for built, _, created in steps:
+            yield done + built, total, created
+
+        done += len(layout_side['controls'])
+
+    # both modules are queued before one commit
+    with scene.phase('commit'):
+        created = scene.commit(created)
+
+    yield total, total, created
+
+
+def getMusclesGroup(scene, name):
+    """
+    Gets the muscles master group of the given collision module.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module, as given to create.
+
+    Returns:
+        (object): Handle of the muscles master group.
+    """
+    muscles_group = name + '_muscles_master_grp'
+    if not scene.exists(muscles_group):
+        scene.error('Could not find collision module ' + name + ', ' + muscles_group + ' does not exist')
+
+    return scene.node(muscles_group)
+
+
+def getManifest(scene, name):
+    """
+    Gets the manifest of the given collision module. The manifest holds the name of every node made for the module:
+    "muscles_group", "collision_group" and "proxy_group", a record of the "controls" with their "control", original "parent",
+    "group", "locator", "keep_out", "keep_out_shape", "driven", "offset", "constraint", "blend" and "gate" nodes,
+    a record of
+    the "geometry" with their "geometry", "muscle", original "parent", "group", "constraint", "proxy", "wrap"
+    nodes, proxy "deviation" and "triangles" counts, and the "options"
+    given to create. Nodes that were not made are None.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module, as given to create.
+
+    Returns:
+        (dictionary): Manifest of the module.
+    """
+    manifest = scene.getData(getMusclesGroup(scene, name), manifest_attribute)
+    if manifest is None:
+        scene.error(name + ' has no manifest, it was created before modules stored one')
+
+    return manifest
+
+
+def exportManifest(scene, name, path):
+    """
+    Writes the manifest of the given collision module to a JSON file.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+        path (string): Path of the JSON file to write.
+
+    Returns:
+        (string): Path written to.
+    """
+    with open(path, 'w') as open_file:
+        json.dump(getManifest(scene, name), open_file, indent=4, sort_keys=True)
+
+    return path
+
+
+def getRecords(scene, records, key, nodes):
+    """
+    Gets the manifest records of the given nodes.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        records (list): Records of the manifest to look through.
+
+        key (string): Key of the records holding the node's name, such as "control" or "geometry".
+
+        nodes (list): Names, UUIDs or handles of the nodes to get records of.
+
+    Returns:
+        (list): Records found, the nodes without a record are warned about.
+    """
+    nodes = [scene.node(node) for node in nodes]
+    uuids = scene.uuids(nodes)
+    by_uuid = dict(zip(recordUuids(scene, records, key), records))
+    [scene.warning(scene.name(node) + ' is not part of the collision module')
+     for node, uuid in zip(nodes, uuids) if uuid not in by_uuid]
+    return [by_uuid[uuid] for uuid in uuids if uuid in by_uuid]
+
+
+def recordUuids(scene, records, key):
+    """
+    Gets the UUID of the node of each manifest record. Records written before manifests held UUIDs have theirs
+    looked up from the node's name.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        records (list): Records of the manifest.
+
+        key (string): Key of the records holding the node's name, such as "control" or "geometry".
+
+    Returns:
+        (list): UUID of each record's node.
+    """
+    old = [record for record in records if not record.get('uuid')]
+    looked_up = dict(zip([id(record) for record in old], scene.uuids([scene.node(record[key]) for record in old])))
+    return [record.get('uuid') or looked_up[id(record)] for record in records]
+
+
+def teardownControl(scene, record):
+    """
+    Puts the control of the given record back the way it was before the collision module drove it.
+    The keepOut is left for the caller to delete, unless the control was built lean.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        record (dictionary): Manifest record of the control.
+
+    Returns:
+        (list): Handles of the nodes made for the control that should be deleted.
+    """
+    nodes = []
+    control = scene.node(record.get('uuid') or record['control'])
+
+    if record['offset']:
+        control = scene.parent(control, scene.node(record['parent']) if record['parent'] else None)
+
+        # lean controls have their keepOut above the offset instead of under the muscles group
+        nodes.append(scene.node(record['offset'] if record['group'] else record['keep_out']))
+    else:
+        nodes.append(scene.node(record['constraint']))
+
+    if record['blend']:
+        scene.deleteAttr(control, 'autoCollisionWeight')
+        nodes.append(scene.node(record['blend']))
+
+    nodes += [scene.node(node) for node in record.get('gate') or []]
+
+    return nodes
+
+
+def teardownGeometry(scene, record):
+    """
+    Puts the geometry of the given record back under its original parent. Its proxy is left for the caller to release,
+    see releaseProxies.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        record (dictionary): Manifest record of the geometry.
+
+    Returns:
+        (list): Handles of the nodes made for the geometry that should be deleted.
+    """
+    nodes = []
+    if record['group']:
+        scene.parent(scene.node(record.get('uuid') or record['geometry']),
+                     scene.node(record['parent']) if record['parent'] else None)
+        nodes.append(scene.node(record['group']))
+
+    return nodes
+
+
+def delete(scene, name):
+    """
+    Deletes the given collision module, putting every control and geometry back under its original parent.
+    Geometry stays a muscle object and proxies other modules use are kept, so that those modules keep working.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+    Returns:
+        (dictionary): Manifest of the module deleted.
+    """
+    manifest = getManifest(scene, name)
+    nodes = []
+    for record in manifest['controls']:
+        nodes += teardownControl(scene, record)
+
+    for record in manifest['geometry']:
+        nodes += teardownGeometry(scene, record)
+
+    nodes += releaseProxies(scene, name, manifest, manifest['geometry'])
+
+    # keepOuts and geometry groups go with the master groups
+    nodes.append(scene.node(manifest['muscles_group']))
+    if manifest['collision_group']:
+        nodes.append(scene.node(manifest['collision_group']))
+
+    scene.delete(nodes)
+    scene.commit([])
+    return manifest
+
+
+def rebuild(scene, name):
+    """
+    Deletes the given collision module and creates it again with the same controls, geometry and options.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+    Returns:
+        (list): Nodes created.
+    """
+    manifest = delete(scene, name)
+    options = manifest['options']
+    # UUIDs still find controls whose recorded paths changed when they were put back under their parents
+    return create(scene, name, [record.get('uuid') or record['control'] for record in manifest['controls']],
+                  options['parent_control'],
+                  [record.get('uuid') or record['geometry'] for record in manifest['geometry']],
+                  options['geometry_parent'],
+                  options['collision_source'], options['create_offset'], options['create_blender'],
+                  options['is_geometry_driven'], options['reach'], options['frame_range'],
+                  options.get('direction_mode', 'source'), options.get('activation_distance'),
+                  options.get('proxy_tolerance'), options.get('lean', False))
+
+
+def getMuscles(scene, collision_geometry):
+    """
+    Gets the muscle object of each given geometry, only making muscles out of the geometry that is not one yet.
+
+    Args:
+        scene (scene.Scene): Scene the geometry is in.
+
+        collision_geometry (list): Handles of the geometry.
+
+    Returns:
+        (list): Muscle object of each geometry.
+    """
+    muscles = [scene.findMuscle(geometry) for geometry in collision_geometry]
+    missing = [geometry for geometry, muscle in zip(collision_geometry, muscles) if muscle is None]
+    made = iter(scene.makeMuscle(missing) if missing else [])
+    return [next(made) if muscle is None else muscle for muscle in muscles]
+
+
+def addControls(scene, name, controls):
+    """
+    Adds controls to an existing collision module, only building the nodes of the new controls.
+    The options the module was created with are read from its manifest.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+        controls (list): Controls to add, that will be driven by collision.
+
+    Returns:
+        (list): Nodes created.
+    """
+    if not controls:
+        scene.error('Please specify controls')
+
+    manifest = getManifest(scene, name)
+    options = manifest['options']
+    layout = measure(scene, controls, options['parent_control'],
+                     [record.get('uuid') or record['geometry'] for record in manifest['geometry']],
+                     options['collision_source'], options['reach'], options['frame_range'],
+                     options.get('direction_mode', 'source'),
+                     options.get('activation_distance'))
+
+    existing = recordUuids(scene, manifest['controls'], 'control')
+    for control, uuid in zip(layout['controls'], layout['control_uuids']):
+        if uuid in existing:
+            scene.error(scene.name(control) + ' already has collisions in ' + name)
+
+    created = []
+    muscles_group = scene.node(manifest['muscles_group'])
+    muscles = [scene.node(record['muscle']) for record in manifest['geometry']]
+    for nodes, record in buildControls(scene, layout, options, muscles, muscles_group):
+        created += nodes
+        manifest['controls'].append(record)
+
+    scene.setData(muscles_group, manifest_attribute, manifest)
+    return scene.commit(created)
+
+
+def removeControls(scene, name, controls):
+    """
+    Removes controls from an existing collision module, deleting only their nodes and putting each control back
+    under its original parent.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+        controls (list): Controls to stop driving with collision.
+
+    Returns:
+        (list): Nodes created, always empty.
+    """
+    manifest = getManifest(scene, name)
+    removed = getRecords(scene, manifest['controls'], 'control', controls)
+    nodes = []
+    for record in removed:
+        nodes += teardownControl(scene, record)
+        if record['group']:
+            nodes.append(scene.node(record['keep_out']))
+
+    manifest['controls'] = [record for record in manifest['controls'] if record not in removed]
+    scene.setData(scene.node(manifest['muscles_group']), manifest_attribute, manifest)
+    if nodes:
+        scene.delete(nodes)
+
+    return scene.commit([])
+
+
+def addGeometry(scene, name, collision_geometry):
+    """
+    Makes every control of an existing collision module collide with more geometry.
+    The options the module was created with are read from its manifest.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+        collision_geometry (list): Transforms of the meshes to add.
+
+    Returns:
+        (list): Nodes created.
+    """
+    if not collision_geometry:
+        scene.error('Please specify collision geometry')
+
+    manifest = getManifest(scene, name)
+    options = manifest['options']
+    existing = recordUuids(scene, manifest['geometry'], 'geometry')
+    collision_geometry = [scene.node(geometry) for geometry in collision_geometry]
+    uuids = scene.uuids(collision_geometry)
+    for geometry, uuid in zip(collision_geometry, uuids):
+        if uuid in existing:
+            scene.error(scene.name(geometry) + ' already collides with ' + name)
+
+    created = []
+    proxies = [{'proxy': None, 'wrap': None, 'deviation': None, 'triangles': None} for _ in collision_geometry]
+    if options.get('proxy_tolerance') is not None:
+        manifest['proxy_group'], nodes, proxies = createProxies(scene, name, collision_geometry,
+                                                                options['proxy_tolerance'])
+        created += nodes
+
+    muscles = getMuscles(scene, [proxy['proxy'] or geometry for proxy, geometry in zip(proxies, collision_geometry)])
+    # keepOuts are rigged on the group, or on the offset of lean controls
+    groups = [scene.node(record['group'] or record['offset']) for record in manifest['controls']]
+    positions = [translation for translation, _ in scene.xform(groups)] if groups else []
+    reaches = broadPhase(scene, positions, collision_geometry, options['reach'], options['frame_range'])
+
+    for group, indices in zip(groups, reaches):
+        if indices:
+            scene.keepOutAddMuscle(group, [muscles[index] for index in indices])
+
+    records = [dict([('geometry', geometry), ('uuid', uuid), ('muscle', muscle), ('parent', None), ('group', None),
+                     ('constraint', None)] + list(proxy.items()))
+               for geometry, uuid, muscle, proxy in zip(collision_geometry, uuids, muscles, proxies)]
+
+    if options['is_geometry_driven']:
+        geometry_parent = scene.node(options['geometry_parent'] or options['parent_control'])
+
+        if manifest['collision_group']:
+            master_collision_group = scene.node(manifest['collision_group'])
+        else:
+            master_collision_group = scene.group(name + '_collision_grp')
+            created.append(master_collision_group)
+            created.append(scene.scaleConstraint(geometry_parent, master_collision_group))
+            manifest['collision_group'] = master_collision_group
+
+        for record in records:
+            record.update(createGeometryGroup(scene, name, record['geometry'], geometry_parent, master_collision_group))
+            created.append(record['group'])
+            created.append(record['constraint'])
+
+    manifest['geometry'] += records
+    created += regate(scene, manifest)
+    scene.setData(scene.node(manifest['muscles_group']), manifest_attribute, manifest)
+    return scene.commit(created)
+
+
+def removeGeometry(scene, name, collision_geometry):
+    """
+    Stops every control of an existing collision module from colliding with the given geometry.
+    Geometry the module drives is put back under its original parent. The geometry stays a muscle object so that
+    other modules using it keep working.
+
+    Args:
+        scene (scene.Scene): Scene the module is in.
+
+        name (string): Name of the collision module.
+
+        collision_geometry (list): Transforms of the meshes to remove.
+
+    Returns:
+        (list): Nodes created, the new gates of the controls if the module is gated.
+    """
+    manifest = getManifest(scene, name)
+    removed = getRecords(scene, manifest['geometry'], 'geometry', collision_geometry)
+    muscles = [scene.node(record['muscle']) for record in removed]
+    nodes = []
+
+    if muscles:
+        [scene.keepOutRemoveMuscle(scene.node(record['group'] or record['offset']), muscles)
+         for record in manifest['controls']]
+
+    for record in removed:
+        nodes += teardownGeometry(scene, record)
+
+    nodes += releaseProxies(scene, name, manifest, removed)
+
+    manifest['geometry'] = [record for record in manifest['geometry'] if record not in removed]
+    created = regate(scene, manifest) if removed else []
+    scene.setData(scene.node(manifest['muscles_group']), manifest_attribute, manifest)
+    if nodes:
+        scene.delete(nodes)
+
+    return scene.commit(created)
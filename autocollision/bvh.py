@@ -0,0 +1,216 @@
+import numpy
+from . import solver
+
+
+def mortonCodes(positions):
+    """
+    Gets the 30 bit Morton code of each position, sorting by these keeps positions close in space close in memory.
+
+    Args:
+        positions (numpy.ndarray): N x 3 positions.
+
+    Returns:
+        (numpy.ndarray): N Morton codes.
+    """
+    minimum = positions.min(axis=0)
+    size = positions.max(axis=0) - minimum
+    size[size == 0.0] = 1.0
+    cells = numpy.clip(((positions - minimum) / size * 1023.0).astype(numpy.int64), 0, 1023)
+
+    codes = numpy.zeros(len(positions), dtype=numpy.int64)
+    for bit in range(10):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> bit) & 1) << (bit * 3 + (2 - axis))
+
+    return codes
+
+
+class BVH(object):
+    """
+    Bounding volume hierarchy over the triangles of a mesh, stored in flat arrays as a complete binary tree.
+    Node i has children 2i + 1 and 2i + 2, the last leaf_count nodes are the leaves, each holding leaf_size
+    consecutive triangles of order. Triangles are sorted along a Morton curve so each leaf stays compact.
+    When the mesh deforms, use refit to update the bounds instead of building a new tree.
+    """
+    def __init__(self, points, triangles, leaf_size=4):
+        """
+        Builds the hierarchy.
+
+        Args:
+            points (numpy.ndarray): P x 3 positions of the mesh's vertices.
+
+            triangles (numpy.ndarray): T x 3 vertex indices of each triangle.
+
+            leaf_size (int): Maximum amount of triangles in a leaf.
+        """
+        self.triangles = numpy.asarray(triangles, dtype=numpy.int64)
+        self.leaf_size = leaf_size
+        self.depth = 0
+        while 2 ** self.depth * leaf_size < len(self.triangles):
+            self.depth += 1
+
+        self.leaf_count = 2 ** self.depth
+        self.node_count = 2 * self.leaf_count - 1
+        self.minimums = numpy.zeros((self.node_count, 3))
+        self.maximums = numpy.zeros((self.node_count, 3))
+
+        points = numpy.asarray(points, dtype=numpy.float64)
+        centers = points[self.triangles].mean(axis=1)
+        self.order = numpy.argsort(mortonCodes(centers), kind='stable') if len(centers) else numpy.zeros(0, numpy.int64)
+
+        # leaf slots past the last triangle point to -1 and keep empty bounds
+        slots = numpy.full(self.leaf_count * leaf_size, -1, dtype=numpy.int64)
+        slots[:len(self.order)] = self.order
+        self.slots = slots.reshape(self.leaf_count, leaf_size)
+        self.refit(points)
+
+    def refit(self, points):
+        """
+        Updates the bounds of every node to the given deformed positions of the same mesh, bottom up one level at a time.
+
+        Args:
+            points (numpy.ndarray): P x 3 positions of the mesh's vertices.
+        """
+        self.points = numpy.asarray(points, dtype=numpy.float64)
+        self.vertices, self.first_edges, self.second_edges = solver.prepare((self.points, self.triangles))
+
+        corners = self.points[self.triangles]
+        triangle_minimums = numpy.vstack([corners.min(axis=1), numpy.full((1, 3), numpy.inf)])
+        triangle_maximums = numpy.vstack([corners.max(axis=1), numpy.full((1, 3), -numpy.inf)])
+
+        first_leaf = self.leaf_count - 1
+        self.minimums[first_leaf:] = triangle_minimums[self.slots].min(axis=1)
+        self.maximums[first_leaf:] = triangle_maximums[self.slots].max(axis=1)
+
+        for level in range(self.depth - 1, -1, -1):
+            start = 2 ** level - 1
+            end = 2 * start + 1
+            children = slice(end, 2 * end + 1)
+            self.minimums[start:end] = self.minimums[children].reshape(-1, 2, 3).min(axis=1)
+            self.maximums[start:end] = self.maximums[children].reshape(-1, 2, 3).max(axis=1)
+
+    def raycast(self, origins, rays, max_distance=numpy.inf, hints=None):
+        """
+        Finds the closest triangle in front of each ray. All rays walk down the tree together, one level per step,
+        skipping nodes they miss or that are further than the closest hit found so far.
+
+        Args:
+            origins (numpy.ndarray): N x 3 origins of the rays.
+
+            rays (numpy.ndarray): N x 3 directions of the rays.
+
+            max_distance (float): Length of the segments to test, scalar or one per ray.
+
+            hints (numpy.ndarray): OPTIONAL. N triangle indices, -1 for none, tested before walking the tree.
+            A ray that hits its hint starts with that distance as its closest, so it skips every node behind it.
+            Giving each ray the triangle it hit on the previous frame makes coherent rays visit few nodes.
+
+        Returns:
+            (tuple): N distances to the closest hit or inf if none, N triangle indices of the closest hit or -1 if none,
+            and N booleans of whether the closest hit is leaving the mesh.
+        """
+        origins = numpy.asarray(origins, dtype=numpy.float64)
+        rays = numpy.asarray(rays, dtype=numpy.float64)
+        nearest = numpy.empty(len(origins))
+        nearest[:] = max_distance
+        hits = numpy.full(len(origins), -1, dtype=numpy.int64)
+        exiting = numpy.zeros(len(origins), dtype=bool)
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            inverse_rays = 1.0 / rays
+
+        if hints is not None:
+            hints = numpy.asarray(hints, dtype=numpy.int64)
+            hinted = numpy.flatnonzero((hints >= 0) & (hints < len(self.triangles)))
+            if len(hinted):
+                self._testTriangles(origins, rays, hinted, hints[hinted], nearest, hits, exiting)
+
+        first_leaf = self.leaf_count - 1
+        ray_ids = numpy.arange(len(origins))
+        nodes = numpy.zeros(len(origins), dtype=numpy.int64)
+
+        while len(ray_ids):
+            # slab test against the bounds of each node, fmin and fmax ignore the NaNs of axis aligned rays
+            with numpy.errstate(invalid='ignore'):
+                near_planes = (self.minimums[nodes] - origins[ray_ids]) * inverse_rays[ray_ids]
+                far_planes = (self.maximums[nodes] - origins[ray_ids]) * inverse_rays[ray_ids]
+
+            enter = numpy.fmin(near_planes, far_planes).max(axis=1)
+            leave = numpy.fmax(near_planes, far_planes).min(axis=1)
+            keep = (enter <= leave) & (leave >= 0.0) & (enter <= nearest[ray_ids])
+            ray_ids = ray_ids[keep]
+            nodes = nodes[keep]
+
+            leaves = nodes >= first_leaf
+            if leaves.any():
+                self._testLeaves(origins, rays, ray_ids[leaves], nodes[leaves] - first_leaf, nearest, hits, exiting)
+
+            ray_ids = numpy.repeat(ray_ids[~leaves], 2)
+            nodes = numpy.repeat(nodes[~leaves] * 2, 2) + numpy.tile([1, 2], len(ray_ids) // 2)
+
+        nearest[hits < 0] = numpy.inf
+        return nearest, hits, exiting
+
+    def _testLeaves(self, origins, rays, ray_ids, leaves, nearest, hits, exiting):
+        """
+        Intersects rays with the triangles of the given leaves and keeps the closest hit of each ray.
+
+        Args:
+            origins (numpy.ndarray): N x 3 origins of all the rays.
+
+            rays (numpy.ndarray): N x 3 directions of all the rays.
+
+            ray_ids (numpy.ndarray): Index of each ray reaching a leaf.
+
+            leaves (numpy.ndarray): Index of the leaf each ray reached.
+
+            nearest (numpy.ndarray): Closest distance of each ray so far, updated in place.
+
+            hits (numpy.ndarray): Closest triangle of each ray so far, updated in place.
+
+            exiting (numpy.ndarray): Whether the closest hit of each ray leaves the mesh, updated in place.
+        """
+        triangles = self.slots[leaves].ravel()
+        ray_ids = numpy.repeat(ray_ids, self.leaf_size)
+        valid = triangles >= 0
+        self._testTriangles(origins, rays, ray_ids[valid], triangles[valid], nearest, hits, exiting)
+
+    def _testTriangles(self, origins, rays, ray_ids, triangles, nearest, hits, exiting):
+        """
+        Intersects rays with triangles, pair by pair, and keeps the closest hit of each ray.
+
+        Args:
+            origins (numpy.ndarray): N x 3 origins of all the rays.
+
+            rays (numpy.ndarray): N x 3 directions of all the rays.
+
+            ray_ids (numpy.ndarray): Index of the ray of each pair.
+
+            triangles (numpy.ndarray): Index of the triangle of each pair.
+
+            nearest (numpy.ndarray): Closest distance of each ray so far, updated in place.
+
+            hits (numpy.ndarray): Closest triangle of each ray so far, updated in place.
+
+            exiting (numpy.ndarray): Whether the closest hit of each ray leaves the mesh, updated in place.
+        """
+        distances, backs = solver.rayTriangle(origins[ray_ids], rays[ray_ids], self.vertices[triangles],
+                                              self.first_edges[triangles], self.second_edges[triangles])
+        closer = distances > solver.epsilon
+        closer[closer] = distances[closer] < nearest[ray_ids[closer]]
+        if not closer.any():
+            return
+
+        distances = distances[closer]
+        ray_ids = ray_ids[closer]
+        triangles = triangles[closer]
+        backs = backs[closer]
+
+        # sort by ray then distance so the first pair of each ray is its closest one
+        sort = numpy.lexsort((distances, ray_ids))
+        first = numpy.ones(len(sort), dtype=bool)
+        first[1:] = ray_ids[sort][1:] != ray_ids[sort][:-1]
+        closest = sort[first]
+        nearest[ray_ids[closest]] = distances[closest]
+        hits[ray_ids[closest]] = triangles[closest]
+        exiting[ray_ids[closest]] = backs[closest]
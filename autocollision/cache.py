@@ -0,0 +1,61 @@
+import os
+import json
+import numpy
+
+
+def metadataPath(path):
+    """
+    Gets the path of the JSON file that describes the given cache.
+
+    Args:
+        path (string): Path of the cache's .npy file.
+
+    Returns:
+        (string): Path of the cache's metadata.
+    """
+    return os.path.splitext(path)[0] + '.json'
+
+
+def create(path, start_frame, end_frame, controls):
+    """
+    Creates a cache file for the collision offsets of the given controls over the given frames, filled with zeros.
+    Offsets are stored as a frames x controls x 3 float32 array that can be memory mapped.
+
+    Args:
+        path (string): Path of the .npy file to write.
+
+        start_frame (int): First frame of the cache.
+
+        end_frame (int): Last frame of the cache, included.
+
+        controls (list): Names of the controls, in the order they are stored in.
+
+    Returns:
+        (numpy.memmap): Writable offsets of the cache, flush it or let it be garbage collected to write it to disk.
+    """
+    frame_count = int(end_frame) - int(start_frame) + 1
+    offsets = numpy.lib.format.open_memmap(path, mode='w+', dtype=numpy.float32, shape=(frame_count, len(controls), 3))
+
+    metadata = {'start_frame': int(start_frame), 'end_frame': int(end_frame), 'controls': list(controls)}
+    with open(metadataPath(path), 'w') as open_file:
+        json.dump(metadata, open_file, indent=4)
+
+    return offsets
+
+
+def load(path, mode='r'):
+    """
+    Memory maps the given cache.
+
+    Args:
+        path (string): Path of the cache's .npy file.
+
+        mode (string): Memory map mode, "r" to read only, "r+" to modify the cache in place.
+
+    Returns:
+        (tuple): Offsets as a frames x controls x 3 numpy.memmap and the metadata dictionary of the cache.
+    """
+    with open(metadataPath(path)) as open_file:
+        metadata = json.load(open_file)
+
+    return numpy.load(path, mmap_mode=mode), metadata
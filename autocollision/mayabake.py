@@ -0,0 +1,339 @@
+import json
+import numpy
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+from . import builder
+from . import cache
+from . import offline
+
+
+live_attribute = 'autoCollisionLiveDriver'
+gate_attribute = 'autoCollisionGateDriver'
+cache_suffix = '_collisionCache'
+
+
+def findOffsets(name):
+    """
+    Finds the collision offsets of the given module from its manifest, or by following the point constraints of its
+    locators for modules without one.
+
+    Args:
+        name (string): Name of the collision module, as given to create.
+
+    Returns:
+        (list): (offset, control) full path tuples for each control of the module.
+    """
+    master = name + '_muscles_master_grp'
+    if not cmds.objExists(master):
+        cmds.error('Could not find ' + master)
+
+    offsets = []
+    if cmds.attributeQuery(builder.manifest_attribute, n=master, ex=True):
+        records = json.loads(cmds.getAttr(master + '.' + builder.manifest_attribute))['controls']
+        # lean controls are moved by their keepOut's driven group, there is no constrained offset to bake
+        offsets = [(cmds.ls(record['offset'], l=True)[0], cmds.ls(record['control'], l=True)[0])
+                   for record in records if record['offset'] and record.get('group')]
+    else:
+        # modules created before manifests were stored are found through their locators
+        locators = cmds.listRelatives(master, ad=True, type='locator', f=True) or []
+        for locator in reversed(locators):
+            transform = cmds.listRelatives(locator, p=True, f=True)[0]
+            constraints = cmds.listConnections(transform, s=False, d=True, type='pointConstraint') or []
+            for constraint in sorted(set(constraints)):
+                offset = cmds.listRelatives(constraint, p=True, f=True)[0]
+                children = cmds.listRelatives(offset, c=True, type='transform', f=True) or []
+                controls = [child for child in children if cmds.nodeType(child) != 'pointConstraint']
+                offsets.append((offset, controls[0]))
+
+    if not offsets:
+        cmds.error(name + ' has no collision offsets to bake, it must be created with create_offset on and lean off')
+
+    return offsets
+
+
+def findKeepOut(offset):
+    """
+    Finds the keepOut driving the given collision offset by following its point constraint back to the locator.
+
+    Args:
+        offset (string): Full path of the collision offset.
+
+    Returns:
+        (tuple): Full paths of the keepOut transform and its cMuscleKeepOut node.
+    """
+    constraint = cmds.listRelatives(offset, c=True, type='pointConstraint', f=True)[0]
+    locator = cmds.listConnections(constraint + '.target[0].targetParentMatrix', s=True, d=False)[0]
+    locator = cmds.ls(locator, l=True)[0]
+
+    # locator is under the group that was rigged, which is under the driven group of the keepOut transform
+    keep_out = locator.rsplit('|', 3)[0]
+    keep_out_shape = cmds.listRelatives(keep_out, s=True, type='cMuscleKeepOut', f=True)[0]
+    return keep_out, keep_out_shape
+
+
+def getPlugs(nodes, attribute):
+    """
+    Gets the API plugs of the given attribute for all the given nodes.
+
+    Args:
+        nodes (list): Names of the nodes.
+
+        attribute (string): Name of the attribute.
+
+    Returns:
+        (list): om.MPlug for each node.
+    """
+    plugs = []
+    for node in nodes:
+        selection = om.MSelectionList()
+        selection.add(node + '.' + attribute)
+        plugs.append(selection.getPlug(0))
+
+    return plugs
+
+
+def setEvaluation(name, enabled):
+    """
+    Turns the evaluation of the keepOut nodes and point constraints of the given module on or off.
+
+    Args:
+        name (string): Name of the collision module.
+
+        enabled (boolean): If False, nodes will be set to blocking so they cost nothing during playback.
+        The gates driving the node state of gated modules are disconnected and stored, then connected again when
+        turned back on, see builder.createGate.
+    """
+    master = name + '_muscles_master_grp'
+    nodes = cmds.listRelatives(master, ad=True, type='cMuscleKeepOut', f=True) or []
+    for offset, _ in findOffsets(name):
+        nodes += cmds.listRelatives(offset, c=True, type='pointConstraint', f=True) or []
+
+    for node in nodes:
+        plug = node + '.nodeState'
+        if enabled:
+            cmds.setAttr(plug, 0)
+            if cmds.attributeQuery(gate_attribute, n=node, ex=True):
+                cmds.connectAttr(cmds.getAttr(node + '.' + gate_attribute), plug, f=True)
+                cmds.deleteAttr(node + '.' + gate_attribute)
+
+            continue
+
+        # a connected node state cannot be set, so the gate is stored to connect it back when going live
+        sources = cmds.listConnections(plug, s=True, d=False, p=True) or []
+        if sources:
+            if not cmds.attributeQuery(gate_attribute, n=node, ex=True):
+                cmds.addAttr(node, ln=gate_attribute, dt='string')
+
+            cmds.setAttr(node + '.' + gate_attribute, sources[0], type='string')
+            cmds.disconnectAttr(sources[0], plug)
+
+        cmds.setAttr(plug, 2)
+
+
+def bake(name, path, start_frame=None, end_frame=None):
+    """
+    Evaluates the collision offsets of the given module over the given frames and writes them into a cache file.
+
+    Args:
+        name (string): Name of the collision module to bake.
+
+        path (string): Path of the .npy cache file to write.
+
+        start_frame (int): OPTIONAL. First frame to bake, start of the playback range if None.
+
+        end_frame (int): OPTIONAL. Last frame to bake, end of the playback range if None.
+
+    Returns:
+        (string): Path of the cache written.
+    """
+    start_frame = int(cmds.playbackOptions(q=True, min=True) if start_frame is None else start_frame)
+    end_frame = int(cmds.playbackOptions(q=True, max=True) if end_frame is None else end_frame)
+    offsets = findOffsets(name)
+    plugs = getPlugs([offset for offset, _ in offsets], 'translate')
+    data = cache.create(path, start_frame, end_frame, [control.split('|')[-1] for _, control in offsets])
+
+    current_frame = cmds.currentTime(q=True)
+    try:
+        for index, frame in enumerate(range(start_frame, end_frame + 1)):
+            cmds.currentTime(frame, update=True)
+            data[index] = [[plug.child(axis).asDouble() for axis in range(3)] for plug in plugs]
+    finally:
+        cmds.currentTime(current_frame, update=True)
+
+    data.flush()
+    return path
+
+
+def getMeshPath(node):
+    """
+    Gets the API path of the given mesh.
+
+    Args:
+        node (string): Name of the mesh's transform or shape.
+
+    Returns:
+        (om.MDagPath): Path to the mesh shape.
+    """
+    selection = om.MSelectionList()
+    selection.add(node)
+    path = selection.getDagPath(0)
+    path.extendToShape()
+    return path
+
+
+def export(name, directory, start_frame=None, end_frame=None):
+    """
+    Exports what the offline solver needs to bake the given module outside of Maya, see offline.bake.
+    Only the inputs of the keepOut nodes are evaluated, so this is much cheaper than bake.
+
+    Args:
+        name (string): Name of the collision module to export.
+
+        directory (string): Directory to write the export to.
+
+        start_frame (int): OPTIONAL. First frame to export, start of the playback range if None.
+
+        end_frame (int): OPTIONAL. Last frame to export, end of the playback range if None.
+
+    Returns:
+        (string): Directory written to.
+    """
+    start_frame = int(cmds.playbackOptions(q=True, min=True) if start_frame is None else start_frame)
+    end_frame = int(cmds.playbackOptions(q=True, max=True) if end_frame is None else end_frame)
+    offsets = findOffsets(name)
+    keep_outs = [findKeepOut(offset) for offset, _ in offsets]
+
+    # every mesh any keepOut collides with
+    geometry = []
+    for _, keep_out_shape in keep_outs:
+        muscles = cmds.listConnections(keep_out_shape + '.muscleData', s=True, d=False, sh=True) or []
+        for muscle in muscles:
+            mesh = cmds.listConnections(muscle + '.meshIn', s=True, d=False, sh=True)[0]
+            geometry += [mesh] if mesh not in geometry else []
+
+    mesh_paths = [getMeshPath(mesh) for mesh in geometry]
+    triangles = [numpy.array(om.MFnMesh(path).getTriangles()[1], dtype=numpy.int64).reshape(-1, 3) for path in mesh_paths]
+    directions = numpy.array([cmds.getAttr(keep_out_shape + '.inDirection')[0] for _, keep_out_shape in keep_outs])
+
+    keep_out_plugs = getPlugs([keep_out for keep_out, _ in keep_outs], 'worldMatrix[0]')
+    parent_plugs = getPlugs([offset for offset, _ in offsets], 'parentInverseMatrix[0]')
+    weight_plugs = [getPlugs([control], 'autoCollisionWeight')[0] if cmds.objExists(control + '.autoCollisionWeight')
+                    else None for _, control in offsets]
+
+    frames = range(start_frame, end_frame + 1)
+    positions = numpy.empty((len(frames), len(offsets), 3))
+    parent_inverses = numpy.empty((len(frames), len(offsets), 4, 4))
+    weights = numpy.ones((len(frames), len(offsets)))
+    points = [numpy.empty((len(frames), om.MFnMesh(path).numVertices, 3)) for path in mesh_paths]
+
+    current_frame = cmds.currentTime(q=True)
+    try:
+        for index, frame in enumerate(frames):
+            cmds.currentTime(frame, update=True)
+            positions[index] = [list(om.MFnMatrixData(plug.asMObject()).matrix())[12:15] for plug in keep_out_plugs]
+            parent_inverses[index] = [numpy.reshape(list(om.MFnMatrixData(plug.asMObject()).matrix()), (4, 4))
+                                      for plug in parent_plugs]
+            weights[index] = [plug.asDouble() if plug else 1.0 for plug in weight_plugs]
+            for mesh_points, path in zip(points, mesh_paths):
+                mesh_points[index] = [(point.x, point.y, point.z) for point in om.MFnMesh(path).getPoints(om.MSpace.kWorld)]
+    finally:
+        cmds.currentTime(current_frame, update=True)
+
+    offline.writeExport(directory, start_frame, [control.split('|')[-1] for _, control in offsets], positions,
+                        numpy.repeat(directions[None], len(frames), axis=0), parent_inverses, weights,
+                        list(zip(points, triangles)))
+    return directory
+
+
+def useCache(name, path):
+    """
+    Drives the collision offsets of the given module with the given cache instead of the keepOut nodes.
+    Each offset gets keyed anim curves read from the cache, the live connections are stored to switch back.
+
+    Args:
+        name (string): Name of the collision module.
+
+        path (string): Path of the .npy cache file made by bake.
+    """
+    data, metadata = cache.load(path)
+    columns = dict([(control, index) for index, control in enumerate(metadata['controls'])])
+    unit = om.MTime.uiUnit()
+    times = om.MTimeArray([om.MTime(frame, unit) for frame in range(metadata['start_frame'], metadata['end_frame'] + 1)])
+
+    for offset, control in findOffsets(name):
+        column = columns.get(control.split('|')[-1])
+        if column is None:
+            cmds.warning(control + ' is not in ' + path + ', leaving it live')
+            continue
+
+        # swapping caches keeps the live connections stored the first time
+        if cmds.objExists(offset + '.' + live_attribute):
+            removeCache(offset)
+        else:
+            storeLive(offset)
+
+        translate = getPlugs([offset], 'translate')[0]
+        for axis in range(3):
+            curve = om.MFnAnimCurve()
+            curve.create(translate.child(axis), om.MFnAnimCurve.kAnimCurveTL)
+            curve.addKeys(times, om.MDoubleArray(data[:, column, axis].tolist()),
+                          om.MFnAnimCurve.kTangentLinear, om.MFnAnimCurve.kTangentLinear)
+            curve.setName(offset.split('|')[-1] + cache_suffix + 'XYZ'[axis])
+
+    setEvaluation(name, False)
+
+
+def storeLive(offset):
+    """
+    Stores what drives the given offset in a string attribute on it, then disconnects it.
+
+    Args:
+        offset (string): Name of the collision offset.
+    """
+    connections = []
+    for attribute in ['translate', 'translateX', 'translateY', 'translateZ']:
+        plugs = cmds.listConnections(offset + '.' + attribute, s=True, d=False, p=True, c=True) or []
+        connections += [(source, destination) for destination, source in zip(plugs[::2], plugs[1::2])
+                        if (source, destination) not in connections]
+
+    sources = [source for source, _ in connections]
+    destinations = [destination for _, destination in connections]
+    cmds.addAttr(offset, ln=live_attribute, dt='string')
+    cmds.setAttr(offset + '.' + live_attribute, ' '.join(sources + destinations), type='string')
+    [cmds.disconnectAttr(source, destination) for source, destination in connections]
+
+
+def removeCache(offset):
+    """
+    Deletes the cache anim curves driving the given offset.
+
+    Args:
+        offset (string): Name of the collision offset.
+    """
+    curves = cmds.listConnections(offset + '.translate', s=True, d=False, type='animCurve') or []
+    for axis in 'XYZ':
+        curves += cmds.listConnections(offset + '.translate' + axis, s=True, d=False, type='animCurve') or []
+
+    curves = [curve for curve in set(curves) if cache_suffix in curve]
+    if curves:
+        cmds.delete(curves)
+
+
+def useLive(name):
+    """
+    Drives the collision offsets of the given module with its keepOut nodes again, removing any cache.
+
+    Args:
+        name (string): Name of the collision module.
+    """
+    for offset, _ in findOffsets(name):
+        if not cmds.objExists(offset + '.' + live_attribute):
+            continue
+
+        removeCache(offset)
+        plugs = (cmds.getAttr(offset + '.' + live_attribute) or '').split()
+        half = len(plugs) // 2
+        [cmds.connectAttr(source, destination, f=True) for source, destination in zip(plugs[:half], plugs[half:])]
+        cmds.deleteAttr(offset + '.' + live_attribute)
+
+    setEvaluation(name, True)
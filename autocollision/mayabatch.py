@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import argparse
+import traceback
+import timeit
+import maya.cmds as cmds
+from . import builder
+from . import mayascene
+
+
+module_keys = ['name', 'controls', 'parent_control', 'collision_geometry', 'geometry_parent', 'collision_source',
+               'create_offset', 'create_blender', 'is_geometry_driven', 'reach', 'frame_range',
+               'direction_mode', 'activation_distance',
+               'proxy_tolerance', 'lean']
+
+# modules with any of these keys are built with their mirrored module, see builder.createMirrored
+mirror_keys = ['mirror_axis', 'sides', 'mirror_name']
+
+
+def loadConfig(path):
+    """
+    Reads a config file listing the collision modules to build. JSON and YAML files are supported, YAML needs PyYAML.
+    The config holds a "modules" list, each module with the same keys as the arguments of builder.create.
+    Modules with mirror keys build their mirrored module along with them, see builder.createMirrored.
+    Optional "defaults" are used for every key a module does not have, "scene" is a Maya file to open before building
+    and "output" a path to save the scene to after.
+
+    Args:
+        path (string): Path of the .json, .yaml or .yml config.
+
+    Returns:
+        (dictionary): Config with defaults merged into every module.
+    """
+    with open(path) as open_file:
+        if os.path.splitext(path)[1].lower() in ['.yaml', '.yml']:
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('PyYAML is needed to read ' + path + ', install it or use a JSON config')
+
+            config = yaml.safe_load(open_file)
+        else:
+            config = json.load(open_file)
+
+    # a config can be just the list of modules
+    config = {'modules': config} if isinstance(config, list) else config
+    defaults = config.get('defaults', {})
+    modules = []
+
+    for index, module in enumerate(config.get('modules', [])):
+        module = dict(list(defaults.items()) + list(module.items()))
+        unknown = [key for key in module if key not in module_keys + mirror_keys]
+        if unknown:
+            raise ValueError('Module ' + str(module.get('name', index)) + ' in ' + path + ' has unknown keys: ' +
+                             ', '.join(sorted(unknown)))
+
+        modules.append(module)
+
+    config['modules'] = modules
+    return config
+
+
+def build(modules, batch=True, stop_on_error=False):
+    """
+    Builds every given collision module, timing each one and carrying on past the ones that fail.
+    A module that fails may leave the nodes it made before failing in the scene.
+
+    Args:
+        modules (list): Dictionaries of the arguments of builder.create for each module.
+
+        batch (bool): If True, builds each module in one batched pass, see mayascene.BatchScene.
+        Otherwise builds through mayascene.CmdsScene.
+
+        stop_on_error (bool): If True, raises the first error instead of carrying on.
+
+    Returns:
+        (list): Result of each module, a dictionary with its "name", "time" in seconds, amount of "nodes" created
+        and the "error" traceback or None if it was built.
+    """
+    results = []
+    for module in modules:
+        scene = mayascene.BatchScene() if batch else mayascene.CmdsScene()
+        result = {'name': module.get('name'), 'time': 0.0, 'nodes': 0, 'error': None}
+        start = timeit.default_timer()
+
+        mirrored = any([key in module for key in mirror_keys])
+        try:
+            result['nodes'] = len((builder.createMirrored if mirrored else builder.create)(scene, **module))
+        except Exception:
+            if stop_on_error:
+                raise
+
+            result['error'] = traceback.format_exc()
+        finally:
+            result['time'] = timeit.default_timer() - start
+
+        results.append(result)
+
+    return results
+
+
+def run(path, batch=True, stop_on_error=False):
+    """
+    Opens the scene of the given config, builds its modules and saves the scene if the config has an output.
+
+    Args:
+        path (string): Path of the config, see loadConfig.
+
+        batch (bool): If True, builds each module in one batched pass.
+
+        stop_on_error (bool): If True, raises the first error instead of carrying on.
+
+    Returns:
+        (list): Result of each module, see build.
+    """
+    config = loadConfig(path)
+    if config.get('scene'):
+        cmds.file(config['scene'], open=True, force=True)
+
+    results = build(config['modules'], batch, stop_on_error)
+
+    if config.get('output'):
+        cmds.file(rename=config['output'])
+        cmds.file(save=True, force=True, type='mayaAscii' if config['output'].endswith('.ma') else 'mayaBinary')
+
+    return results
+
+
+def summary(results):
+    """
+    Gets a printable summary of build results.
+
+    Args:
+        results (list): Results given by build or run.
+
+    Returns:
+        (string): One line per module, failures with their error, and the totals.
+    """
+    lines = []
+    for result in results:
+        status = 'FAILED' if result['error'] else 'built ' + str(result['nodes']) + ' nodes'
+        lines.append('{:<30} {:>8.3f}s  {}'.format(str(result['name']), result['time'], status))
+        if result['error']:
+            lines.append(result['error'].rstrip())
+
+    failed = len([result for result in results if result['error']])
+    lines.append(str(len(results) - failed) + ' built, ' + str(failed) + ' failed in ' +
+                 '{:.3f}s'.format(sum([result['time'] for result in results])))
+    return '\n'.join(lines)
+
+
+def main(arguments=None):
+    """
+    Command line entry point, run with mayapy -m autocollision.mayabatch config.json [config.yaml ...].
+
+    Args:
+        arguments (list): OPTIONAL. Command line arguments, sys.argv if None.
+
+    Returns:
+        (int): 0 if every module was built, 1 if any failed.
+    """
+    parser = argparse.ArgumentParser(description='Builds collision modules listed in config files without the GUI.')
+    parser.add_argument('configs', nargs='+', help='JSON or YAML configs listing the modules to build.')
+    parser.add_argument('--report', help='Path of a JSON file to write the result of every module to.')
+    parser.add_argument('--no-batch', action='store_true', help='Build command by command instead of one batched pass.')
+    parser.add_argument('--stop-on-error', action='store_true', help='Stop at the first module that fails.')
+    arguments = parser.parse_args(arguments)
+
+    report = {}
+    for path in arguments.configs:
+        report[path] = run(path, not arguments.no_batch, arguments.stop_on_error)
+        print(path + '\n' + summary(report[path]))
+
+    if arguments.report:
+        with open(arguments.report, 'w') as open_file:
+            json.dump(report, open_file, indent=4)
+
+    return int(any([result['error'] for results in report.values() for result in results]))
+
+
+if __name__ == '__main__':
+    import maya.standalone
+    maya.standalone.initialize()
+    sys.exit(main())
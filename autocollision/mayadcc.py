@@ -1,19 +1,38 @@
 from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
-from PySide2 import QtWidgets
-import pymel.core as pm
-import agnostic
+import maya.cmds as cmds
+from . import agnostic
+from . import builder
+from . import mayascene
 
 
-# check to see if Maya Muscle is loaded
-required_plugin = 'MayaMuscle.mll'
-pm.loadPlugin(required_plugin, quiet=True)
-if not pm.pluginInfo(required_plugin, loaded=True, q=True):
-    pm.error(required_plugin + ' is not loaded! Please load it.')
+def getScene(batch=False):
+    """
+    Gets the Maya scene backend to build with.
+
+    Args:
+        batch (bool): If True, gets a scene that builds everything in one batched pass.
+
+    Returns:
+        (scene.Scene): Scene to give to the builder.
+    """
+    return mayascene.BatchScene() if batch else mayascene.CmdsScene()
+
+
+def getSelection():
+    """
+    Gets the selected nodes by UUID, so they are still found if they are renamed or share a name with other nodes.
+
+    Returns:
+        (tuple): UUID and short name of each selected node.
+    """
+    paths = cmds.ls(sl=True, l=True)
+    return mayascene.queryUuids(paths), [path.split('|')[-1] for path in paths]
 
 
-def create(name, controls, parent_control, collision_geometry, geometry_parent=None, collision_source=None, create_offset=True, create_blender=True, is_geometry_driven=True):
+def create(name, controls, parent_control, collision_geometry, geometry_parent=None, collision_source=None, create_offset=True, create_blender=True, is_geometry_driven=True, batch=False, reach=None, frame_range=None, direction_mode='source', activation_distance=None, proxy_tolerance=None, lean=False, profiler=None):
     """
     Creates the collision nodes at the given control's position, with given parent control driving them and given collision geometry colliding with them.
+    Nodes can be given by name, full path or UUID.
 
     Args:
         name (string): Name to add to groups to differentiate.
@@ -34,147 +53,131 @@ def create(name, controls, parent_control, collision_geometry, geometry_parent=N
 
         is_geometry_driven (bool): If True, will set up constraints for the given collision geometry.
 
+        batch (bool): If True, will build everything in one batched pass that doesn't touch the selection.
+        Much faster on modules with a lot of controls.
+
+        reach (float): OPTIONAL. If given, each control is only connected to the geometry whose bounding box, grown by
+        this distance, holds the control. If None, every control is connected to every geometry.
+
+        frame_range (list): OPTIONAL. Start and end frame to sweep the geometry's bounding boxes over when using reach.
+
+        direction_mode (string): "source" pushes controls away from the collision source, "surface" along the normal
+        of the closest point on the collision geometry.
+
+        activation_distance (float): OPTIONAL. If given, each control's collision stops evaluating while its weight is
+        zero or while it is further than this distance from the bounds of its geometry.
+
+        proxy_tolerance (float): OPTIONAL. If given, controls collide with low poly proxies of the geometry made by
+        merging its vertices in cubes of this size. Needs numpy.
+
+        lean (bool): If True, builds every control with as few nodes as possible, wiring the keepOut straight to an
+        offset above the control instead of going through a locator, point constraint and blendColors.
+
+        profiler (profiler.Profiler): OPTIONAL. If given, records the time and scene operations of each phase and
+        each control of the build. Print its summary or write its report to see where the time goes.
+
+    Returns:
+        (list): Names of the nodes created.
+    """
+    return builder.create(getScene(batch), name, controls, parent_control, collision_geometry, geometry_parent, collision_source,
+                          create_offset, create_blender, is_geometry_driven, reach, frame_range, direction_mode,
+                          activation_distance, proxy_tolerance, lean, profiler)
+
+
+def createMirrored(name, controls, parent_control, collision_geometry, geometry_parent=None, collision_source=None, create_offset=True, create_blender=True, is_geometry_driven=True, batch=False, reach=None, frame_range=None, direction_mode='source', activation_distance=None, proxy_tolerance=None, lean=False, mirror_axis='x', sides=('L', 'R'), mirror_name=None, profiler=None):
+    """
+    Creates a collision module for the given controls and another for their mirrored controls on the other side,
+    see builder.createMirrored. Takes the same arguments as create, and:
+
+    Args:
+        mirror_axis (string): World axis the mirror plane through the origin faces, "x", "y" or "z".
+
+        sides (list): Left and right side tokens swapped in node names to find the other side, such as L_arm_ctl
+        and R_arm_ctl.
+
+        mirror_name (string): OPTIONAL. Name of the mirrored module, the given name with its side swapped if None.
+
+    Returns:
+        (list): Names of the nodes created for both modules.
+    """
+    return builder.createMirrored(getScene(batch), name, controls, parent_control, collision_geometry, geometry_parent,
+                                  collision_source, create_offset, create_blender, is_geometry_driven, reach,
+                                  frame_range, direction_mode, activation_distance, proxy_tolerance, lean, mirror_axis,
+                                  sides, mirror_name, profiler)
+
+
+def addControls(name, controls, batch=False):
+    """
+    Adds controls to an existing collision module, see builder.addControls.
+
     Returns:
         (list): Nodes created.
     """
-    # error checking
-    if not controls:
-        pm.error('Please specify controls')
-
-    if not collision_geometry:
-        pm.error('Please specify collision geometry')
-
-    if not parent_control:
-        pm.error('Please specify parent control')
-
-    # created holds all nodes created, clear selection just in case
-    # find the position of our collision source and turn it into a vector for vector math
-    created = []
-    pm.select(cl=True)
-    collision_node = collision_source if collision_source else parent_control
-    collision_source_translation = pm.xform(collision_node, q=True, worldSpace=True, translation=True)
-    collision_source_translation = pm.datatypes.Vector(collision_source_translation)
-
-    # muscles group will hold all our nodes, this would usually go in the extras category of a rig
-    muscles_group = pm.group(n=name + '_muscles_master_grp', em=True)
-    scale_constraint = pm.scaleConstraint(parent_control, muscles_group, mo=False)
-    created.append(scale_constraint)
-    created.append(muscles_group)
-    
-    # makes collision geometry a muscle
-    for geometry in collision_geometry:
-        pm.select(geometry)
-        pm.mel.eval('cMuscle_makeMuscle(0);')
-
-    # iterate over all the controls and make collisions for each
-    for control in controls:
-
-        # create a group and locator at our control's location
-        # group is the one that is going to be driven by collision
-        # locator will drive our controls
-        control = pm.PyNode(control)
-        control_name = control.nodeName()
-        control_translation = pm.xform(control, q=True, worldSpace=True, translation=True)
-        control_translation = pm.datatypes.Vector(control_translation)
-        control_rotation = pm.xform(control, q=True, worldSpace=True, rotation=True)
-        group = pm.group(em=True, n=control_name + '_muscle_grp')
-        locator = pm.spaceLocator(n=control_name + '_muscle_locator')
-        created.append(group)
-        created.append(locator)
-
-        # set location of group to our control
-        group.t.set(control_translation)
-        group.r.set(control_rotation)
-
-        # parent locator to group, and group to master muscles group
-        pm.parent(locator, group)
-        pm.parent(group, muscles_group)
-
-        # setting locator to local 0 will move it to the control's location
-        locator.t.set(0, 0, 0)
-        locator.r.set(0, 0, 0)
-
-        # must have nodes selected for that mel command
-        pm.select(group)
-        muscle_nodes = pm.mel.eval('cMuscle_rigKeepOutSel();')
-        muscle_node = pm.PyNode(muscle_nodes[1])
-        created += muscle_nodes
-
-        # get the direction the muscles should move when they collide with the collision geometry
-        direction = pm.datatypes.Vector(control_translation - collision_source_translation)
-        direction.normalize()
-
-        # setting that direction
-        muscle_node.inDirectionX.set(direction.x)
-        muscle_node.inDirectionY.set(direction.y)
-        muscle_node.inDirectionZ.set(direction.z)
-
-        # making the connection between the muscles and the collision geometry
-        pm.select(group)
-        pm.select(collision_geometry, add=True)
-        pm.mel.eval('cMuscle_keepOutAddRemMuscle(1);')
-
-        if create_offset:
-            # if create offset, make a group that will be driven by the muscle collision
-            # that will then drive the given controls
-            offset = pm.group(n=control_name + '_collision_offset', em=True)
-            offset.t.set(control_translation)
-            pm.parent(offset, control.getParent())
-            pm.parent(control, offset)
-            point_constraint = pm.pointConstraint(locator, offset, mo=False)
-            created.append(offset)
-            created.append(point_constraint)
-
-            if create_blender:
-                # create attribute to connect to blender node
-                pm.addAttr(control, ln='autoCollisionWeight', min=0, max=1, dv=1, hidden=False, keyable=True)
-
-                # creates a blender attribute to blend between muscle collision and regular control position
-                blend_node = pm.shadingNode('blendColors', n=offset + '_Blend_T_Collision', au=True)
-                blend_node.color1.set((0, 0, 0))
-                blend_node.color2.set((0, 0, 0))
-                created.append(blend_node)
-
-                # connect control attribute to blender
-                control.autoCollisionWeight >> blend_node.blender
-                point_constraint.constraintTranslate >> blend_node.color1
-
-                # make sure to disconnect the point constraint from the offset
-                # before hooking up the values from the blender
-                offset.tx.disconnect()
-                offset.ty.disconnect()
-                offset.tz.disconnect()
-                blend_node.output >> offset.t
-
-        else:
-            # if not creating a blender, drive the controls with a good ol' parent constraint
-            parent_constraint = pm.parentConstraint(locator, control)
-            created.append(parent_constraint)
-
-    if is_geometry_driven:
-
-        # if no geometry parent is driven, the parent control will drive our geometry then
-        if not geometry_parent:
-            geometry_parent = parent_control
-
-        # create a group for all our collision geometry
-        master_collision_group = pm.group(n=name + '_collision_grp', em=True)
-        scale_constraint = pm.scaleConstraint(geometry_parent, master_collision_group, mo=False)
-        created.append(master_collision_group)
-        created.append(scale_constraint)
-
-        for geometry in collision_geometry:
-            # making an offset group so that we don't mess with the geometry's transform
-            # parent constraining each geometry's offset group
-            geometry = pm.PyNode(geometry)
-            collision_group = pm.group(n=name + '_' + geometry.nodeName() + '_grp', em=True)
-            collision_parent = pm.parentConstraint(geometry_parent, collision_group, mo=False)
-            pm.parent(collision_group, master_collision_group)
-            pm.parent(geometry, collision_group)
-            created.append(collision_group)
-            created.append(collision_parent)
-
-    return created
+    return builder.addControls(getScene(batch), name, controls)
+
+
+def removeControls(name, controls, batch=False):
+    """
+    Removes controls from an existing collision module, see builder.removeControls.
+    """
+    builder.removeControls(getScene(batch), name, controls)
+
+
+def addGeometry(name, collision_geometry, batch=False):
+    """
+    Makes an existing collision module collide with more geometry, see builder.addGeometry.
+
+    Returns:
+        (list): Nodes created.
+    """
+    return builder.addGeometry(getScene(batch), name, collision_geometry)
+
+
+def removeGeometry(name, collision_geometry, batch=False):
+    """
+    Stops an existing collision module from colliding with the given geometry, see builder.removeGeometry.
+    """
+    builder.removeGeometry(getScene(batch), name, collision_geometry)
+
+
+def getManifest(name):
+    """
+    Gets the manifest of the given collision module, see builder.getManifest.
+
+    Returns:
+        (dictionary): Manifest of the module.
+    """
+    return builder.getManifest(getScene(), name)
+
+
+def exportManifest(name, path):
+    """
+    Writes the manifest of the given collision module to a JSON file.
+
+    Returns:
+        (string): Path written to.
+    """
+    return builder.exportManifest(getScene(), name, path)
+
+
+def delete(name, batch=False):
+    """
+    Deletes the given collision module, putting controls and geometry back under their original parents.
+
+    Returns:
+        (dictionary): Manifest of the module deleted.
+    """
+    return builder.delete(getScene(batch), name)
+
+
+def rebuild(name, batch=False):
+    """
+    Deletes the given collision module and creates it again with the same controls, geometry and options.
+
+    Returns:
+        (list): Nodes created.
+    """
+    return builder.rebuild(getScene(batch), name)
 
 
 class GUI(MayaQWidgetDockableMixin, agnostic.GUI):
@@ -187,8 +190,7 @@ class GUI(MayaQWidgetDockableMixin, agnostic.GUI):
         Assigns the controls that will be driven by the collisions.
         """
         super(GUI, self).assignControls()
-        self.controls_list.clear()
-        [self.controls_list.addItem(QtWidgets.QListWidgetItem(node.nodeName())) for node in pm.selected()]
+        self.controls_list.model.setNodes(*getSelection())
         self.resetControls()
 
     def assignParentControl(self):
@@ -196,25 +198,23 @@ class GUI(MayaQWidgetDockableMixin, agnostic.GUI):
         Assigns the parent control that will drive all the collision nodes,
         """
         super(GUI, self).assignParentControl()
-        selected = pm.selected()
+        uuids, names = getSelection()
 
-        if not selected:
-            self.parent_control.setText('')
+        if not uuids:
+            self.setNode(self.parent_control, '')
             return
 
-        parent_control = selected[-1].nodeName()
-        if len(selected) > 1:
-            pm.warning('More than one object selected, assigning ' + parent_control + ' as parent control')
+        if len(uuids) > 1:
+            cmds.warning('More than one object selected, assigning ' + names[-1] + ' as parent control')
 
-        self.parent_control.setText(parent_control)
+        self.setNode(self.parent_control, uuids[-1], names[-1])
 
     def assignGeometry(self):
         """
         Assigns the geometries that will collide with our controls
         """
         super(GUI, self).assignGeometry()
-        self.geometry_list.clear()
-        [self.geometry_list.addItem(QtWidgets.QListWidgetItem(node.nodeName())) for node in pm.selected()]
+        self.geometry_list.model.setNodes(*getSelection())
         self.resetGeometry()
 
     def assignParentGeometry(self):
@@ -222,57 +222,83 @@ class GUI(MayaQWidgetDockableMixin, agnostic.GUI):
         Assigns the transform in charge of driving our geometries
         """
         super(GUI, self).assignParentGeometry()
-        selected = pm.selected()
+        uuids, names = getSelection()
 
-        if not selected:
-            self.geometry_parent.setText('')
+        if not uuids:
+            self.setNode(self.geometry_parent, '')
             return
 
-        geometry_parent = selected[-1].nodeName()
-        if len(selected) > 1:
-            pm.warning('More than one object selected, assigning ' + geometry_parent + ' as geometry parent')
+        if len(uuids) > 1:
+            cmds.warning('More than one object selected, assigning ' + names[-1] + ' as geometry parent')
 
-        self.geometry_parent.setText(geometry_parent)
+        self.setNode(self.geometry_parent, uuids[-1], names[-1])
 
     def assignCollisionSource(self):
         """
         Assigns the transform from which the collision direction is derived from.
         """
         super(GUI, self).assignCollisionSource()
-        selected = pm.selected()
+        uuids, names = getSelection()
 
-        if not selected:
-            self.collision_source.setText('')
+        if not uuids:
+            self.setNode(self.collision_source, '')
             return
 
-        collision_source = selected[-1].nodeName()
-        if len(selected) > 1:
-            pm.warning('More than one object selected, assigning ' + collision_source + ' as collision source')
+        if len(uuids) > 1:
+            cmds.warning('More than one object selected, assigning ' + names[-1] + ' as collision source')
 
-        self.collision_source.setText(collision_source)
+        self.setNode(self.collision_source, uuids[-1], names[-1])
 
-    def createCollisions(self):
+    def beginBuild(self):
         """
-        Creates the auto collisions in Maya.
+        Opens an undo chunk so a cancelled or failed build can be undone in one step.
+        Anything done in Maya while the build runs goes in the same chunk.
+        """
+        cmds.undoInfo(openChunk=True, chunkName='autoCollision')
+
+    def dockCloseEventTriggered(self):
+        """
+        Cancels any build in progress when the docked GUI is closed, so its undo chunk is never left open.
+        """
+        self.cancelBuild()
+
+    def endBuild(self, rollback):
+        """
+        Closes the build's undo chunk, undoing it if the build was cancelled or failed.
+
+        Args:
+            rollback (boolean): If True, undoes everything the build did.
+        """
+        cmds.undoInfo(closeChunk=True)
+        if rollback:
+            cmds.undo()
 
-        Returns:
-            (list): Nodes created.
+    def createCollisions(self):
+        """
+        Creates the auto collisions in Maya a few controls at a time, keeping Maya responsive while it builds.
         """
         super(GUI, self).createCollisions()
 
-        nodes = create(
-                       self.module_name.text(),
-                       self.getItems(self.controls_list, text=True),
-                       self.parent_control.text(),
-                       self.getItems(self.geometry_list, text=True),
-                       self.geometry_parent.text(),
-                       self.collision_source.text(),
-                       self.create_offset_checkbox.isChecked(),
-                       self.create_blend_checkbox.isChecked(),
-                       self.is_geometry_driven_checkbox.isChecked()
-                       )
-
-        return nodes
+        steps = builder.createSteps(
+                                    getScene(),
+                                    self.module_name.text(),
+                                    list(self.getItems(self.controls_list)),
+                                    self.getNode(self.parent_control),
+                                    list(self.getItems(self.geometry_list)),
+                                    self.getNode(self.geometry_parent),
+                                    self.getNode(self.collision_source),
+                                    self.create_offset_checkbox.isChecked(),
+                                    self.create_blend_checkbox.isChecked(),
+                                    self.is_geometry_driven_checkbox.isChecked(),
+                                    self.getNumber(self.reach),
+                                    None,
+                                    self.direction_mode.currentText(),
+                                    self.getNumber(self.activation_distance),
+                                    self.getNumber(self.proxy_tolerance),
+                                    self.lean_checkbox.isChecked()
+                                    )
+
+        self.startBuild(steps)
 
 
 def show():
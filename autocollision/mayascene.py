@@ -0,0 +1,950 @@
+import json
+import math
+import re
+import maya.api.OpenMaya as om
+import maya.cmds as cmds
+import maya.mel as mel
+from . import scene
+
+
+required_plugin = 'MayaMuscle'
+
+# creates a wrap on the selection, the same as the Create Wrap menu with no weight threshold, no max distance,
+# smooth influence, not exclusive, auto weight threshold, no render influences and volume falloff
+wrap_command = 'doWrapArgList "7" {"1", "0", "0", "2", "0", "1", "0", "0"}'
+
+
+def loadPlugin():
+    """
+    Loads Maya Muscle if it is not loaded yet. Scenes call this right before they need it instead of at import,
+    so that importing the package stays fast.
+    """
+    if cmds.pluginInfo(required_plugin, q=True, loaded=True):
+        return
+
+    cmds.loadPlugin(required_plugin, quiet=True)
+    if not cmds.pluginInfo(required_plugin, q=True, loaded=True):
+        cmds.error(required_plugin + ' is not loaded! Please load it.')
+
+
+def queryWorldTransforms(nodes):
+    """
+    Gets the world translation, world rotation and parent of all the given nodes in one pass through the API,
+    without running a command or creating a PyNode per node.
+
+    Args:
+        nodes (list): Names of the transforms to query.
+
+    Returns:
+        (list): A (translation, rotation, parent) tuple for each given node. Rotation is in degrees,
+        parent is the full path of the node's parent or None if the node is parented to the world.
+    """
+    transforms = []
+    for node in nodes:
+        selection = om.MSelectionList()
+        selection.add(node)
+        dag_path = selection.getDagPath(0)
+        matrix = om.MTransformationMatrix(dag_path.inclusiveMatrix())
+        translation = matrix.translation(om.MSpace.kWorld)
+        rotation = matrix.rotation()
+        parent_path = om.MDagPath(dag_path).pop()
+        parent = parent_path.fullPathName() if parent_path.length() else None
+        transforms.append(((translation.x, translation.y, translation.z),
+                           (math.degrees(rotation.x), math.degrees(rotation.y), math.degrees(rotation.z)),
+                           parent))
+
+    return transforms
+
+
+def queryLocalPoints(nodes, points):
+    """
+    Brings each given world position into the space of its node through the inverse of the node's full world matrix,
+    scale and shear included.
+
+    Args:
+        nodes (list): Names of the transforms.
+
+        points (list): World position for each node.
+
+    Returns:
+        (list): Position in the space of each node.
+    """
+    local_points = []
+    for node, point in zip(nodes, points):
+        selection = om.MSelectionList()
+        selection.add(node)
+        local = om.MPoint(*point) * selection.getDagPath(0).inclusiveMatrixInverse()
+        local_points.append((local.x, local.y, local.z))
+
+    return local_points
+
+
+def queryBoundingBoxes(nodes, frames=None):
+    """
+    Gets the world space bounding box of each given node, grown to hold the node at every given frame.
+
+    Args:
+        nodes (list): Names of the nodes to query.
+
+        frames (list): OPTIONAL. Frames to sweep the nodes over, current frame only if None.
+
+    Returns:
+        (list): A (minimum, maximum) tuple of corners for each node.
+    """
+    current_frame = cmds.currentTime(q=True)
+    minimums = [[float('inf')] * 3 for _ in nodes]
+    maximums = [[float('-inf')] * 3 for _ in nodes]
+
+    try:
+        for frame in frames if frames else [None]:
+            if frame is not None:
+                cmds.currentTime(frame, update=True)
+
+            for minimum, maximum, node in zip(minimums, maximums, nodes):
+                box = cmds.exactWorldBoundingBox(node)
+                minimum[:] = [min(value, box[axis]) for axis, value in enumerate(minimum)]
+                maximum[:] = [max(value, box[axis + 3]) for axis, value in enumerate(maximum)]
+    finally:
+        if frames:
+            cmds.currentTime(current_frame, update=True)
+
+    return [(tuple(minimum), tuple(maximum)) for minimum, maximum in zip(minimums, maximums)]
+
+
+def queryMeshes(nodes):
+    """
+    Gets the world space vertex positions and triangles of each given mesh through the API.
+
+    Args:
+        nodes (list): Names of the mesh transforms or shapes to query.
+
+    Returns:
+        (list): A (points, triangles) tuple for each node, triangles as three vertex indices each.
+    """
+    meshes = []
+    for node in nodes:
+        selection = om.MSelectionList()
+        selection.add(node)
+        mesh = om.MFnMesh(selection.getDagPath(0).extendToShape())
+        points = [(point.x, point.y, point.z) for point in mesh.getPoints(om.MSpace.kWorld)]
+        vertices = list(mesh.getTriangles()[1])
+        meshes.append((points, [vertices[index:index + 3] for index in range(0, len(vertices), 3)]))
+
+    return meshes
+
+
+def queryMeshKeys(nodes):
+    """
+    Gets the UUID of the shape, vertex count and triangle count of each given mesh through the API.
+
+    Args:
+        nodes (list): Names of the mesh transforms or shapes to query.
+
+    Returns:
+        (list): A (uuid, vertex count, triangle count) tuple for each node.
+    """
+    keys = []
+    for node in nodes:
+        selection = om.MSelectionList()
+        selection.add(node)
+        shape = selection.getDagPath(0).extendToShape()
+        mesh = om.MFnMesh(shape)
+        keys.append((om.MFnDependencyNode(shape.node()).uuid().asString(), mesh.numVertices,
+                     sum(mesh.getTriangles()[0])))
+
+    return keys
+
+
+def resolveUuid(uuid):
+    """
+    Gets the full path of the node with the given UUID.
+
+    Args:
+        uuid (string): UUID of the node.
+
+    Returns:
+        (string): Full path of the node.
+    """
+    paths = cmds.ls(uuid, l=True)
+    if not paths:
+        cmds.error('No object matches UUID: ' + uuid)
+
+    return paths[0]
+
+
+def queryUuids(nodes):
+    """
+    Gets the UUID of each given node through the API.
+
+    Args:
+        nodes (list): Names of the nodes.
+
+    Returns:
+        (list): UUID string of each node.
+    """
+    uuids = []
+    for node in nodes:
+        selection = om.MSelectionList()
+        selection.add(node)
+        uuids.append(om.MFnDependencyNode(selection.getDependNode(0)).uuid().asString())
+
+    return uuids
+
+
+def meshCommands(shape, points, triangles):
+    """
+    Gets the MEL commands that give the given empty mesh shape its vertices, edges and faces, the same way Maya ASCII
+    files do, so meshes can be built in a batch and undone.
+
+    Args:
+        shape (string): MEL variable or quoted name of the mesh shape.
+
+        points (list): Positions of the mesh's vertices.
+
+        triangles (list): Three vertex indices for each triangle of the mesh.
+
+    Returns:
+        (list): MEL statements without the trailing semicolons.
+    """
+    edges = {}
+    faces = []
+    for triangle in triangles:
+        face = []
+        for start, end in zip(triangle, list(triangle[1:]) + [triangle[0]]):
+            key = (min(start, end), max(start, end))
+            index = edges.setdefault(key, len(edges))
+
+            # faces go through their edges in winding order, negative indices go through an edge backwards
+            face.append(index if start == key[0] else -index - 1)
+
+        faces.append('f 3 ' + ' '.join([str(index) for index in face]))
+
+    edge_values = [''] * len(edges)
+    for (start, end), index in edges.items():
+        edge_values[index] = str(start) + ' ' + str(end) + ' 0'
+
+    def plug(attribute, count):
+        return '(' + shape + ' + ".' + attribute + '[0:' + str(count - 1) + ']")'
+
+    return ['setAttr -s ' + str(len(points)) + ' ' + plug('vt', len(points)) + ' ' +
+            ' '.join(['{} {} {}'.format(*point) for point in points]),
+            'setAttr -s ' + str(len(edges)) + ' ' + plug('ed', len(edges)) + ' ' + ' '.join(edge_values),
+            'setAttr -s ' + str(len(faces)) + ' -ch ' + str(3 * len(faces)) + ' ' + plug('fc', len(faces)) +
+            ' -type "polyFaces" ' + ' '.join(faces),
+            'sets -e -fe initialShadingGroup ' + shape]
+
+
+class CmdsScene(scene.Scene):
+    """
+    Runs every operation right away through maya.cmds, without PyMel. Nodes are handled as API 2.0 MObjects so handles
+    stay valid when nodes are renamed or reparented, and are only turned into full paths to run commands on them.
+    Nodes are given back as full paths on commit. keepOut nodes are rigged and connected directly, the selection is
+    only touched around cMuscle_makeMuscle and restored right after.
+    """
+    @staticmethod
+    def path(node):
+        """
+        Gets the name to run commands with for the given node.
+
+        Args:
+            node (om.MObject): Handle of the node.
+
+        Returns:
+            (string): Full path of DAG nodes, name of other nodes.
+        """
+        if node.hasFn(om.MFn.kDagNode):
+            return om.MDagPath.getAPathTo(node).fullPathName()
+
+        return om.MFnDependencyNode(node).name()
+
+    @staticmethod
+    def plug(node, attribute):
+        """
+        Gets the name of the given node's attribute.
+
+        Args:
+            node (om.MObject): Handle of the node.
+
+            attribute (string): Name of the attribute.
+
+        Returns:
+            (string): Name of the plug.
+        """
+        return CmdsScene.path(node) + '.' + attribute
+
+    def createNode(self, node_type, name, parent=None):
+        """
+        Creates a node without changing the selection.
+
+        Args:
+            node_type (string): Type of node to create.
+
+            name (string): Name of node to create.
+
+            parent (om.MObject): OPTIONAL. Handle of the parent of the node.
+
+        Returns:
+            (om.MObject): Handle of the created node.
+        """
+        if parent is None:
+            created = cmds.createNode(node_type, n=name, ss=True)
+            return self.node(('|' if node_type == 'transform' else '') + created.split('|')[-1])
+
+        # the name returned may not be unique, but it is unique under the parent
+        parent_path = self.path(parent)
+        created = cmds.createNode(node_type, n=name, p=parent_path, ss=True)
+        return self.node(parent_path + '|' + created.split('|')[-1])
+
+    def error(self, message):
+        cmds.error(message)
+
+    def warning(self, message):
+        cmds.warning(message)
+
+    def info(self, message):
+        om.MGlobal.displayInfo(message)
+
+    def node(self, name):
+        if isinstance(name, om.MObject):
+            return name
+
+        selection = om.MSelectionList()
+        selection.add(resolveUuid(name) if scene.isUuid(name) else name)
+        return selection.getDependNode(0)
+
+    def uuids(self, nodes):
+        return [om.MFnDependencyNode(node).uuid().asString() for node in nodes]
+
+    def exists(self, name):
+        return cmds.objExists(name)
+
+    def name(self, node):
+        return om.MFnDependencyNode(node).name()
+
+    def xform(self, nodes):
+        return [transform[:2] for transform in queryWorldTransforms([self.path(node) for node in nodes])]
+
+    def localPoints(self, nodes, points):
+        return queryLocalPoints([self.path(node) for node in nodes], points)
+
+    def boundingBox(self, nodes, frames=None):
+        return queryBoundingBoxes([self.path(node) for node in nodes], frames)
+
+    def meshData(self, nodes):
+        return queryMeshes([self.path(node) for node in nodes])
+
+    def meshKeys(self, nodes):
+        return queryMeshKeys([self.path(node) for node in nodes])
+
+    def getParent(self, node):
+        parent = om.MFnDagNode(node).parent(0)
+        return None if parent.hasFn(om.MFn.kWorld) else parent
+
+    def children(self, node, node_type=None):
+        flags = {'type': node_type} if node_type else {}
+        return [self.node(child) for child in cmds.listRelatives(self.path(node), c=True, f=True, **flags) or []]
+
+    def delete(self, nodes):
+        cmds.delete([self.path(node) for node in nodes])
+
+    def group(self, name, parent=None, translation=None, rotation=None):
+        group = self.createNode('transform', name, parent)
+        if translation or rotation:
+            cmds.xform(self.path(group), ws=True, t=translation or (0, 0, 0), ro=rotation or (0, 0, 0))
+
+        return group
+
+    def spaceLocator(self, name, parent):
+        locator = self.createNode('transform', name, parent)
+        self.createNode('locator', name + 'Shape', locator)
+        return locator
+
+    def parent(self, node, parent):
+        if parent is None:
+            cmds.parent(self.path(node), world=True)
+        else:
+            cmds.parent(self.path(node), self.path(parent))
+
+        return node
+
+    def _constraint(self, constraint_type, target, node):
+        """
+        Creates a constraint without maintaining offset.
+
+        Args:
+            constraint_type (string): Name of the constraint command, such as "pointConstraint".
+
+            target (om.MObject): Handle of the driver.
+
+            node (om.MObject): Handle of the node to drive.
+
+        Returns:
+            (om.MObject): Handle of the constraint.
+        """
+        node_path = self.path(node)
+        constraint = getattr(cmds, constraint_type)(self.path(target), node_path, mo=False)[0]
+        return self.node(node_path + '|' + constraint.split('|')[-1])
+
+    def pointConstraint(self, target, node):
+        return self._constraint('pointConstraint', target, node)
+
+    def parentConstraint(self, target, node):
+        return self._constraint('parentConstraint', target, node)
+
+    def scaleConstraint(self, target, node):
+        return self._constraint('scaleConstraint', target, node)
+
+    def addAttr(self, node, attribute, minimum, maximum, default):
+        cmds.addAttr(self.path(node), ln=attribute, min=minimum, max=maximum, dv=default, k=True)
+
+    def deleteAttr(self, node, attribute):
+        cmds.deleteAttr(self.plug(node, attribute))
+
+    def setData(self, node, attribute, data):
+        data = scene.mapValues(data, lambda value: self.path(value) if isinstance(value, om.MObject) else value)
+        if not cmds.attributeQuery(attribute, n=self.path(node), ex=True):
+            cmds.addAttr(self.path(node), ln=attribute, dt='string')
+
+        cmds.setAttr(self.plug(node, attribute), json.dumps(data, sort_keys=True), type='string')
+
+    def getData(self, node, attribute):
+        if not cmds.attributeQuery(attribute, n=self.path(node), ex=True):
+            return None
+
+        return json.loads(cmds.getAttr(self.plug(node, attribute)) or 'null')
+
+    def setAttr(self, node, attribute, value):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        cmds.setAttr(self.plug(node, attribute), *values)
+
+    def shadingNode(self, node_type, name):
+        return self.node(cmds.shadingNode(node_type, asUtility=True, n=name, ss=True))
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        cmds.connectAttr(self.plug(source, source_attribute), self.plug(destination, destination_attribute), f=True)
+
+    def disconnect(self, node, attribute):
+        plug = self.plug(node, attribute)
+        sources = cmds.listConnections(plug, s=True, d=False, p=True) or []
+        if sources:
+            cmds.disconnectAttr(sources[0], plug)
+
+    def createMesh(self, name, points, triangles, parent=None):
+        transform = self.createNode('transform', name, parent)
+        shape = self.createNode('mesh', name + 'Shape', transform)
+        mel.eval(';\n'.join(meshCommands(BatchScene.quote(self.path(shape)), points, triangles)) + ';')
+        return transform
+
+    def wrap(self, node, driver):
+        # the wrap command only works on selection, so restore it afterwards
+        selection = cmds.ls(sl=True)
+        cmds.select([self.path(node), self.path(driver)], r=True)
+        try:
+            mel.eval(wrap_command)
+        finally:
+            if selection:
+                cmds.select(selection, r=True)
+            else:
+                cmds.select(cl=True)
+
+        wrap = cmds.ls(cmds.listHistory(self.path(node), pdo=True) or [], type='wrap')[0]
+        base = cmds.ls(cmds.listConnections(wrap + '.basePoints[0]', s=True, d=False), l=True)[0]
+        return [self.node(wrap), self.node(base)]
+
+    def makeMuscle(self, geometries):
+        # cMuscle_makeMuscle only works on selection, so restore it afterwards
+        loadPlugin()
+        selection = cmds.ls(sl=True)
+        cmds.select([self.path(geometry) for geometry in geometries], r=True)
+        try:
+            mel.eval('cMuscle_makeMuscle(0);')
+        finally:
+            if selection:
+                cmds.select(selection, r=True)
+            else:
+                cmds.select(cl=True)
+
+        return [self.findMuscle(geometry) for geometry in geometries]
+
+    def findMuscle(self, geometry):
+        muscles = cmds.listRelatives(self.path(geometry), s=True, f=True, type='cMuscleObject')
+        return self.node(muscles[0]) if muscles else None
+
+    def keepOutShape(self, node):
+        """
+        Gets the cMuscleKeepOut rigged on the given node.
+
+        Args:
+            node (om.MObject): Handle of the node given to rigKeepOut.
+
+        Returns:
+            (om.MObject): Handle of the cMuscleKeepOut.
+        """
+        # node is under the driven group of the keepOut transform
+        keep_out = self.getParent(self.getParent(node))
+        return self.node(cmds.listRelatives(self.path(keep_out), s=True, f=True, type='cMuscleKeepOut')[0])
+
+    def rigKeepOut(self, node):
+        # rig the keepOut the same way cMuscle_rigKeepOut does, keepOut transform at the node
+        # driven group is moved by the keepOut, the node rides along with the driven group
+        loadPlugin()
+        name = self.name(node)
+        translation, rotation = self.xform([node])[0]
+        keep_out = self.group(name + '_keepOut', self.getParent(node), translation, rotation)
+        keep_out_shape = self.createNode('cMuscleKeepOut', name + '_keepOutShape', keep_out)
+        driven = self.createNode('transform', name + '_keepOut_driven', keep_out)
+        self.connect(keep_out, 'worldMatrix[0]', keep_out_shape, 'worldMatrixAim')
+        self.connect(keep_out_shape, 'outTranslateLocal', driven, 'translate')
+        self.parent(node, driven)
+        return [keep_out, keep_out_shape, driven]
+
+    def keepOutAddMuscle(self, node, muscles):
+        keep_out_shape = self.keepOutShape(node)
+        plug = self.plug(keep_out_shape, 'muscleData')
+        indices = cmds.getAttr(plug, mi=True) or []
+        used = set([index for index in indices if cmds.connectionInfo(plug + '[' + str(index) + ']', id=True)])
+        index = 0
+        for muscle in muscles:
+            while index in used:
+                index += 1
+
+            cmds.connectAttr(self.plug(muscle, 'muscleData'), plug + '[' + str(index) + ']', f=True)
+            index += 1
+
+    def keepOutRemoveMuscle(self, node, muscles):
+        keep_out_shape = self.keepOutShape(node)
+        plug = self.plug(keep_out_shape, 'muscleData')
+        for muscle in muscles:
+            source = self.plug(muscle, 'muscleData')
+            for index in cmds.getAttr(plug, mi=True) or []:
+                destination = plug + '[' + str(index) + ']'
+                if cmds.isConnected(source, destination):
+                    cmds.disconnectAttr(source, destination)
+
+    def commit(self, nodes):
+        return [self.path(node) for node in nodes]
+
+
+class BatchScene(scene.Scene):
+    """
+    Collects MEL commands into a single procedure so that a whole collision module is built with one mel.eval call
+    on commit. Created nodes are handled by the MEL variable that holds their name, existing nodes by their quoted name.
+    Selection is never touched, except around cMuscle_makeMuscle which is restored right after.
+    keepOut nodes are rigged and connected to the muscle objects directly instead of going through the selection
+    driven cMuscle_rigKeepOutSel and cMuscle_keepOutAddRemMuscle. Queries run right away, so they only work on
+    nodes that existed before the batch.
+    """
+    def __init__(self):
+        self.lines = []
+        self.count = 0
+        self.names = {}
+        self.placements = {}
+        self.parents = {}
+        self.keep_outs = {}
+        self.muscle_counts = {}
+
+    @staticmethod
+    def quote(name):
+        """
+        Turns the given node name into a MEL string literal.
+
+        Args:
+            name (string): Name of an existing node.
+
+        Returns:
+            (string): Quoted name.
+        """
+        return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    @staticmethod
+    def plug(node, attribute):
+        """
+        Gets the MEL expression for the given node's attribute.
+
+        Args:
+            node (string): MEL variable or quoted name of the node.
+
+            attribute (string): Name of the attribute.
+
+        Returns:
+            (string): MEL string expression of the plug.
+        """
+        return '(' + node + ' + ".' + attribute + '")'
+
+    def add(self, line):
+        """
+        Adds a MEL statement to the batch.
+
+        Args:
+            line (string): MEL statement without the trailing semicolon.
+        """
+        self.lines.append(line + ';')
+
+    def variable(self, prefix='$node'):
+        """
+        Gets a new unique MEL variable name.
+
+        Args:
+            prefix (string): Start of the variable name.
+
+        Returns:
+            (string): Name of a MEL variable not used yet.
+        """
+        self.count += 1
+        return prefix + str(self.count)
+
+    def store(self, command, array=False, variable=None):
+        """
+        Adds a MEL command to the batch and stores its result in a variable.
+
+        Args:
+            command (string): MEL command that returns a node name.
+
+            array (boolean): Whether the command returns a string array, only the first element will be stored.
+
+            variable (string): OPTIONAL. Variable already declared to store the result in, new one created if None.
+
+        Returns:
+            (string): MEL variable that will hold the node name.
+        """
+        assignment = variable if variable else 'string ' + self.variable()
+        variable = variable if variable else '$node' + str(self.count)
+
+        if array:
+            result = self.variable()
+            self.add('string ' + result + '[] = `' + command + '`')
+            self.add(assignment + ' = ' + result + '[0]')
+        else:
+            self.add(assignment + ' = `' + command + '`')
+
+        return variable
+
+    def createNode(self, node_type, name, parent=None):
+        """
+        Creates a node without changing the selection.
+
+        Args:
+            node_type (string): Type of node to create.
+
+            name (string): Name of node to create.
+
+            parent (string): OPTIONAL. MEL variable or quoted name of the parent of the node.
+
+        Returns:
+            (string): MEL variable that will hold the created node's name.
+        """
+        parent_flag = ' -p ' + parent if parent else ''
+        node = self.store('createNode ' + node_type + ' -n ' + self.quote(name) + parent_flag + ' -ss')
+        self.names[node] = name
+        self.parents[node] = parent
+        return node
+
+    def place(self, node, translation=None, rotation=None):
+        """
+        Moves the given node in world space.
+
+        Args:
+            node (string): MEL variable or quoted name of the node to move.
+
+            translation (list): OPTIONAL. World translation to move node to.
+
+            rotation (list): OPTIONAL. World rotation to move node to.
+        """
+        translation = tuple(translation) if translation else (0.0, 0.0, 0.0)
+        rotation = tuple(rotation) if rotation else (0.0, 0.0, 0.0)
+        self.placements[node] = (translation, rotation)
+        self.add('xform -ws -t ' + ' '.join([str(value) for value in translation]) +
+                 ' -ro ' + ' '.join([str(value) for value in rotation]) + ' ' + node)
+
+    def node(self, name):
+        # MEL commands take names, so UUIDs are turned into paths right away
+        name = resolveUuid(name) if scene.isUuid(name) else name
+        node = self.quote(name)
+        self.names[node] = name
+        return node
+
+    def uuids(self, nodes):
+        return queryUuids([self.names[node] for node in nodes])
+
+    def exists(self, name):
+        return cmds.objExists(name)
+
+    def name(self, node):
+        return self.names[node].split('|')[-1]
+
+    def path(self, node):
+        return cmds.ls(self.names[node], l=True)[0]
+
+    def xform(self, nodes):
+        existing = [self.names[node] for node in nodes if node not in self.placements]
+        transforms = iter(queryWorldTransforms(existing))
+        return [self.placements[node] if node in self.placements else next(transforms)[:2] for node in nodes]
+
+    def localPoints(self, nodes, points):
+        return queryLocalPoints([self.names[node] for node in nodes], points)
+
+    def error(self, message):
+        cmds.error(message)
+
+    def warning(self, message):
+        cmds.warning(message)
+
+    def info(self, message):
+        om.MGlobal.displayInfo(message)
+
+    def boundingBox(self, nodes, frames=None):
+        return queryBoundingBoxes([self.names[node] for node in nodes], frames)
+
+    def meshData(self, nodes):
+        return queryMeshes([self.names[node] for node in nodes])
+
+    def meshKeys(self, nodes):
+        return queryMeshKeys([self.names[node] for node in nodes])
+
+    def getParent(self, node):
+        parent = queryWorldTransforms([self.names[node]])[0][2]
+        return self.node(parent) if parent else None
+
+    def children(self, node, node_type=None):
+        flags = {'type': node_type} if node_type else {}
+        children = cmds.listRelatives(self.names[node], c=True, f=True, **flags) or []
+        return [self.node(child) for child in children]
+
+    def delete(self, nodes):
+        self.add('delete ' + ' '.join(nodes))
+
+    def group(self, name, parent=None, translation=None, rotation=None):
+        group = self.createNode('transform', name, parent)
+        if translation or rotation:
+            self.place(group, translation, rotation)
+
+        return group
+
+    def spaceLocator(self, name, parent):
+        locator = self.createNode('transform', name, parent)
+        self.createNode('locator', name + 'Shape', locator)
+        return locator
+
+    def parent(self, node, parent):
+        # created nodes keep their variable, existing nodes get one to hold their new path
+        variable = node if node.startswith('$') else None
+        command = 'parent ' + node + ' ' + parent if parent else 'parent -w ' + node
+        result = self.store(command, array=True, variable=variable)
+        self.names[result] = self.names[node]
+        self.parents[result] = parent
+        return result
+
+    def _constraint(self, constraint_type, target, node):
+        """
+        Creates a constraint without maintaining offset.
+
+        Args:
+            constraint_type (string): MEL command of the constraint, such as "pointConstraint".
+
+            target (string): MEL variable or quoted name of the driver.
+
+            node (string): MEL variable or quoted name of the node to drive.
+
+        Returns:
+            (string): MEL variable that will hold the constraint's name.
+        """
+        constraint = self.store(constraint_type + ' ' + target + ' ' + node, array=True)
+        self.names[constraint] = self.names[node] + '_' + constraint_type + '1'
+        return constraint
+
+    def pointConstraint(self, target, node):
+        return self._constraint('pointConstraint', target, node)
+
+    def parentConstraint(self, target, node):
+        return self._constraint('parentConstraint', target, node)
+
+    def scaleConstraint(self, target, node):
+        return self._constraint('scaleConstraint', target, node)
+
+    def addAttr(self, node, attribute, minimum, maximum, default):
+        self.add('addAttr -ln "' + attribute + '" -min ' + str(minimum) + ' -max ' + str(maximum) +
+                 ' -dv ' + str(default) + ' -k true ' + node)
+
+    def deleteAttr(self, node, attribute):
+        self.add('deleteAttr ' + self.plug(node, attribute))
+
+    def setData(self, node, attribute, data):
+        # handles only get their names when the batch runs, so the JSON is joined together in MEL
+        handles = []
+
+        def replace(value):
+            if isinstance(value, scene.string_types) and value in self.names:
+                handles.append(value)
+                return '@autoCollisionHandle' + str(len(handles) - 1) + '@'
+            return value
+
+        # splitting on the captured index gives literal, index, literal, index, ..., literal
+        pieces = re.split(r'@autoCollisionHandle(\d+)@', json.dumps(scene.mapValues(data, replace), sort_keys=True))
+        expression = self.quote(pieces[0])
+        for index, piece in zip(pieces[1::2], pieces[2::2]):
+            expression += ' + ' + handles[int(index)] + ' + ' + self.quote(piece)
+
+        self.add('if (!`attributeQuery -ex -n ' + node + ' "' + attribute + '"`) addAttr -ln "' + attribute +
+                 '" -dt "string" ' + node)
+        self.add('setAttr -type "string" ' + self.plug(node, attribute) + ' (' + expression + ')')
+
+    def getData(self, node, attribute):
+        name = self.names[node]
+        if not cmds.attributeQuery(attribute, n=name, ex=True):
+            return None
+
+        return json.loads(cmds.getAttr(name + '.' + attribute) or 'null')
+
+    def setAttr(self, node, attribute, value):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        self.add('setAttr ' + self.plug(node, attribute) + ' ' + ' '.join([str(item) for item in values]))
+
+    def shadingNode(self, node_type, name):
+        node = self.store('shadingNode -asUtility -ss -n ' + self.quote(name) + ' ' + node_type)
+        self.names[node] = name
+        return node
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        self.add('connectAttr -f ' + self.plug(source, source_attribute) + ' ' + self.plug(destination, destination_attribute))
+
+    def disconnect(self, node, attribute):
+        sources = self.variable()
+        self.add('string ' + sources + '[] = `listConnections -s 1 -d 0 -p 1 ' + self.plug(node, attribute) + '`')
+        self.add('if (size(' + sources + ')) disconnectAttr ' + sources + '[0] ' + self.plug(node, attribute))
+
+    def createMesh(self, name, points, triangles, parent=None):
+        transform = self.createNode('transform', name, parent)
+        shape = self.createNode('mesh', name + 'Shape', transform)
+        [self.add(line) for line in meshCommands(shape, points, triangles)]
+        return transform
+
+    def wrap(self, node, driver):
+        # the wrap command only works on selection, so restore it afterwards
+        selection = self.variable()
+        self.add('string ' + selection + '[] = `ls -sl`')
+        self.add('select -r ' + node + ' ' + driver)
+        self.add(wrap_command)
+        self.add('select -cl')
+        self.add('if (size(' + selection + ')) select -r ' + selection)
+
+        history = self.variable()
+        self.add('string ' + history + '[] = `listHistory -pdo 1 ' + node + '`')
+        wrap = self.store('ls -type wrap ' + history, array=True)
+        base = self.store('listConnections -s 1 -d 0 ' + self.plug(wrap, 'basePoints[0]'), array=True)
+        self.names[wrap] = self.name(node) + 'Wrap'
+        self.names[base] = self.name(driver) + 'Base'
+        return [wrap, base]
+
+    def makeMuscle(self, geometries):
+        # cMuscle_makeMuscle only works on selection, so restore it afterwards
+        selection = self.variable()
+        self.add('string ' + selection + '[] = `ls -sl`')
+        self.add('select -r ' + ' '.join(geometries))
+        self.add('cMuscle_makeMuscle(0)')
+        self.add('select -cl')
+        self.add('if (size(' + selection + ')) select -r ' + selection)
+
+        muscles = []
+        for geometry in geometries:
+            muscle = self.store('listRelatives -s -f -type cMuscleObject ' + geometry, array=True)
+            self.names[muscle] = self.names[geometry] + 'MuscleObjectShape'
+            muscles.append(muscle)
+
+        return muscles
+
+    def findMuscle(self, geometry):
+        muscles = cmds.listRelatives(self.names[geometry], s=True, f=True, type='cMuscleObject')
+        return self.node(muscles[0]) if muscles else None
+
+    def keepOutShape(self, node):
+        """
+        Gets the cMuscleKeepOut rigged on the given node, found when the batch runs for nodes rigged before it.
+
+        Args:
+            node (string): MEL variable or quoted name of the node given to rigKeepOut.
+
+        Returns:
+            (string): MEL variable that will hold the name of the cMuscleKeepOut.
+        """
+        if node not in self.keep_outs:
+            # node is under the driven group of the keepOut transform
+            driven = self.store('listRelatives -p -f ' + node, array=True)
+            keep_out = self.store('listRelatives -p -f ' + driven, array=True)
+            self.keep_outs[node] = self.store('listRelatives -s -f -type cMuscleKeepOut ' + keep_out, array=True)
+
+        return self.keep_outs[node]
+
+    def rigKeepOut(self, node):
+        # rig the keepOut the same way cMuscle_rigKeepOut does, keepOut transform at the node
+        # driven group is moved by the keepOut, the node rides along with the driven group
+        name = self.name(node)
+        translation, rotation = self.placements[node]
+        keep_out = self.createNode('transform', name + '_keepOut', self.parents.get(node))
+        self.place(keep_out, translation, rotation)
+        keep_out_shape = self.createNode('cMuscleKeepOut', name + '_keepOutShape', keep_out)
+        driven = self.createNode('transform', name + '_keepOut_driven', keep_out)
+        self.placements[driven] = (translation, rotation)
+        self.connect(keep_out, 'worldMatrix[0]', keep_out_shape, 'worldMatrixAim')
+        self.connect(keep_out_shape, 'outTranslateLocal', driven, 'translate')
+        self.parent(node, driven)
+        self.keep_outs[node] = keep_out_shape
+        self.muscle_counts[keep_out_shape] = 0
+        return [keep_out, keep_out_shape, driven]
+
+    def keepOutAddMuscle(self, node, muscles):
+        keep_out_shape = self.keepOutShape(node)
+        if keep_out_shape not in self.muscle_counts:
+            # keepOut rigged before this batch, find the first free index when the batch runs
+            for muscle in muscles:
+                index = self.variable('$index')
+                destination = '(' + keep_out_shape + ' + ".muscleData[" + ' + index + ' + "]")'
+                self.add('int ' + index + ' = 0')
+                self.add('while (`connectionInfo -id ' + destination + '`) ' + index + '++')
+                self.add('connectAttr -f ' + self.plug(muscle, 'muscleData') + ' ' + destination)
+            return
+
+        index = self.muscle_counts[keep_out_shape]
+        for muscle in muscles:
+            self.connect(muscle, 'muscleData', keep_out_shape, 'muscleData[' + str(index) + ']')
+            index += 1
+
+        self.muscle_counts[keep_out_shape] = index
+
+    def keepOutRemoveMuscle(self, node, muscles):
+        keep_out_shape = self.keepOutShape(node)
+        for muscle in muscles:
+            index = self.variable('$index')
+            source = self.plug(muscle, 'muscleData')
+            destination = '(' + keep_out_shape + ' + ".muscleData[" + ' + index + ' + "]")'
+            self.add('int ' + index)
+            self.add('for (' + index + ' in `getAttr -mi ' + self.plug(keep_out_shape, 'muscleData') + '`) if (`isConnected ' +
+                     source + ' ' + destination + '`) disconnectAttr ' + source + ' ' + destination)
+
+    def commit(self, nodes):
+        """
+        Runs all the MEL collected in one mel.eval call inside a single undo chunk.
+
+        Args:
+            nodes (list): MEL variables of the created nodes.
+
+        Returns:
+            (list): Names of the given nodes.
+        """
+        body = '\n'.join(['    ' + line for line in self.lines])
+        procedure = 'global proc string[] autoCollisionBatch()\n{\n' + body + \
+                    '\n    return {' + ', '.join(nodes) + '};\n}\nautoCollisionBatch();'
+
+        loadPlugin()
+        cmds.undoInfo(openChunk=True)
+        try:
+            created = mel.eval(procedure)
+        finally:
+            # variables only live as long as the procedure, so nothing made in this batch can be used by the next one
+            cmds.undoInfo(closeChunk=True)
+            self.lines = []
+            self.placements = {}
+            self.parents = {}
+            self.keep_outs = {}
+            self.muscle_counts = {}
+
+        return created or []
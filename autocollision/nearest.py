@@ -0,0 +1,335 @@
+import numpy
+from . import solver
+
+
+class KDTree(object):
+    """
+    k-d tree over points, stored in flat arrays as a complete binary tree the same way as bvh.BVH.
+    Node i has children 2i + 1 and 2i + 2, each node splits its points in half along the widest axis of their bounds,
+    the last leaf_count nodes are the leaves, each holding up to leaf_size points of order.
+    """
+    def __init__(self, points, leaf_size=8):
+        """
+        Builds the tree.
+
+        Args:
+            points (numpy.ndarray): P x 3 positions to search.
+
+            leaf_size (int): Maximum amount of points in a leaf.
+        """
+        self.points = numpy.asarray(points, dtype=numpy.float64)
+        self.leaf_size = leaf_size
+        self.depth = 0
+        while 2 ** self.depth * leaf_size < len(self.points):
+            self.depth += 1
+
+        self.leaf_count = 2 ** self.depth
+        self.node_count = 2 * self.leaf_count - 1
+        self.order = numpy.arange(len(self.points))
+
+        # each node owns a contiguous range of order, halved at the median of its widest axis for its children
+        ranges = [(0, len(self.points))]
+        for level in range(self.depth):
+            children = []
+            for start, end in ranges:
+                middle = (start + end) // 2
+                if end - start > 1:
+                    segment = self.order[start:end]
+                    positions = self.points[segment]
+                    axis = numpy.argmax(positions.max(axis=0) - positions.min(axis=0))
+                    split = numpy.argpartition(positions[:, axis], middle - start)
+                    self.order[start:end] = segment[split]
+
+                children += [(start, middle), (middle, end)]
+
+            ranges = children
+
+        # leaf slots past the points of the leaf point to -1 and keep empty bounds
+        self.slots = numpy.full((self.leaf_count, leaf_size), -1, dtype=numpy.int64)
+        for leaf, (start, end) in enumerate(ranges):
+            self.slots[leaf, :end - start] = self.order[start:end]
+
+        self.minimums = numpy.zeros((self.node_count, 3))
+        self.maximums = numpy.zeros((self.node_count, 3))
+        padded = numpy.vstack([self.points, numpy.full((1, 3), numpy.nan)])[self.slots]
+        first_leaf = self.leaf_count - 1
+        with numpy.errstate(invalid='ignore'):
+            self.minimums[first_leaf:] = numpy.where(numpy.isnan(padded), numpy.inf, padded).min(axis=1)
+            self.maximums[first_leaf:] = numpy.where(numpy.isnan(padded), -numpy.inf, padded).max(axis=1)
+
+        for level in range(self.depth - 1, -1, -1):
+            start = 2 ** level - 1
+            end = 2 * start + 1
+            children = slice(end, 2 * end + 1)
+            self.minimums[start:end] = self.minimums[children].reshape(-1, 2, 3).min(axis=1)
+            self.maximums[start:end] = self.maximums[children].reshape(-1, 2, 3).max(axis=1)
+
+    def boxDistances(self, positions, nodes):
+        """
+        Gets the squared distance from each position to the bounds of its node, zero when inside.
+
+        Args:
+            positions (numpy.ndarray): N x 3 positions.
+
+            nodes (numpy.ndarray): N node indices.
+
+        Returns:
+            (numpy.ndarray): N squared distances, inf for empty nodes.
+        """
+        gaps = numpy.maximum(numpy.maximum(self.minimums[nodes] - positions, 0.0), positions - self.maximums[nodes])
+        return (gaps * gaps).sum(axis=1)
+
+    def query(self, positions):
+        """
+        Finds the closest point to each position. Every position first walks down to the closest leaf to get a
+        distance to beat, then all positions walk down the tree together, skipping nodes further than their best.
+
+        Args:
+            positions (numpy.ndarray): N x 3 positions to find the closest points of.
+
+        Returns:
+            (tuple): N distances to the closest point and N indices of the closest point.
+        """
+        positions = numpy.asarray(positions, dtype=numpy.float64)
+        nearest = numpy.full(len(positions), numpy.inf)
+        closest = numpy.full(len(positions), -1, dtype=numpy.int64)
+        first_leaf = self.leaf_count - 1
+        query_ids = numpy.arange(len(positions))
+
+        nodes = numpy.zeros(len(positions), dtype=numpy.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes + 1
+            right = left + 1
+            nodes = numpy.where(self.boxDistances(positions, right) < self.boxDistances(positions, left), right, left)
+
+        self._testLeaves(positions, query_ids, nodes - first_leaf, nearest, closest)
+
+        nodes = numpy.zeros(len(positions), dtype=numpy.int64)
+        while len(query_ids):
+            keep = self.boxDistances(positions[query_ids], nodes) < nearest[query_ids]
+            query_ids = query_ids[keep]
+            nodes = nodes[keep]
+
+            leaves = nodes >= first_leaf
+            if leaves.any():
+                self._testLeaves(positions, query_ids[leaves], nodes[leaves] - first_leaf, nearest, closest)
+
+            query_ids = numpy.repeat(query_ids[~leaves], 2)
+            nodes = numpy.repeat(nodes[~leaves] * 2, 2) + numpy.tile([1, 2], len(query_ids) // 2)
+
+        return numpy.sqrt(nearest), closest
+
+    def _testLeaves(self, positions, query_ids, leaves, nearest, closest):
+        """
+        Measures positions against the points of the given leaves and keeps the closest point of each position.
+
+        Args:
+            positions (numpy.ndarray): N x 3 all the positions.
+
+            query_ids (numpy.ndarray): Index of each position reaching a leaf.
+
+            leaves (numpy.ndarray): Index of the leaf each position reached.
+
+            nearest (numpy.ndarray): Squared distance to the closest point of each position so far, updated in place.
+
+            closest (numpy.ndarray): Index of the closest point of each position so far, updated in place.
+        """
+        slots = self.slots[leaves]
+        offsets = self.points[slots] - positions[query_ids][:, None, :]
+        distances = (offsets * offsets).sum(axis=2)
+        distances[slots < 0] = numpy.inf
+        best = distances.argmin(axis=1)
+        distances = distances[numpy.arange(len(best)), best]
+        points = slots[numpy.arange(len(best)), best]
+
+        # a position can reach several leaves at once, sort by position then distance to keep its closest one
+        sort = numpy.lexsort((distances, query_ids))
+        first = numpy.ones(len(sort), dtype=bool)
+        first[1:] = query_ids[sort][1:] != query_ids[sort][:-1]
+        sort = sort[first]
+        closer = distances[sort] < nearest[query_ids[sort]]
+        sort = sort[closer]
+        nearest[query_ids[sort]] = distances[sort]
+        closest[query_ids[sort]] = points[sort]
+
+
+def closestPoints(positions, first_vertices, second_vertices, third_vertices):
+    """
+    Gets the closest point on each triangle to each position, checking the vertex, edge and face regions of the
+    triangle the same way as Ericson's Real-Time Collision Detection. Arrays are paired row by row.
+
+    Args:
+        positions (numpy.ndarray): N x 3 positions.
+
+        first_vertices (numpy.ndarray): N x 3 first vertex of each triangle.
+
+        second_vertices (numpy.ndarray): N x 3 second vertex of each triangle.
+
+        third_vertices (numpy.ndarray): N x 3 third vertex of each triangle.
+
+    Returns:
+        (numpy.ndarray): N x 3 closest points.
+    """
+    def dot(first, second):
+        return (first * second).sum(axis=1)
+
+    a, b, c, p = first_vertices, second_vertices, third_vertices, positions
+    ab = b - a
+    ac = c - a
+    ap = p - a
+    bp = p - b
+    cp = p - c
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    vc = d1 * d4 - d3 * d2
+    vb = d5 * d2 - d1 * d6
+    va = d3 * d6 - d5 * d4
+
+    # every region is computed, select keeps the first one each position is in
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        denominator = 1.0 / (va + vb + vc)
+        regions = [((d1 <= 0) & (d2 <= 0), a),
+                   ((d3 >= 0) & (d4 <= d3), b),
+                   ((vc <= 0) & (d1 >= 0) & (d3 <= 0), a + ab * (d1 / (d1 - d3))[:, None]),
+                   ((d6 >= 0) & (d5 <= d6), c),
+                   ((vb <= 0) & (d2 >= 0) & (d6 <= 0), a + ac * (d2 / (d2 - d6))[:, None]),
+                   ((va <= 0) & (d4 >= d3) & (d5 >= d6), b + (c - b) * ((d4 - d3) / ((d4 - d3) + (d5 - d6)))[:, None])]
+        inside = a + ab * (vb * denominator)[:, None] + ac * (vc * denominator)[:, None]
+
+    conditions = [numpy.repeat(condition[:, None], 3, axis=1) for condition, _ in regions]
+    return numpy.select(conditions, [point for _, point in regions], inside)
+
+
+class Surface(object):
+    """
+    Finds the closest point and normal on a mesh. A k-d tree finds the closest vertex, then the closest point is
+    searched on the triangles around that vertex. This is exact on evenly tessellated meshes and a close
+    approximation on meshes with long thin triangles.
+    """
+    def __init__(self, points, triangles):
+        """
+        Args:
+            points (numpy.ndarray): P x 3 positions of the mesh's vertices.
+
+            triangles (numpy.ndarray): T x 3 vertex indices of each triangle, counter clockwise seen from outside.
+        """
+        self.points = numpy.asarray(points, dtype=numpy.float64)
+        self.triangles = numpy.asarray(triangles, dtype=numpy.int64).reshape(-1, 3)
+        self.tree = KDTree(self.points)
+
+        normals = numpy.cross(self.points[self.triangles[:, 1]] - self.points[self.triangles[:, 0]],
+                              self.points[self.triangles[:, 2]] - self.points[self.triangles[:, 0]])
+        lengths = numpy.linalg.norm(normals, axis=1)
+        lengths[lengths < solver.epsilon] = 1.0
+        self.normals = normals / lengths[:, None]
+
+        # triangles around each vertex, as ranges of vertex_triangles
+        corners = self.triangles.ravel()
+        sort = numpy.argsort(corners, kind='stable')
+        self.vertex_triangles = sort // 3
+        self.vertex_starts = numpy.searchsorted(corners[sort], numpy.arange(len(self.points) + 1))
+
+    def closest(self, positions):
+        """
+        Gets the closest point on the mesh to each position, with the normal of the triangle it is on.
+
+        Args:
+            positions (numpy.ndarray): N x 3 positions.
+
+        Returns:
+            (tuple): N distances, N x 3 closest points and N x 3 normals.
+        """
+        positions = numpy.asarray(positions, dtype=numpy.float64)
+        _, vertices = self.tree.query(positions)
+
+        # pair every position with each triangle around its closest vertex
+        starts = self.vertex_starts[vertices]
+        counts = self.vertex_starts[vertices + 1] - starts
+        query_ids = numpy.repeat(numpy.arange(len(positions)), counts)
+        offsets = numpy.arange(len(query_ids)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        triangles = self.vertex_triangles[numpy.repeat(starts, counts) + offsets]
+
+        corners = self.points[self.triangles[triangles]]
+        points = closestPoints(positions[query_ids], corners[:, 0], corners[:, 1], corners[:, 2])
+        distances = numpy.linalg.norm(points - positions[query_ids], axis=1)
+
+        # keep the closest triangle of each position, positions on a lone vertex keep the vertex
+        nearest = numpy.linalg.norm(self.points[vertices] - positions, axis=1)
+        closest_points = self.points[vertices].copy()
+        normals = numpy.zeros((len(positions), 3))
+        sort = numpy.lexsort((distances, query_ids))
+        first = numpy.ones(len(sort), dtype=bool)
+        first[1:] = query_ids[sort][1:] != query_ids[sort][:-1]
+        sort = sort[first]
+        nearest[query_ids[sort]] = distances[sort]
+        closest_points[query_ids[sort]] = points[sort]
+        normals[query_ids[sort]] = self.normals[triangles[sort]]
+        return nearest, closest_points, normals
+
+
+def exactDistances(positions, points, triangles, chunk_size=65536):
+    """
+    Gets the exact distance from each position to a mesh. Surface.closest gives an upper bound of each distance, then
+    every triangle whose bounding box is within that bound is tested, so long thin triangles are never missed.
+    Much slower than Surface.closest, meant for one off measurements.
+
+    Args:
+        positions (numpy.ndarray): N x 3 positions.
+
+        points (numpy.ndarray): P x 3 positions of the mesh's vertices.
+
+        triangles (numpy.ndarray): T x 3 vertex indices of each triangle.
+
+        chunk_size (int): Maximum amount of position/bounding box pairs tested at once.
+
+    Returns:
+        (numpy.ndarray): N distances.
+    """
+    positions = numpy.asarray(positions, dtype=numpy.float64)
+    points = numpy.asarray(points, dtype=numpy.float64)
+    triangles = numpy.asarray(triangles, dtype=numpy.int64).reshape(-1, 3)
+    corners = points[triangles]
+    minimums = corners.min(axis=1)
+    maximums = corners.max(axis=1)
+    nearest, _, _ = Surface(points, triangles).closest(positions)
+    step = max(1, chunk_size // max(1, len(triangles)))
+
+    for start in range(0, len(positions), step):
+        chunk = positions[start:start + step]
+        gaps = numpy.maximum(numpy.maximum(minimums[None] - chunk[:, None], chunk[:, None] - maximums[None]), 0.0)
+        query_ids, triangle_ids = numpy.nonzero(numpy.linalg.norm(gaps, axis=2) <= nearest[start:start + step, None])
+        candidates = corners[triangle_ids]
+        closest = closestPoints(chunk[query_ids], candidates[:, 0], candidates[:, 1], candidates[:, 2])
+        numpy.minimum.at(nearest[start:start + step], query_ids, numpy.linalg.norm(closest - chunk[query_ids], axis=1))
+
+    return nearest
+
+
+def surfaceDirections(positions, meshes):
+    """
+    Gets the direction to push each position along from the closest surface of all the given meshes, its outward
+    normal, so that controls get pushed straight out of whatever surface they are closest to.
+
+    Args:
+        positions (numpy.ndarray): N x 3 positions of the controls.
+
+        meshes (list): (points, triangles) of each collision mesh in world space, with outward normals.
+
+    Returns:
+        (tuple): N x 3 normalized directions, zero where no surface was found, and N distances to the closest surface.
+    """
+    positions = numpy.asarray(positions, dtype=numpy.float64)
+    nearest = numpy.full(len(positions), numpy.inf)
+    directions = numpy.zeros((len(positions), 3))
+
+    for points, triangles in meshes:
+        if not len(triangles):
+            continue
+
+        distances, _, normals = Surface(points, triangles).closest(positions)
+        closer = distances < nearest
+        nearest[closer] = distances[closer]
+        directions[closer] = normals[closer]
+
+    return directions, nearest
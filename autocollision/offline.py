@@ -0,0 +1,283 @@
+import os
+import json
+import hashlib
+import collections
+import multiprocessing
+import numpy
+from . import bvh
+from . import cache
+from . import sdf
+from . import solver
+
+
+def writeExport(directory, start_frame, controls, positions, directions, parent_inverses, weights, meshes):
+    """
+    Writes everything the offline solver needs to bake a collision module, one .npy file per array so that
+    each worker can memory map only the frames it solves.
+
+    Args:
+        directory (string): Directory to write the export to, created if it does not exist.
+
+        start_frame (int): Frame of the first entry of every per frame array.
+
+        controls (list): Names of the controls, in the order they are stored in.
+
+        positions (numpy.ndarray): F x N x 3 world position of each control's keepOut before collision.
+
+        directions (numpy.ndarray): F x N x 3 world direction each control gets pushed in.
+
+        parent_inverses (numpy.ndarray): F x N x 4 x 4 parent inverse matrix of each control's collision offset.
+
+        weights (numpy.ndarray): F x N autoCollisionWeight of each control, ones if there is no blender.
+
+        meshes (list): (F x P x 3 world points, T x 3 triangles) of each collision mesh.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    arrays = {'positions': positions, 'directions': directions, 'parent_inverses': parent_inverses, 'weights': weights}
+    for index, (points, triangles) in enumerate(meshes):
+        arrays['mesh' + str(index) + '_points'] = points
+        arrays['mesh' + str(index) + '_triangles'] = triangles
+
+    for name, array in arrays.items():
+        numpy.save(os.path.join(directory, name + '.npy'), numpy.asarray(array))
+
+    metadata = {'start_frame': int(start_frame), 'end_frame': int(start_frame) + len(positions) - 1,
+                'controls': list(controls), 'mesh_count': len(meshes)}
+    with open(os.path.join(directory, 'export.json'), 'w') as open_file:
+        json.dump(metadata, open_file, indent=4)
+
+
+def loadExport(directory):
+    """
+    Memory maps an export written by writeExport.
+
+    Args:
+        directory (string): Directory the export was written to.
+
+    Returns:
+        (dictionary): The export's metadata, plus every array memory mapped under its name and
+        "meshes" as a list of (points, triangles).
+    """
+    with open(os.path.join(directory, 'export.json')) as open_file:
+        export = json.load(open_file)
+
+    for name in ['positions', 'directions', 'parent_inverses', 'weights']:
+        export[name] = numpy.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+
+    export['meshes'] = []
+    for index in range(export['mesh_count']):
+        points = numpy.load(os.path.join(directory, 'mesh' + str(index) + '_points.npy'), mmap_mode='r')
+        triangles = numpy.load(os.path.join(directory, 'mesh' + str(index) + '_triangles.npy'))
+        export['meshes'].append((points, triangles))
+
+    return export
+
+
+class Evaluator(object):
+    """
+    Solves collisions one frame at a time, keeping what it can between frames so scrubbing and playback stay cheap.
+    Every control starts its raycasts from the triangle it hit on the last frame solved, see bvh.BVH.raycast, BVHs
+    are only refit when their mesh moved, and the results of recent frames are kept in an LRU cache keyed by frame
+    and a hash of every input, so a frame solved again only costs the hash.
+    """
+    def __init__(self, triangles, cache_size=256):
+        """
+        Args:
+            triangles (list): T x 3 vertex indices of each triangle of each collision mesh.
+
+            cache_size (int): Amount of frames to keep the results of, 0 keeps none.
+        """
+        self.triangles = [numpy.asarray(mesh_triangles, dtype=numpy.int64) for mesh_triangles in triangles]
+        self.cache_size = cache_size
+        self.results = collections.OrderedDict()
+        self.trees = None
+        self.digests = None
+        self.hints = None
+        self.cache_hits = 0
+        self.solves = 0
+
+    @staticmethod
+    def digest(arrays):
+        """
+        Gets a hash of the values of the given arrays.
+
+        Args:
+            arrays (list): Arrays to hash.
+
+        Returns:
+            (string): Hex digest of the arrays.
+        """
+        digest = hashlib.sha1()
+        for array in arrays:
+            digest.update(numpy.ascontiguousarray(array, dtype=numpy.float64).tobytes())
+
+        return digest.hexdigest()
+
+    def solve(self, frame, positions, directions, meshes):
+        """
+        Pushes every position out of the collision meshes, see solver.keepOut.
+
+        Args:
+            frame (float): Frame the inputs are of.
+
+            positions (numpy.ndarray): N x 3 world position of each control's keepOut before collision.
+
+            directions (numpy.ndarray): N x 3 world direction each control gets pushed in.
+
+            meshes (list): P x 3 world points of each collision mesh, in the same order as the triangles.
+
+        Returns:
+            (numpy.ndarray): N x 3 pushed out positions, read only as they may be kept in the cache.
+        """
+        digests = [self.digest([points]) for points in meshes]
+        key = (frame, self.digest([positions, directions]), tuple(digests)) if self.cache_size else None
+        if key in self.results:
+            # moved to the end as the most recently used
+            self.results[key] = self.results.pop(key)
+            self.cache_hits += 1
+            return self.results[key]
+
+        if self.trees is None:
+            self.trees = [bvh.BVH(points, triangles) for points, triangles in zip(meshes, self.triangles)]
+        else:
+            [tree.refit(points) for tree, points, digest, last in zip(self.trees, meshes, digests, self.digests)
+             if digest != last]
+
+        self.digests = digests
+        if self.hints is None or any([len(hints) != len(positions) for hints in self.hints]):
+            self.hints = [numpy.full(len(positions), -1, dtype=numpy.int64) for _ in meshes]
+
+        pushed = solver.keepOut(positions, directions, self.trees, hints=self.hints)
+        pushed.flags.writeable = False
+        self.solves += 1
+
+        if self.cache_size:
+            self.results[key] = pushed
+            while len(self.results) > self.cache_size:
+                self.results.popitem(last=False)
+
+        return pushed
+
+
+def solveFrames(directory, start_index, end_index, fields=None):
+    """
+    Solves the collision offsets of a chunk of frames of an export. Each mesh gets a BVH built on the first frame of
+    the chunk that is refit on every frame after that, and each control starts from the triangle it hit on the frame
+    before, see Evaluator.
+    With fields, frames where every mesh is a rigid move of its first exported frame are solved with the signed
+    distance fields instead, see sdf.keepOut, only frames where a mesh deforms use the BVHs.
+
+    Args:
+        directory (string): Directory of the export.
+
+        start_index (int): Index of the first frame to solve in the export's arrays.
+
+        end_index (int): Index after the last frame to solve.
+
+        fields (list): OPTIONAL. Path of the signed distance field of each mesh, see sdf.fetch.
+
+    Returns:
+        (tuple): start_index and the (end_index - start_index) x N x 3 float32 offsets solved.
+    """
+    export = loadExport(directory)
+    offsets = numpy.empty((end_index - start_index, len(export['controls']), 3), dtype=numpy.float32)
+    fields = [sdf.load(path) for path in fields] if fields else []
+
+    # every frame is solved once, so there is nothing to cache
+    evaluator = Evaluator([triangles for _, triangles in export['meshes']], cache_size=0)
+
+    for index in range(start_index, end_index):
+        transforms = [sdf.rigidTransform(points[0], points[index]) for points, _ in export['meshes']] if fields else []
+        if fields and all([error <= field.cell_size * sdf.rigid_tolerance
+                           for field, (_, _, _, error) in zip(fields, transforms)]):
+            pushed = sdf.keepOut(export['positions'][index], export['directions'][index], fields,
+                                 [transform[:3] for transform in transforms])
+        else:
+            pushed = evaluator.solve(index, export['positions'][index], export['directions'][index],
+                                     [points[index] for points, _ in export['meshes']])
+
+        # what the point constraint outputs is the pushed position in the space of the offset's parent
+        pushed = numpy.hstack([pushed, numpy.ones((len(pushed), 1))])
+        local = numpy.einsum('nk,nkj->nj', pushed, export['parent_inverses'][index])[:, :3]
+        offsets[index - start_index] = local * export['weights'][index][:, None]
+
+    return start_index, offsets
+
+
+def _solveFrames(arguments):
+    """
+    Unpacks the arguments of solveFrames for the process pool.
+    """
+    return solveFrames(*arguments)
+
+
+def bake(directory, path, workers=None, chunk_size=None, progress=None, cell_size=None, field_directory=None):
+    """
+    Bakes an export into a cache file, splitting the frames into chunks solved in a pool of processes.
+    Chunks are written at their frame in the cache as they finish, so the cache is the same whatever the worker count.
+    When running inside Maya, call multiprocessing.set_executable with the path of mayapy first.
+    With a cell_size, every mesh gets a signed distance field of its first exported frame that rigid frames are
+    solved with, see solveFrames. Fields are kept on disk and reused until the mesh's topology or rest shape changes.
+
+    Args:
+        directory (string): Directory of the export made by mayabake.export or writeExport.
+
+        path (string): Path of the .npy cache file to write.
+
+        workers (int): OPTIONAL. Amount of processes to use, all cores if None. 1 solves in this process.
+
+        chunk_size (int): OPTIONAL. Amount of frames each process solves at once, split evenly between workers if None.
+
+        progress (function): OPTIONAL. Called with the amount of frames done and the total after each chunk.
+
+        cell_size (float): OPTIONAL. Distance between the samples of the signed distance fields, no fields are used
+        if None.
+
+        field_directory (string): OPTIONAL. Directory to keep the fields in, a "fields" directory in the export if None.
+
+    Returns:
+        (string): Path of the cache written.
+    """
+    export = loadExport(directory)
+    frame_count = export['end_frame'] - export['start_frame'] + 1
+    workers = workers if workers else multiprocessing.cpu_count()
+    chunk_size = chunk_size if chunk_size else max(1, -(-frame_count // (workers * 4)))
+
+    # fields are built here once, workers only memory map them
+    fields = None
+    if cell_size and frame_count > 0:
+        field_directory = field_directory or os.path.join(directory, 'fields')
+        fields = [sdf.fetch(field_directory, points[0], triangles, cell_size) for points, triangles in export['meshes']]
+
+    chunks = [(directory, start, min(start + chunk_size, frame_count), fields)
+              for start in range(0, frame_count, chunk_size)]
+    offsets = cache.create(path, export['start_frame'], export['end_frame'], export['controls'])
+    done = 0
+
+    # an export without frames has no chunks, and a single chunk is not worth starting a pool for
+    if workers == 1 or len(chunks) < 2:
+        results = (_solveFrames(chunk) for chunk in chunks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(workers, len(chunks)))
+        results = pool.imap_unordered(_solveFrames, chunks)
+
+    try:
+        for start, chunk in results:
+            offsets[start:start + len(chunk)] = chunk
+            done += len(chunk)
+            if progress:
+                progress(done, frame_count)
+    except BaseException:
+        if pool:
+            pool.terminate()
+        raise
+
+    if pool:
+        pool.close()
+        pool.join()
+
+    offsets.flush()
+    return path
@@ -0,0 +1,183 @@
+import collections
+import contextlib
+import json
+import timeit
+
+
+class Profiler(object):
+    """
+    Records the wall time and call counts of a build for each phase, each control and each scene operation.
+    Give it to builder.create to profile a build, then use report, summary or write to look at the results.
+    """
+    def __init__(self, hooks=None):
+        """
+        Args:
+            hooks (list): OPTIONAL. Functions called with the phase name, control name or None, seconds taken and
+            dictionary of operation call counts every time a phase ends. Useful to send the numbers to telemetry.
+        """
+        self.hooks = list(hooks) if hooks else []
+        self.phases = collections.OrderedDict()
+        self.controls = collections.OrderedDict()
+        self.operations = collections.OrderedDict()
+        self.stack = []
+        self.total = 0.0
+
+    def wrap(self, scene):
+        """
+        Gets a scene that records every operation done through it into this profiler.
+
+        Args:
+            scene (scene.Scene): Scene to profile.
+
+        Returns:
+            (ProfiledScene): Scene to build with.
+        """
+        return ProfiledScene(scene, self)
+
+    @contextlib.contextmanager
+    def phase(self, name, control=None):
+        """
+        Times everything done inside the with block as the given phase. Phases can be nested, operations are counted
+        in every phase they are done in.
+
+        Args:
+            name (string): Name of the phase.
+
+            control (string): OPTIONAL. Name of the control the phase is building, to also time it per control.
+        """
+        calls = collections.Counter()
+        self.stack.append(calls)
+        start = timeit.default_timer()
+
+        try:
+            yield
+        finally:
+            seconds = timeit.default_timer() - start
+            self.stack.pop()
+            self.total += 0.0 if self.stack else seconds
+            self._add(self.phases, name, seconds, calls)
+
+            if control is not None:
+                self._add(self.controls, control, seconds, calls)
+
+            for hook in self.hooks:
+                hook(name, control, seconds, dict(calls))
+
+    @staticmethod
+    def _add(entries, name, seconds, calls):
+        """
+        Adds the time and calls of a phase to the entry of the given name, creating it if needed.
+
+        Args:
+            entries (collections.OrderedDict): Entries to add to.
+
+            name (string): Name of the entry.
+
+            seconds (float): Wall time taken.
+
+            calls (collections.Counter): Amount of times each operation was called.
+        """
+        entry = entries.setdefault(name, {'time': 0.0, 'count': 0, 'calls': collections.Counter()})
+        entry['time'] += seconds
+        entry['count'] += 1
+        entry['calls'].update(calls)
+
+    def record(self, operation, seconds):
+        """
+        Records one call of a scene operation in every phase currently running.
+
+        Args:
+            operation (string): Name of the scene operation.
+
+            seconds (float): Wall time the call took.
+        """
+        entry = self.operations.setdefault(operation, {'time': 0.0, 'calls': 0})
+        entry['time'] += seconds
+        entry['calls'] += 1
+        for calls in self.stack:
+            calls[operation] += 1
+
+    def report(self):
+        """
+        Gets everything recorded as plain dictionaries that can be written as JSON.
+
+        Returns:
+            (dictionary): "total" time of all the outermost phases, "phases" and "controls" with the "time", "count"
+            and operation "calls" of each, and "operations" with the "time" and "calls" of each scene operation.
+        """
+        def entries(source):
+            return collections.OrderedDict([(name, {'time': entry['time'], 'count': entry['count'],
+                                                    'calls': dict(entry['calls'])})
+                                            for name, entry in source.items()])
+
+        return {'total': self.total, 'phases': entries(self.phases), 'controls': entries(self.controls),
+                'operations': collections.OrderedDict([(name, dict(entry)) for name, entry in self.operations.items()])}
+
+    def summary(self, top=10):
+        """
+        Gets a printable summary of the phases, slowest operations and slowest controls.
+
+        Args:
+            top (int): Amount of operations and controls to list.
+
+        Returns:
+            (string): Summary text.
+        """
+        lines = ['Total                          {:>8.4f}'.format(self.total), '',
+                 'Phase                          Time (s)   Count']
+        lines += ['{:<30} {:>8.4f} {:>7}'.format(name, entry['time'], entry['count'])
+                  for name, entry in self.phases.items()]
+
+        lines += ['', 'Operation                      Time (s)   Calls']
+        operations = sorted(self.operations.items(), key=lambda item: -item[1]['time'])[:top]
+        lines += ['{:<30} {:>8.4f} {:>7}'.format(name, entry['time'], entry['calls']) for name, entry in operations]
+
+        if self.controls:
+            lines += ['', 'Control                        Time (s)   Calls']
+            controls = sorted(self.controls.items(), key=lambda item: -item[1]['time'])[:top]
+            lines += ['{:<30} {:>8.4f} {:>7}'.format(name, entry['time'], sum(entry['calls'].values()))
+                      for name, entry in controls]
+
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """
+        Writes the report to a JSON file.
+
+        Args:
+            path (string): Path of the JSON file to write.
+
+        Returns:
+            (string): Path written to.
+        """
+        with open(path, 'w') as open_file:
+            json.dump(self.report(), open_file, indent=4)
+
+        return path
+
+
+class ProfiledScene(object):
+    """
+    Passes every scene operation through to the given scene, recording how long each call takes in the profiler.
+    With a scene that queues operations, such as mayascene.BatchScene, most of the time shows up in commit.
+    """
+    def __init__(self, scene, profiler):
+        self.scene = scene
+        self.profiler = profiler
+
+    def phase(self, name, control=None):
+        return self.profiler.phase(name, control)
+
+    def __getattr__(self, attribute):
+        value = getattr(self.scene, attribute)
+        if not callable(value):
+            return value
+
+        def timed(*args, **kwargs):
+            start = timeit.default_timer()
+            try:
+                return value(*args, **kwargs)
+            finally:
+                self.profiler.record(attribute, timeit.default_timer() - start)
+
+        return timed
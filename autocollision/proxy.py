@@ -0,0 +1,70 @@
+import numpy
+from . import nearest
+
+
+def cluster(points, triangles, tolerance):
+    """
+    Simplifies a triangle mesh by vertex clustering. Space is split into cubes the size of the tolerance, every vertex
+    in a cube is merged into one at their average position, and triangles that collapse are removed.
+    The larger the tolerance, the fewer triangles are left.
+
+    Args:
+        points (numpy.ndarray): P x 3 positions of the mesh's vertices.
+
+        triangles (numpy.ndarray): T x 3 vertex indices of each triangle.
+
+        tolerance (float): Size of the cubes vertices are merged in.
+
+    Returns:
+        (tuple): Positions of the simplified mesh's vertices and vertex indices of each of its triangles.
+        Triangles keep the winding of the triangle they came from.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)
+    triangles = numpy.asarray(triangles, dtype=numpy.int64).reshape(-1, 3)
+    cells = numpy.floor((points - points.min(axis=0)) / tolerance).astype(numpy.int64)
+    _, clusters = numpy.unique(cells, axis=0, return_inverse=True)
+    clusters = clusters.ravel()
+
+    counts = numpy.bincount(clusters)
+    centers = numpy.zeros((len(counts), 3))
+    numpy.add.at(centers, clusters, points)
+    centers /= counts[:, None]
+
+    merged = clusters[triangles]
+    collapsed = (merged[:, 0] == merged[:, 1]) | (merged[:, 1] == merged[:, 2]) | (merged[:, 2] == merged[:, 0])
+    merged = merged[~collapsed]
+
+    # triangles merged onto the same three vertices are kept once
+    _, first = numpy.unique(numpy.sort(merged, axis=1), axis=0, return_index=True)
+    merged = merged[numpy.sort(first)]
+
+    used, compact = numpy.unique(merged, return_inverse=True)
+    return centers[used], compact.reshape(-1, 3)
+
+
+def deviation(points, triangles, proxy_points, proxy_triangles):
+    """
+    Gets the largest distance between a mesh and its proxy, measured exactly from the vertices and triangle centers
+    of each mesh to the surface of the other, see nearest.exactDistances. Triangle centers catch the proxy's long
+    triangles cutting across the source mesh between their vertices.
+
+    Args:
+        points (numpy.ndarray): P x 3 positions of the source mesh's vertices.
+
+        triangles (numpy.ndarray): T x 3 vertex indices of each triangle of the source mesh.
+
+        proxy_points (numpy.ndarray): Positions of the proxy's vertices.
+
+        proxy_triangles (numpy.ndarray): Vertex indices of each triangle of the proxy.
+
+    Returns:
+        (float): Largest distance found.
+    """
+    def samples(mesh_points, mesh_triangles):
+        mesh_points = numpy.asarray(mesh_points, dtype=numpy.float64)
+        mesh_triangles = numpy.asarray(mesh_triangles, dtype=numpy.int64).reshape(-1, 3)
+        return numpy.concatenate([mesh_points, mesh_points[mesh_triangles].mean(axis=1)])
+
+    to_proxy = nearest.exactDistances(samples(points, triangles), proxy_points, proxy_triangles)
+    to_source = nearest.exactDistances(samples(proxy_points, proxy_triangles), points, triangles)
+    return float(max(to_proxy.max(), to_source.max()))
@@ -0,0 +1,168 @@
+import json
+import pymel.core as pm
+from . import mayascene
+from . import scene
+
+
+class PymelScene(scene.Scene):
+    """
+    Runs every operation right away through PyMel, using the selection driven Maya Muscle MEL commands.
+    Nodes are handled and given back as PyNodes. Slower than mayascene.CmdsScene, kept for scripts that want PyNodes.
+    """
+    def error(self, message):
+        pm.error(message)
+
+    def warning(self, message):
+        pm.warning(message)
+
+    def info(self, message):
+        pm.displayInfo(message)
+
+    def node(self, name):
+        return pm.PyNode(mayascene.resolveUuid(name) if scene.isUuid(name) else name)
+
+    def uuids(self, nodes):
+        return mayascene.queryUuids([node.longName() for node in nodes])
+
+    def exists(self, name):
+        return pm.objExists(name)
+
+    def name(self, node):
+        return node.nodeName()
+
+    def path(self, node):
+        return node.longName() if isinstance(node, pm.nt.DagNode) else node.name()
+
+    def xform(self, nodes):
+        return [(pm.xform(node, q=True, worldSpace=True, translation=True),
+                 pm.xform(node, q=True, worldSpace=True, rotation=True)) for node in nodes]
+
+    def localPoints(self, nodes, points):
+        return mayascene.queryLocalPoints([node.longName() for node in nodes], points)
+
+    def boundingBox(self, nodes, frames=None):
+        return mayascene.queryBoundingBoxes([node.longName() for node in nodes], frames)
+
+    def meshData(self, nodes):
+        return mayascene.queryMeshes([node.longName() for node in nodes])
+
+    def meshKeys(self, nodes):
+        return mayascene.queryMeshKeys([node.longName() for node in nodes])
+
+    def getParent(self, node):
+        return node.getParent()
+
+    def children(self, node, node_type=None):
+        return node.getChildren(type=node_type) if node_type else node.getChildren()
+
+    def delete(self, nodes):
+        pm.delete(nodes)
+
+    def group(self, name, parent=None, translation=None, rotation=None):
+        group = pm.group(n=name, em=True)
+
+        if translation:
+            group.t.set(translation)
+
+        if rotation:
+            group.r.set(rotation)
+
+        if parent:
+            pm.parent(group, parent)
+
+        return group
+
+    def spaceLocator(self, name, parent):
+        # setting locator to local 0 will move it to the parent's location
+        locator = pm.spaceLocator(n=name)
+        pm.parent(locator, parent)
+        locator.t.set(0, 0, 0)
+        locator.r.set(0, 0, 0)
+        return locator
+
+    def parent(self, node, parent):
+        if parent:
+            pm.parent(node, parent)
+        else:
+            pm.parent(node, world=True)
+
+        return node
+
+    def pointConstraint(self, target, node):
+        return pm.pointConstraint(target, node, mo=False)
+
+    def parentConstraint(self, target, node):
+        return pm.parentConstraint(target, node, mo=False)
+
+    def scaleConstraint(self, target, node):
+        return pm.scaleConstraint(target, node, mo=False)
+
+    def addAttr(self, node, attribute, minimum, maximum, default):
+        pm.addAttr(node, ln=attribute, min=minimum, max=maximum, dv=default, hidden=False, keyable=True)
+
+    def deleteAttr(self, node, attribute):
+        pm.deleteAttr(node.attr(attribute))
+
+    def setData(self, node, attribute, data):
+        data = scene.mapValues(data, lambda value: value.name() if isinstance(value, pm.PyNode) else value)
+        if not node.hasAttr(attribute):
+            pm.addAttr(node, ln=attribute, dt='string')
+
+        node.attr(attribute).set(json.dumps(data, sort_keys=True))
+
+    def getData(self, node, attribute):
+        return json.loads(node.attr(attribute).get() or 'null') if node.hasAttr(attribute) else None
+
+    def setAttr(self, node, attribute, value):
+        node.attr(attribute).set(value)
+
+    def shadingNode(self, node_type, name):
+        return pm.shadingNode(node_type, n=name, au=True)
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        source.attr(source_attribute) >> destination.attr(destination_attribute)
+
+    def disconnect(self, node, attribute):
+        node.attr(attribute).disconnect()
+
+    def createMesh(self, name, points, triangles, parent=None):
+        flags = {'p': parent} if parent else {}
+        transform = pm.createNode('transform', n=name, ss=True, **flags)
+        shape = pm.createNode('mesh', n=name + 'Shape', p=transform, ss=True)
+        pm.mel.eval(';\n'.join(mayascene.meshCommands(mayascene.BatchScene.quote(shape.longName()), points,
+                                                       triangles)) + ';')
+        return transform
+
+    def wrap(self, node, driver):
+        pm.select(node, driver)
+        pm.mel.eval(mayascene.wrap_command)
+        wrap = node.listHistory(pdo=True, type='wrap')[0]
+        return [wrap, wrap.basePoints[0].inputs()[0]]
+
+    def makeMuscle(self, geometries):
+        mayascene.loadPlugin()
+        for geometry in geometries:
+            pm.select(geometry)
+            pm.mel.eval('cMuscle_makeMuscle(0);')
+
+        # the MEL commands find the muscle objects from the geometry selected
+        return geometries
+
+    def findMuscle(self, geometry):
+        return geometry if geometry.getShapes(type='cMuscleObject') else None
+
+    def rigKeepOut(self, node):
+        # must have nodes selected for that mel command
+        mayascene.loadPlugin()
+        pm.select(node)
+        return [pm.PyNode(muscle_node) for muscle_node in pm.mel.eval('cMuscle_rigKeepOutSel();')]
+
+    def keepOutAddMuscle(self, node, muscles):
+        pm.select(node)
+        pm.select(muscles, add=True)
+        pm.mel.eval('cMuscle_keepOutAddRemMuscle(1);')
+
+    def keepOutRemoveMuscle(self, node, muscles):
+        pm.select(node)
+        pm.select(muscles, add=True)
+        pm.mel.eval('cMuscle_keepOutAddRemMuscle(0);')
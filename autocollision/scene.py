@@ -0,0 +1,982 @@
+import re
+import collections
+import contextlib
+import json
+import math
+import uuid
+
+
+# maya.cmds gives unicode names under Python 2
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+uuid_pattern = re.compile(r'^[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}$')
+
+
+def isUuid(name):
+    """
+    Checks whether the given name is a node UUID rather than a name or path. Node names cannot hold dashes.
+
+    Args:
+        name (object): Name, path, UUID or handle of a node.
+
+    Returns:
+        (boolean): True if name is a UUID string.
+    """
+    return isinstance(name, string_types) and bool(uuid_pattern.match(name))
+
+
+def mapValues(data, function):
+    """
+    Copies nested dictionaries and lists, passing every other value through the given function.
+
+    Args:
+        data (object): Dictionary, list or value to copy.
+
+        function (function): Called with each value that is not a dictionary or list, returns what to copy instead.
+
+    Returns:
+        (object): Copy of data.
+    """
+    if isinstance(data, dict):
+        return dict([(key, mapValues(value, function)) for key, value in data.items()])
+
+    if isinstance(data, (list, tuple)):
+        return [mapValues(value, function) for value in data]
+
+    return function(data)
+
+
+class Scene(object):
+    """
+    Interface of all the scene operations needed to build collisions. Nodes are passed around as handles,
+    what a handle is depends on the backend, so only use handles given back by the same scene.
+    """
+    @contextlib.contextmanager
+    def phase(self, name, control=None):
+        """
+        Marks everything done inside the with block as a phase of the build, for scenes that profile builds.
+
+        Args:
+            name (string): Name of the phase.
+
+            control (string): OPTIONAL. Name of the control the phase is building.
+        """
+        yield
+
+    def error(self, message):
+        """
+        Stops the build with the given message.
+
+        Args:
+            message (string): Message to display.
+        """
+        raise RuntimeError(message)
+
+    def warning(self, message):
+        """
+        Displays a warning without stopping the build.
+
+        Args:
+            message (string): Message to display.
+        """
+        pass
+
+    def info(self, message):
+        """
+        Displays a message about the build.
+
+        Args:
+            message (string): Message to display.
+        """
+        pass
+
+    def node(self, name):
+        """
+        Gets the handle of an existing node. UUIDs stay unique when short names are not, such as across references,
+        and keep working when nodes are renamed or reparented.
+
+        Args:
+            name (string): Name, full path or UUID of the node.
+
+        Returns:
+            (object): Handle of the node.
+        """
+        raise NotImplementedError
+
+    def uuids(self, nodes):
+        """
+        Gets the UUID of all the given nodes in one pass.
+
+        Args:
+            nodes (list): Handles of the nodes.
+
+        Returns:
+            (list): UUID string of each node.
+        """
+        raise NotImplementedError
+
+    def exists(self, name):
+        """
+        Checks whether a node with the given name exists.
+
+        Args:
+            name (string): Name of the node.
+
+        Returns:
+            (boolean): True if the node exists.
+        """
+        raise NotImplementedError
+
+    def name(self, node):
+        """
+        Gets the short name of a node, used to name the nodes created for it.
+
+        Args:
+            node (object): Handle of the node.
+
+        Returns:
+            (string): Name of the node without its path.
+        """
+        raise NotImplementedError
+
+    def path(self, node):
+        """
+        Gets the full path of a node, which finds it even when its short name is not unique, such as in referenced rigs.
+
+        Args:
+            node (object): Handle of the node.
+
+        Returns:
+            (string): Full path of DAG nodes, name of other nodes.
+        """
+        raise NotImplementedError
+
+    def xform(self, nodes):
+        """
+        Gets the world translation and rotation of all the given nodes in one pass.
+
+        Args:
+            nodes (list): Handles of the transforms to query.
+
+        Returns:
+            (list): A (translation, rotation) tuple for each node, rotation in degrees.
+        """
+        raise NotImplementedError
+
+    def localPoints(self, nodes, points):
+        """
+        Brings each given world position into the space of its node through the inverse of the node's full world
+        matrix, scale included, which is the space a distanceBetween brings its points out of.
+
+        Args:
+            nodes (list): Handles of the transforms.
+
+            points (list): World position for each node.
+
+        Returns:
+            (list): Position in the space of each node.
+        """
+        raise NotImplementedError
+
+    def boundingBox(self, nodes, frames=None):
+        """
+        Gets the world space bounding box of each given node, grown to hold the node at every given frame.
+
+        Args:
+            nodes (list): Handles of the nodes to query.
+
+            frames (list): OPTIONAL. Frames to sweep the nodes over, current frame only if None.
+
+        Returns:
+            (list): A (minimum, maximum) tuple of corners for each node.
+        """
+        raise NotImplementedError
+
+    def meshData(self, nodes):
+        """
+        Gets the world space vertex positions and triangles of each given mesh in one pass.
+
+        Args:
+            nodes (list): Handles of the mesh transforms to query.
+
+        Returns:
+            (list): A (points, triangles) tuple for each node, triangles as three vertex indices each.
+        """
+        raise NotImplementedError
+
+    def meshKeys(self, nodes):
+        """
+        Gets what identifies each given mesh without reading its points: the UUID of its shape, its vertex count and
+        its triangle count. The key changes when the mesh is replaced or its topology changes, not when it deforms.
+
+        Args:
+            nodes (list): Handles of the mesh transforms to query.
+
+        Returns:
+            (list): A (uuid, vertex count, triangle count) tuple for each node.
+        """
+        raise NotImplementedError
+
+    def getParent(self, node):
+        """
+        Gets the parent of the given node.
+
+        Args:
+            node (object): Handle of node to get parent of.
+
+        Returns:
+            (object): Handle of the parent, None if the node is parented to the world.
+        """
+        raise NotImplementedError
+
+    def children(self, node, node_type=None):
+        """
+        Gets the children of the given node.
+
+        Args:
+            node (object): Handle of node to get children of.
+
+            node_type (string): OPTIONAL. If given, only children of this type are returned.
+
+        Returns:
+            (list): Handles of the children.
+        """
+        raise NotImplementedError
+
+    def delete(self, nodes):
+        """
+        Deletes the given nodes along with their children.
+
+        Args:
+            nodes (list): Handles of the nodes to delete.
+        """
+        raise NotImplementedError
+
+    def group(self, name, parent=None, translation=None, rotation=None):
+        """
+        Creates an empty transform at the given world position, then parents it while keeping that position.
+
+        Args:
+            name (string): Name of the group.
+
+            parent (object): OPTIONAL. Handle of the node to parent the group to.
+
+            translation (list): OPTIONAL. World translation of the group.
+
+            rotation (list): OPTIONAL. World rotation of the group in degrees.
+
+        Returns:
+            (object): Handle of the group created.
+        """
+        raise NotImplementedError
+
+    def spaceLocator(self, name, parent):
+        """
+        Creates a locator zeroed out under the given parent.
+
+        Args:
+            name (string): Name of the locator.
+
+            parent (object): Handle of the node to parent the locator to.
+
+        Returns:
+            (object): Handle of the locator's transform.
+        """
+        raise NotImplementedError
+
+    def parent(self, node, parent):
+        """
+        Parents the given node while keeping its world position.
+
+        Args:
+            node (object): Handle of the node to parent.
+
+            parent (object): Handle of the new parent, None to parent to the world.
+
+        Returns:
+            (object): Handle of the node, use this one from now on since the parenting could invalidate the old one.
+        """
+        raise NotImplementedError
+
+    def pointConstraint(self, target, node):
+        """
+        Point constrains the given node to the given target without maintaining offset.
+
+        Args:
+            target (object): Handle of the driver.
+
+            node (object): Handle of the node to drive.
+
+        Returns:
+            (object): Handle of the constraint created.
+        """
+        raise NotImplementedError
+
+    def parentConstraint(self, target, node):
+        """
+        Parent constrains the given node to the given target without maintaining offset.
+
+        Args:
+            target (object): Handle of the driver.
+
+            node (object): Handle of the node to drive.
+
+        Returns:
+            (object): Handle of the constraint created.
+        """
+        raise NotImplementedError
+
+    def scaleConstraint(self, target, node):
+        """
+        Scale constrains the given node to the given target without maintaining offset.
+
+        Args:
+            target (object): Handle of the driver.
+
+            node (object): Handle of the node to drive.
+
+        Returns:
+            (object): Handle of the constraint created.
+        """
+        raise NotImplementedError
+
+    def addAttr(self, node, attribute, minimum, maximum, default):
+        """
+        Adds a keyable float attribute to the given node.
+
+        Args:
+            node (object): Handle of node to add attribute to.
+
+            attribute (string): Long name of the attribute.
+
+            minimum (float): Minimum value of the attribute.
+
+            maximum (float): Maximum value of the attribute.
+
+            default (float): Default value of the attribute.
+        """
+        raise NotImplementedError
+
+    def deleteAttr(self, node, attribute):
+        """
+        Deletes an attribute that was added to the given node.
+
+        Args:
+            node (object): Handle of node with attribute.
+
+            attribute (string): Long name of the attribute.
+        """
+        raise NotImplementedError
+
+    def setData(self, node, attribute, data):
+        """
+        Stores data as JSON in a string attribute, adding the attribute if the node does not have it yet.
+        Handles of nodes anywhere in the data are stored as the names of the nodes.
+
+        Args:
+            node (object): Handle of node to store data on.
+
+            attribute (string): Long name of the string attribute.
+
+            data (object): Dictionaries, lists, strings, numbers, booleans, None and node handles to store.
+        """
+        raise NotImplementedError
+
+    def getData(self, node, attribute):
+        """
+        Gets the data stored with setData.
+
+        Args:
+            node (object): Handle of node data is stored on.
+
+            attribute (string): Long name of the string attribute.
+
+        Returns:
+            (object): Data stored, with node names instead of handles. None if node does not have the attribute.
+        """
+        raise NotImplementedError
+
+    def setAttr(self, node, attribute, value):
+        """
+        Sets the value of the given attribute.
+
+        Args:
+            node (object): Handle of node with attribute to set.
+
+            attribute (string): Name of the attribute.
+
+            value (object): Float, or list of floats for compound attributes.
+        """
+        raise NotImplementedError
+
+    def shadingNode(self, node_type, name):
+        """
+        Creates a utility node.
+
+        Args:
+            node_type (string): Type of node to create, such as "blendColors".
+
+            name (string): Name of the node.
+
+        Returns:
+            (object): Handle of the node created.
+        """
+        raise NotImplementedError
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        """
+        Connects the source attribute to the destination attribute.
+
+        Args:
+            source (object): Handle of the node to connect from.
+
+            source_attribute (string): Name of the attribute to connect from.
+
+            destination (object): Handle of the node to connect to.
+
+            destination_attribute (string): Name of the attribute to connect to.
+        """
+        raise NotImplementedError
+
+    def disconnect(self, node, attribute):
+        """
+        Breaks the incoming connection of the given attribute, if any.
+
+        Args:
+            node (object): Handle of the node with the attribute to disconnect.
+
+            attribute (string): Name of the attribute to disconnect.
+        """
+        raise NotImplementedError
+
+    def createMesh(self, name, points, triangles, parent=None):
+        """
+        Creates a transform with a triangle mesh shape.
+
+        Args:
+            name (string): Name of the mesh's transform.
+
+            points (list): World positions of the mesh's vertices.
+
+            triangles (list): Three vertex indices for each triangle of the mesh.
+
+            parent (object): OPTIONAL. Handle of the node to parent the mesh to, should not be transformed.
+
+        Returns:
+            (object): Handle of the mesh's transform.
+        """
+        raise NotImplementedError
+
+    def wrap(self, node, driver):
+        """
+        Makes the given mesh follow the driver mesh with a wrap deformer.
+
+        Args:
+            node (object): Handle of the mesh transform to deform.
+
+            driver (object): Handle of the mesh transform that drives the deformation.
+
+        Returns:
+            (list): Handles of the wrap deformer and of the base mesh made for it.
+        """
+        raise NotImplementedError
+
+    def makeMuscle(self, geometries):
+        """
+        Turns the given geometry into muscle objects keepOut nodes can collide against, like cMuscle_makeMuscle.
+
+        Args:
+            geometries (list): Handles of the mesh transforms to convert.
+
+        Returns:
+            (list): Handle for each muscle object, to be given to keepOutAddMuscle.
+        """
+        raise NotImplementedError
+
+    def findMuscle(self, geometry):
+        """
+        Gets the muscle object the given geometry was already turned into.
+
+        Args:
+            geometry (object): Handle of the mesh transform.
+
+        Returns:
+            (object): Handle of the muscle object, to be given to keepOutAddMuscle. None if geometry is not a muscle.
+        """
+        raise NotImplementedError
+
+    def rigKeepOut(self, node):
+        """
+        Rigs a keepOut node above the given transform, like cMuscle_rigKeepOut.
+        The given node is parented under the driven group, which is the group that gets pushed by collisions.
+
+        Args:
+            node (object): Handle of the transform to rig. Must not have any children yet.
+
+        Returns:
+            (list): Handles of the keepOut transform, the cMuscleKeepOut node and the driven group.
+        """
+        raise NotImplementedError
+
+    def keepOutAddMuscle(self, node, muscles):
+        """
+        Makes the keepOut rigged on the given node collide with the given muscle objects.
+
+        Args:
+            node (object): Handle of the transform that was given to rigKeepOut.
+
+            muscles (list): Handles returned by makeMuscle.
+        """
+        raise NotImplementedError
+
+    def keepOutRemoveMuscle(self, node, muscles):
+        """
+        Stops the keepOut rigged on the given node from colliding with the given muscle objects.
+
+        Args:
+            node (object): Handle of the transform that was given to rigKeepOut.
+
+            muscles (list): Handles returned by makeMuscle or findMuscle.
+        """
+        raise NotImplementedError
+
+    def commit(self, nodes):
+        """
+        Runs anything the scene might have queued up and gets the final version of the given nodes.
+
+        Args:
+            nodes (list): Handles of created nodes.
+
+        Returns:
+            (list): Nodes as they should be given back to the user.
+        """
+        return nodes
+
+
+class MemoryNode(object):
+    """
+    A node of the MemoryScene. Only stores what the build needs, world transforms are not evaluated through the
+    hierarchy, each node just keeps the world transform it was placed at.
+    """
+    def __init__(self, name, node_type, parent=None):
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.children = []
+        self.attributes = {}
+        self.translation = (0.0, 0.0, 0.0)
+        self.rotation = (0.0, 0.0, 0.0)
+        self.scale = (1.0, 1.0, 1.0)
+        self.points = None
+        self.triangles = None
+        self.uuid = str(uuid.uuid4()).upper()
+
+        if parent:
+            parent.children.append(self)
+            self.translation = parent.translation
+            self.rotation = parent.rotation
+            self.scale = parent.scale
+
+    def __repr__(self):
+        return 'MemoryNode(' + repr(self.name) + ', ' + repr(self.type) + ')'
+
+
+class MemoryScene(Scene):
+    """
+    Pure python scene that records the nodes, connections and calls a build makes.
+    Useful for testing and benchmarking builds without Maya.
+    """
+    def __init__(self):
+        self.nodes = collections.OrderedDict()
+        # connections are kept in order as the keys of a dictionary, so they can be removed without searching
+        self.connections = collections.OrderedDict()
+        self.inputs = {}
+        self.calls = collections.Counter()
+        self.warnings = []
+        self.messages = []
+        self.keep_outs = {}
+
+    def createNode(self, node_type, name, parent=None):
+        """
+        Creates a node with a unique name, the same way Maya would rename it if the name is taken.
+
+        Args:
+            node_type (string): Type of node.
+
+            name (string): Name of node.
+
+            parent (MemoryNode): OPTIONAL. Node to parent the created node to.
+
+        Returns:
+            (MemoryNode): Node created.
+        """
+        if name in self.nodes:
+            base = name.rstrip('0123456789')
+            index = 1
+            while base + str(index) in self.nodes:
+                index += 1
+            name = base + str(index)
+
+        node = MemoryNode(name, node_type, parent)
+        self.nodes[name] = node
+        return node
+
+    def createMesh(self, name, points, triangles, parent=None):
+        self.calls['createMesh'] += 1
+        transform = self.createNode('transform', name, parent)
+        transform.points = [tuple(point) for point in points]
+        transform.triangles = [tuple(triangle) for triangle in triangles]
+        self.createNode('mesh', transform.name + 'Shape', transform)
+        return transform
+
+    def nodeCount(self, node_type=None):
+        """
+        Gets the number of nodes in the scene.
+
+        Args:
+            node_type (string): OPTIONAL. If given, will only count nodes of that type.
+
+        Returns:
+            (int): Number of nodes.
+        """
+        if node_type is None:
+            return len(self.nodes)
+
+        return len([node for node in self.nodes.values() if node.type == node_type])
+
+    def incoming(self, node, attribute):
+        """
+        Gets the connection driving the given attribute.
+
+        Args:
+            node (MemoryNode): Node with attribute.
+
+            attribute (string): Name of attribute.
+
+        Returns:
+            (tuple): (source, source_attribute, destination, destination_attribute) or None if not connected.
+        """
+        return self.inputs.get((node, attribute))
+
+    def _link(self, connection):
+        """
+        Adds a connection, indexing it by the attribute it drives.
+
+        Args:
+            connection (tuple): (source, source_attribute, destination, destination_attribute) to add.
+        """
+        self.connections[connection] = None
+        self.inputs[(connection[2], connection[3])] = connection
+
+    def _unlink(self, connections):
+        """
+        Removes the given connections.
+
+        Args:
+            connections (list): (source, source_attribute, destination, destination_attribute) tuples to remove.
+        """
+        for connection in connections:
+            self.connections.pop(connection, None)
+            self.inputs.pop((connection[2], connection[3]), None)
+
+    def error(self, message):
+        self.calls['error'] += 1
+        super(MemoryScene, self).error(message)
+
+    def warning(self, message):
+        self.calls['warning'] += 1
+        self.warnings.append(message)
+
+    def info(self, message):
+        self.calls['info'] += 1
+        self.messages.append(message)
+
+    def node(self, name):
+        self.calls['node'] += 1
+        if isinstance(name, MemoryNode):
+            return name
+
+        if isUuid(name):
+            nodes = [node for node in self.nodes.values() if node.uuid == name.upper()]
+            if not nodes:
+                raise RuntimeError('No object matches UUID: ' + name)
+
+            return nodes[0]
+
+        # names are unique, so a path finds its node by its last name
+        short_name = name.split('|')[-1]
+        if short_name not in self.nodes:
+            raise RuntimeError('No object matches name: ' + name)
+
+        return self.nodes[short_name]
+
+    def uuids(self, nodes):
+        self.calls['uuids'] += 1
+        return [node.uuid for node in nodes]
+
+    def exists(self, name):
+        self.calls['exists'] += 1
+        return name in self.nodes
+
+    def name(self, node):
+        self.calls['name'] += 1
+        return node.name
+
+    def path(self, node):
+        self.calls['path'] += 1
+        names = []
+        while node:
+            names.insert(0, node.name)
+            node = node.parent
+
+        return '|' + '|'.join(names)
+
+    def xform(self, nodes):
+        self.calls['xform'] += 1
+        return [(node.translation, node.rotation) for node in nodes]
+
+    def localPoints(self, nodes, points):
+        self.calls['localPoints'] += 1
+        result = []
+        for node, point in zip(nodes, points):
+            local = [point[axis] - node.translation[axis] for axis in range(3)]
+
+            # undoes the rotations in the reverse of the xyz order they are applied in, then the scale
+            for axis in [2, 1, 0]:
+                first, second = [(1, 2), (2, 0), (0, 1)][axis]
+                angle = math.radians(-node.rotation[axis])
+                cosine, sine = math.cos(angle), math.sin(angle)
+                local[first], local[second] = (local[first] * cosine - local[second] * sine,
+                                               local[first] * sine + local[second] * cosine)
+
+            result.append([value / scale for value, scale in zip(local, node.scale)])
+
+        return result
+
+    def boundingBox(self, nodes, frames=None):
+        self.calls['boundingBox'] += 1
+        boxes = []
+        for node in nodes:
+            points = node.points if node.points else [node.translation]
+            boxes.append((tuple([min([point[axis] for point in points]) for axis in range(3)]),
+                          tuple([max([point[axis] for point in points]) for axis in range(3)])))
+
+        return boxes
+
+    def meshData(self, nodes):
+        self.calls['meshData'] += 1
+        return [(node.points or [], node.triangles or []) for node in nodes]
+
+    def meshKeys(self, nodes):
+        self.calls['meshKeys'] += 1
+        return [(node.uuid, len(node.points or []), len(node.triangles or [])) for node in nodes]
+
+    def getParent(self, node):
+        self.calls['getParent'] += 1
+        return node.parent
+
+    def children(self, node, node_type=None):
+        self.calls['children'] += 1
+        return [child for child in node.children if node_type is None or child.type == node_type]
+
+    def delete(self, nodes):
+        self.calls['delete'] += 1
+        deleted = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node in deleted:
+                continue
+
+            deleted.add(node)
+            stack += node.children
+            self.nodes.pop(node.name, None)
+            self.keep_outs.pop(node, None)
+
+        for node in nodes:
+            if node.parent and node.parent not in deleted:
+                node.parent.children.remove(node)
+
+        self._unlink([connection for connection in self.connections
+                      if connection[0] in deleted or connection[2] in deleted])
+
+    def group(self, name, parent=None, translation=None, rotation=None):
+        self.calls['group'] += 1
+        node = self.createNode('transform', name)
+        node.translation = tuple(translation) if translation else (0.0, 0.0, 0.0)
+        node.rotation = tuple(rotation) if rotation else (0.0, 0.0, 0.0)
+        if parent:
+            self._reparent(node, parent)
+
+        return node
+
+    def spaceLocator(self, name, parent):
+        self.calls['spaceLocator'] += 1
+        locator = self.createNode('transform', name, parent)
+        self.createNode('locator', name + 'Shape', locator)
+        return locator
+
+    def _reparent(self, node, parent):
+        """
+        Moves the given node under the given parent, world transforms are kept as is.
+
+        Args:
+            node (MemoryNode): Node to move.
+
+            parent (MemoryNode): New parent, None for world.
+        """
+        if node.parent:
+            node.parent.children.remove(node)
+
+        node.parent = parent
+        if parent:
+            parent.children.append(node)
+
+    def parent(self, node, parent):
+        self.calls['parent'] += 1
+        self._reparent(node, parent)
+        return node
+
+    def _constraint(self, constraint_type, target, node, attributes):
+        """
+        Creates a constraint node and makes the same connections Maya would.
+
+        Args:
+            constraint_type (string): Type of constraint.
+
+            target (MemoryNode): Driver of the constraint.
+
+            node (MemoryNode): Node to drive.
+
+            attributes (list): Names of the compound attributes being constrained, such as "translate".
+
+        Returns:
+            (MemoryNode): Constraint created.
+        """
+        constraint = self.createNode(constraint_type, node.name + '_' + constraint_type + '1', node)
+        self._link((target, 'parentMatrix[0]', constraint, 'target[0].targetParentMatrix'))
+        for attribute in attributes:
+            output = 'constraint' + attribute[0].upper() + attribute[1:]
+            self._link((target, attribute, constraint, 'target[0].target' + output[10:]))
+            for axis in 'XYZ':
+                self._link((constraint, output + axis, node, attribute + axis))
+
+        return constraint
+
+    def pointConstraint(self, target, node):
+        self.calls['pointConstraint'] += 1
+        node.translation = target.translation
+        return self._constraint('pointConstraint', target, node, ['translate'])
+
+    def parentConstraint(self, target, node):
+        self.calls['parentConstraint'] += 1
+        node.translation = target.translation
+        node.rotation = target.rotation
+        return self._constraint('parentConstraint', target, node, ['translate', 'rotate'])
+
+    def scaleConstraint(self, target, node):
+        self.calls['scaleConstraint'] += 1
+        return self._constraint('scaleConstraint', target, node, ['scale'])
+
+    def addAttr(self, node, attribute, minimum, maximum, default):
+        self.calls['addAttr'] += 1
+        if attribute in node.attributes:
+            raise RuntimeError('Found more than one attribute named ' + attribute + ' on ' + node.name)
+
+        node.attributes[attribute] = default
+
+    def deleteAttr(self, node, attribute):
+        self.calls['deleteAttr'] += 1
+        node.attributes.pop(attribute)
+        self._unlink([connection for connection in self.connections
+                      if (connection[0] is node and connection[1] == attribute) or
+                      (connection[2] is node and connection[3] == attribute)])
+
+    def setData(self, node, attribute, data):
+        self.calls['setData'] += 1
+        data = mapValues(data, lambda value: value.name if isinstance(value, MemoryNode) else value)
+        node.attributes[attribute] = json.dumps(data, sort_keys=True)
+
+    def getData(self, node, attribute):
+        self.calls['getData'] += 1
+        return json.loads(node.attributes[attribute]) if attribute in node.attributes else None
+
+    def setAttr(self, node, attribute, value):
+        self.calls['setAttr'] += 1
+        node.attributes[attribute] = tuple(value) if isinstance(value, (list, tuple)) else value
+
+    def shadingNode(self, node_type, name):
+        self.calls['shadingNode'] += 1
+        return self.createNode(node_type, name)
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        self.calls['connect'] += 1
+        connection = self.incoming(destination, destination_attribute)
+        if connection:
+            self._unlink([connection])
+
+        self._link((source, source_attribute, destination, destination_attribute))
+
+    def disconnect(self, node, attribute):
+        self.calls['disconnect'] += 1
+        connection = self.incoming(node, attribute)
+        if connection:
+            self._unlink([connection])
+
+    def wrap(self, node, driver):
+        self.calls['wrap'] += 1
+        wrap = self.createNode('wrap', 'wrap1')
+        base = self.createMesh(driver.name + 'Base', driver.points or [], driver.triangles or [])
+        self._link((driver, 'worldMesh[0]', wrap, 'driverPoints[0]'))
+        self._link((base, 'worldMesh[0]', wrap, 'basePoints[0]'))
+        self._link((wrap, 'outputGeometry[0]', node, 'inMesh'))
+        return [wrap, base]
+
+    def makeMuscle(self, geometries):
+        self.calls['makeMuscle'] += 1
+        muscles = []
+        for geometry in geometries:
+            muscle = self.createNode('cMuscleObject', geometry.name + 'MuscleObjectShape', geometry)
+            self._link((geometry, 'worldMesh[0]', muscle, 'meshIn'))
+            self._link((geometry, 'worldMatrix[0]', muscle, 'worldMatrixStart'))
+            muscles.append(muscle)
+
+        return muscles
+
+    def findMuscle(self, geometry):
+        self.calls['findMuscle'] += 1
+        muscles = [child for child in geometry.children if child.type == 'cMuscleObject']
+        return muscles[0] if muscles else None
+
+    def rigKeepOut(self, node):
+        self.calls['rigKeepOut'] += 1
+        keep_out = self.createNode('transform', node.name + '_keepOut', node.parent)
+        keep_out.translation = node.translation
+        keep_out.rotation = node.rotation
+        keep_out_shape = self.createNode('cMuscleKeepOut', node.name + '_keepOutShape', keep_out)
+        driven = self.createNode('transform', node.name + '_keepOut_driven', keep_out)
+        self._link((keep_out, 'worldMatrix[0]', keep_out_shape, 'worldMatrixAim'))
+        self._link((keep_out_shape, 'outTranslateLocal', driven, 'translate'))
+        self._reparent(node, driven)
+        self.keep_outs[node] = keep_out_shape
+        return [keep_out, keep_out_shape, driven]
+
+    def keepOutAddMuscle(self, node, muscles):
+        self.calls['keepOutAddMuscle'] += 1
+        keep_out_shape = self.keep_outs[node]
+        index = 0
+        for muscle in muscles:
+            while (keep_out_shape, 'muscleData[' + str(index) + ']') in self.inputs:
+                index += 1
+
+            self._link((muscle, 'muscleData', keep_out_shape, 'muscleData[' + str(index) + ']'))
+            index += 1
+
+    def keepOutRemoveMuscle(self, node, muscles):
+        self.calls['keepOutRemoveMuscle'] += 1
+        keep_out_shape = self.keep_outs[node]
+        self._unlink([connection for connection in self.connections
+                      if connection[0] in muscles and connection[2] is keep_out_shape])
@@ -0,0 +1,309 @@
+import os
+import json
+import hashlib
+import numpy
+from . import bvh
+from . import cache
+from . import nearest
+from . import solver
+
+
+# bump when the layout of the fields on disk changes, so old fields are not read
+version = 1
+
+# largest distance, in cells, a mesh may be from a rigid move of its rest shape for its field to be used
+rigid_tolerance = 0.5
+
+
+def meshKey(points, triangles, cell_size):
+    """
+    Gets a key that changes whenever the topology or rest shape of a mesh, or the cell size of its field, changes.
+
+    Args:
+        points (numpy.ndarray): P x 3 rest positions of the mesh's vertices.
+
+        triangles (numpy.ndarray): T x 3 vertex indices of each triangle.
+
+        cell_size (float): Size of the field's cells.
+
+    Returns:
+        (string): Hex digest of the mesh.
+    """
+    digest = hashlib.sha1()
+    digest.update(numpy.ascontiguousarray(triangles, dtype=numpy.int64).tobytes())
+
+    # rounded so the same rest shape read twice gives the same key, adding zero turns -0.0 into 0.0
+    digest.update(numpy.ascontiguousarray(numpy.round(numpy.asarray(points, dtype=numpy.float64), 6) + 0.0).tobytes())
+    digest.update(repr((float(cell_size), version)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Field(object):
+    """
+    Signed distance to a closed mesh sampled on a regular grid, negative inside the mesh. Distances between samples
+    are interpolated trilinearly, positions outside the grid read the distance at its border.
+    """
+    def __init__(self, distances, origin, cell_size):
+        """
+        Args:
+            distances (numpy.ndarray): X x Y x Z float32 signed distance at each sample, can be memory mapped.
+
+            origin (list): Position of the first sample.
+
+            cell_size (float): Distance between samples along each axis.
+        """
+        self.distances = distances
+        self.origin = numpy.asarray(origin, dtype=numpy.float64)
+        self.cell_size = float(cell_size)
+        self.last = numpy.array(distances.shape) - 2
+
+    def sample(self, positions):
+        """
+        Gets the signed distance and its gradient at each position.
+
+        Args:
+            positions (numpy.ndarray): N x 3 positions in the space of the field.
+
+        Returns:
+            (tuple): N signed distances and N x 3 gradients.
+        """
+        grid = (numpy.asarray(positions, dtype=numpy.float64) - self.origin) / self.cell_size
+        cells = numpy.clip(numpy.floor(grid).astype(numpy.int64), 0, self.last)
+        fx, fy, fz = numpy.clip(grid - cells, 0.0, 1.0).T
+        x, y, z = cells.T
+
+        def corner(i, j, k):
+            return self.distances[x + i, y + j, z + k].astype(numpy.float64)
+
+        # blend along x, then y, then z
+        c00 = corner(0, 0, 0) * (1.0 - fx) + corner(1, 0, 0) * fx
+        c10 = corner(0, 1, 0) * (1.0 - fx) + corner(1, 1, 0) * fx
+        c01 = corner(0, 0, 1) * (1.0 - fx) + corner(1, 0, 1) * fx
+        c11 = corner(0, 1, 1) * (1.0 - fx) + corner(1, 1, 1) * fx
+        c0 = c00 * (1.0 - fy) + c10 * fy
+        c1 = c01 * (1.0 - fy) + c11 * fy
+        distances = c0 * (1.0 - fz) + c1 * fz
+
+        dx0 = (corner(1, 0, 0) - corner(0, 0, 0)) * (1.0 - fy) + (corner(1, 1, 0) - corner(0, 1, 0)) * fy
+        dx1 = (corner(1, 0, 1) - corner(0, 0, 1)) * (1.0 - fy) + (corner(1, 1, 1) - corner(0, 1, 1)) * fy
+        gradients = numpy.stack([dx0 * (1.0 - fz) + dx1 * fz,
+                                 (c10 - c00) * (1.0 - fz) + (c11 - c01) * fz,
+                                 c1 - c0], axis=1)
+        return distances, gradients / self.cell_size
+
+    def push(self, positions, directions, steps=4):
+        """
+        Gets how far each position has to move along its direction to get out of the mesh. Each step reads the field
+        once and moves to where the surface would be if it were the plane the gradient points out of, so the cost
+        is the same for every position whatever the mesh.
+
+        Args:
+            positions (numpy.ndarray): N x 3 positions in the space of the field.
+
+            directions (numpy.ndarray): N x 3 normalized directions in the space of the field.
+
+            steps (int): Amount of steps to take, more gets closer to the surface of curved meshes.
+
+        Returns:
+            (numpy.ndarray): N distances along the directions, zero for positions outside.
+        """
+        positions = numpy.asarray(positions, dtype=numpy.float64)
+        directions = numpy.asarray(directions, dtype=numpy.float64)
+        pushes = numpy.zeros(len(positions))
+        pushing = numpy.zeros(len(positions), dtype=bool)
+        for _ in range(steps):
+            distances, gradients = self.sample(positions + directions * pushes[:, None])
+
+            # the plane is past the surface of convex meshes, so positions that went in keep stepping back onto it
+            pushing |= distances < 0.0
+            if not pushing.any():
+                break
+
+            lengths = numpy.linalg.norm(gradients[pushing], axis=1)
+            lengths[lengths < solver.epsilon] = 1.0
+            cosines = (gradients[pushing] * directions[pushing]).sum(axis=1) / lengths
+
+            # directions that graze or go against the surface move at most four times the distance per step
+            pushes[pushing] = numpy.maximum(pushes[pushing] - distances[pushing] / numpy.maximum(cosines, 0.25), 0.0)
+
+        return pushes
+
+
+def build(points, triangles, cell_size, padding=2, chunk_size=65536):
+    """
+    Samples the signed distance to a closed mesh with outward facing triangles on a grid around it.
+    Distances are measured with nearest.Surface, a sample is inside when the closest surface in front of it
+    faces away, the same test solver.keepOut uses.
+
+    Args:
+        points (numpy.ndarray): P x 3 positions of the mesh's vertices.
+
+        triangles (numpy.ndarray): T x 3 vertex indices of each triangle.
+
+        cell_size (float): Distance between samples, smaller is more accurate and uses cubically more memory.
+
+        padding (int): Amount of samples added around the bounds of the mesh.
+
+        chunk_size (int): Maximum amount of samples measured at once.
+
+    Returns:
+        (Field): Signed distance field of the mesh.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)
+    triangles = numpy.asarray(triangles, dtype=numpy.int64).reshape(-1, 3)
+    origin = points.min(axis=0) - padding * cell_size
+    counts = numpy.ceil((points.max(axis=0) + padding * cell_size - origin) / cell_size).astype(numpy.int64) + 1
+    axes = [origin[axis] + numpy.arange(counts[axis]) * cell_size for axis in range(3)]
+    samples = numpy.stack(numpy.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+
+    surface = nearest.Surface(points, triangles)
+    tree = bvh.BVH(points, triangles)
+
+    # skewed so rays do not run along the edges of axis aligned meshes
+    ray = numpy.array([0.5773, 0.5779, 0.5766])
+    ray /= numpy.linalg.norm(ray)
+
+    distances = numpy.empty(len(samples), dtype=numpy.float32)
+    for start in range(0, len(samples), chunk_size):
+        chunk = samples[start:start + chunk_size]
+        lengths, _, _ = surface.closest(chunk)
+        _, _, inside = tree.raycast(chunk, numpy.tile(ray, (len(chunk), 1)))
+        distances[start:start + len(chunk)] = numpy.where(inside, -lengths, lengths)
+
+    return Field(distances.reshape(counts), origin, cell_size)
+
+
+def write(field, path):
+    """
+    Writes a field to a .npy file of its distances and a JSON file of where its grid is, see cache.metadataPath.
+
+    Args:
+        field (Field): Field to write.
+
+        path (string): Path of the .npy file to write.
+
+    Returns:
+        (string): Path written to.
+    """
+    metadata = {'origin': field.origin.tolist(), 'cell_size': field.cell_size, 'version': version}
+    with open(cache.metadataPath(path), 'w') as open_file:
+        json.dump(metadata, open_file, indent=4)
+
+    # written next to the path first so a field that exists is always complete
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as open_file:
+        numpy.save(open_file, numpy.asarray(field.distances, dtype=numpy.float32))
+
+    os.rename(temporary, path)
+    return path
+
+
+def load(path):
+    """
+    Memory maps a field written by write.
+
+    Args:
+        path (string): Path of the field's .npy file.
+
+    Returns:
+        (Field): Field with memory mapped distances.
+    """
+    with open(cache.metadataPath(path)) as open_file:
+        metadata = json.load(open_file)
+
+    return Field(numpy.load(path, mmap_mode='r'), metadata['origin'], metadata['cell_size'])
+
+
+def fetch(directory, points, triangles, cell_size):
+    """
+    Gets the path of the field of the given mesh in the given directory, building and writing it first if there is
+    none. Fields are named by meshKey, so a mesh whose topology or rest shape changed gets a new field and fields
+    are reused by every session that has the same mesh.
+
+    Args:
+        directory (string): Directory the fields are kept in, created if it does not exist.
+
+        points (numpy.ndarray): P x 3 rest positions of the mesh's vertices.
+
+        triangles (numpy.ndarray): T x 3 vertex indices of each triangle.
+
+        cell_size (float): Distance between samples.
+
+    Returns:
+        (string): Path of the field's .npy file.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    path = os.path.join(directory, meshKey(points, triangles, cell_size) + '.npy')
+    if not os.path.isfile(path):
+        write(build(points, triangles, cell_size), path)
+
+    return path
+
+
+def rigidTransform(rest, points):
+    """
+    Fits the rotation and translation that best move the rest positions of a mesh onto its given positions,
+    with the Kabsch algorithm.
+
+    Args:
+        rest (numpy.ndarray): P x 3 rest positions of the mesh's vertices.
+
+        points (numpy.ndarray): P x 3 positions of the same vertices.
+
+    Returns:
+        (tuple): 3 x 3 rotation, center of the rest positions, center of the positions, and the largest distance
+        left between the moved rest positions and the positions, which is large when the mesh deforms.
+    """
+    rest = numpy.asarray(rest, dtype=numpy.float64)
+    points = numpy.asarray(points, dtype=numpy.float64)
+    rest_center = rest.mean(axis=0)
+    center = points.mean(axis=0)
+    u, _, vt = numpy.linalg.svd(numpy.dot((rest - rest_center).T, points - center))
+
+    # flips the last axis if needed so the fit is a rotation and not a reflection
+    sign = 1.0 if numpy.linalg.det(numpy.dot(vt.T, u.T)) >= 0.0 else -1.0
+    rotation = numpy.dot(vt.T * [1.0, 1.0, sign], u.T)
+    error = numpy.linalg.norm(numpy.dot(rest - rest_center, rotation.T) + center - points, axis=1).max()
+    return rotation, rest_center, center, float(error)
+
+
+def keepOut(positions, directions, fields, transforms=None, steps=4):
+    """
+    Pushes every position along its direction until it is outside all the given fields, like solver.keepOut does
+    with the triangles of the meshes.
+
+    Args:
+        positions (numpy.ndarray): N x 3 world positions of the controls.
+
+        directions (numpy.ndarray): N x 3 normalized world directions to push controls along.
+
+        fields (list): Field of each collision mesh.
+
+        transforms (list): OPTIONAL. (rotation, rest center, center) of each field moving its rest space to world,
+        see rigidTransform. Fields are in world space if None.
+
+        steps (int): Amount of steps each push takes, see Field.push.
+
+    Returns:
+        (numpy.ndarray): N x 3 pushed out positions.
+    """
+    positions = numpy.array(positions, dtype=numpy.float64)
+    directions = numpy.asarray(directions, dtype=numpy.float64)
+    transforms = transforms or [(numpy.identity(3), numpy.zeros(3), numpy.zeros(3)) for _ in fields]
+
+    # getting pushed out of one mesh can push into another one, so keep going until everything is outside
+    for _ in range(len(fields) + 1):
+        pushed = False
+        for field, (rotation, rest_center, center) in zip(fields, transforms):
+            # rows times the rotation is the inverse rotation of each row
+            pushes = field.push(numpy.dot(positions - center, rotation) + rest_center,
+                                numpy.dot(directions, rotation), steps)
+            positions += directions * pushes[:, None]
+            pushed = pushed or bool(pushes.any())
+
+        if not pushed:
+            break
+
+    return positions
@@ -0,0 +1,190 @@
+import numpy
+
+
+epsilon = 1e-9
+
+
+def directions(positions, source):
+    """
+    Gets the collision direction of every position the same way create does, the normalized vector from the source.
+
+    Args:
+        positions (numpy.ndarray): N x 3 positions of the controls.
+
+        source (list): Position of the collision source.
+
+    Returns:
+        (numpy.ndarray): N x 3 normalized directions, zero vectors for positions sitting on the source.
+    """
+    vectors = numpy.asarray(positions, dtype=numpy.float64) - numpy.asarray(source, dtype=numpy.float64)
+    lengths = numpy.linalg.norm(vectors, axis=1)
+    lengths[lengths < epsilon] = 1.0
+    return vectors / lengths[:, None]
+
+
+def prepare(mesh):
+    """
+    Gets the triangle data the ray intersection needs, so that it is only computed once per mesh.
+
+    Args:
+        mesh (tuple): (points, triangles) of the mesh. points is P x 3, triangles is T x 3 point indices.
+
+    Returns:
+        (tuple): (first vertices, first edges, second edges) of every triangle, each T x 3.
+    """
+    points = numpy.asarray(mesh[0], dtype=numpy.float64)
+    triangles = numpy.asarray(mesh[1], dtype=numpy.int64)
+    vertices = points[triangles[:, 0]]
+    return vertices, points[triangles[:, 1]] - vertices, points[triangles[:, 2]] - vertices
+
+
+def rayTriangle(origins, rays, vertices, first_edges, second_edges):
+    """
+    Intersects rays with triangles with the Moller-Trumbore algorithm. All arrays are broadcast against each other
+    over every axis but the last, so this works on pairs of rays and triangles as well as every ray against every triangle.
+
+    Args:
+        origins (numpy.ndarray): ... x 3 origins of the rays.
+
+        rays (numpy.ndarray): ... x 3 directions of the rays.
+
+        vertices (numpy.ndarray): ... x 3 first vertex of each triangle.
+
+        first_edges (numpy.ndarray): ... x 3 edge from first to second vertex of each triangle.
+
+        second_edges (numpy.ndarray): ... x 3 edge from first to third vertex of each triangle.
+
+    Returns:
+        (tuple): Distances along the rays to the triangles, NaN where the ray misses,
+        and booleans of whether the ray goes through the back of the triangle, leaving the mesh.
+    """
+    p = numpy.cross(rays, second_edges)
+    determinant = (first_edges * p).sum(axis=-1)
+    parallel = numpy.abs(determinant) < epsilon
+    determinant[parallel] = 1.0
+    exiting = determinant < 0.0
+    inverse = 1.0 / determinant
+
+    s = origins - vertices
+    u = (s * p).sum(axis=-1) * inverse
+    q = numpy.cross(s, first_edges)
+    v = (rays * q).sum(axis=-1) * inverse
+    distances = (second_edges * q).sum(axis=-1) * inverse
+
+    hit = ~parallel & (u >= -epsilon) & (v >= -epsilon) & (u + v <= 1.0 + epsilon)
+    distances[~hit] = numpy.nan
+    return distances, exiting
+
+
+def intersect(origins, rays, vertices, first_edges, second_edges):
+    """
+    Intersects every ray with every given triangle.
+
+    Args:
+        origins (numpy.ndarray): N x 3 origins of the rays.
+
+        rays (numpy.ndarray): N x 3 directions of the rays.
+
+        vertices (numpy.ndarray): T x 3 first vertex of each triangle.
+
+        first_edges (numpy.ndarray): T x 3 edge from first to second vertex of each triangle.
+
+        second_edges (numpy.ndarray): T x 3 edge from first to third vertex of each triangle.
+
+    Returns:
+        (tuple): N x T distances along the rays to the triangles, NaN where the ray misses,
+        and N x T booleans of whether the ray goes through the back of the triangle, leaving the mesh.
+    """
+    return rayTriangle(origins[:, None, :], rays[:, None, :], vertices[None], first_edges[None], second_edges[None])
+
+
+def cast(origins, rays, triangles, chunk_size=65536):
+    """
+    Casts rays against a prepared mesh and gathers what the keepOut needs, processing triangles in chunks to
+    keep memory bounded.
+
+    Args:
+        origins (numpy.ndarray): N x 3 origins of the rays.
+
+        rays (numpy.ndarray): N x 3 directions of the rays.
+
+        triangles (tuple): Triangle data given by prepare.
+
+        chunk_size (int): Maximum amount of ray/triangle pairs tested at once.
+
+    Returns:
+        (tuple): (distance to the closest hit in front of each origin or inf if none,
+        whether that closest hit is leaving the mesh, meaning the origin is inside).
+    """
+    nearest = numpy.full(len(origins), numpy.inf)
+    inside = numpy.zeros(len(origins), dtype=bool)
+    rows = numpy.arange(len(origins))
+    vertices, first_edges, second_edges = triangles
+    step = max(1, chunk_size // max(1, len(origins)))
+
+    for start in range(0, len(vertices), step):
+        end = start + step
+        distances, exiting = intersect(origins, rays, vertices[start:end], first_edges[start:end], second_edges[start:end])
+        distances[~(distances > epsilon)] = numpy.inf
+        closest = distances.argmin(axis=1)
+        closest_distances = distances[rows, closest]
+        closer = closest_distances < nearest
+        nearest[closer] = closest_distances[closer]
+        inside[closer] = exiting[rows, closest][closer]
+
+    return nearest, inside
+
+
+def keepOut(positions, directions, meshes, chunk_size=65536, hints=None):
+    """
+    Pushes every position along its direction until it is outside all the given closed meshes, the same way
+    cMuscleKeepOut pushes its driven group out of the muscle objects. Positions outside stay where they are.
+    A position is inside a mesh when the closest surface in front of it faces away, so meshes need outward normals.
+
+    Args:
+        positions (numpy.ndarray): N x 3 world positions of the controls.
+
+        directions (numpy.ndarray): N x 3 normalized world directions to push controls along, the inDirection.
+
+        meshes (list): (points, triangles) of each collision mesh in world space, or a bvh.BVH built over it.
+
+        chunk_size (int): Maximum amount of ray/triangle pairs tested at once when not using a BVH.
+
+        hints (list): OPTIONAL. N triangle indices for each mesh, see bvh.BVH.raycast. Updated in place with the
+        triangles hit from the given positions, so giving the same hints on the next frame starts every ray from
+        where it hit last. Only used by meshes given as a BVH.
+
+    Returns:
+        (numpy.ndarray): N x 3 pushed out positions.
+    """
+    positions = numpy.array(positions, dtype=numpy.float64)
+    directions = numpy.asarray(directions, dtype=numpy.float64)
+    prepared = [prepare(mesh) if isinstance(mesh, (tuple, list)) else mesh for mesh in meshes]
+    active = numpy.any(directions != 0.0, axis=1)
+
+    # getting pushed out of one mesh can push into another one, so keep going until everything is outside
+    for iteration in range(len(prepared) + 1):
+        if not active.any():
+            break
+
+        indices = numpy.flatnonzero(active)
+        push = numpy.zeros(len(indices))
+        for mesh_index, triangles in enumerate(prepared):
+            # the closest hit in front is where we get out
+            if isinstance(triangles, tuple):
+                nearest, inside = cast(positions[indices], directions[indices], triangles, chunk_size)
+            else:
+                mesh_hints = hints[mesh_index][indices] if hints else None
+                nearest, hits, inside = triangles.raycast(positions[indices], directions[indices], hints=mesh_hints)
+
+                # only the hits from where the positions started are worth starting from next time
+                if hints and not iteration:
+                    hints[mesh_index][indices] = hits
+
+            push[inside] = numpy.maximum(push[inside], nearest[inside])
+
+        pushed = push > 0.0
+        positions[indices[pushed]] += directions[indices[pushed]] * push[pushed, None]
+        active[indices[~pushed]] = False
+
+    return positions
@@ -0,0 +1,66 @@
+import unittest
+import numpy
+from autocollision import benchmark
+from autocollision import bvh
+from autocollision import solver
+
+
+def rays(count, seed=0):
+    """
+    Gets random rays starting in and around a unit sphere at the origin.
+    """
+    generator = numpy.random.RandomState(seed)
+    origins = generator.uniform(-1.5, 1.5, (count, 3))
+    directions = generator.normal(size=(count, 3))
+    return origins, directions / numpy.linalg.norm(directions, axis=1)[:, None]
+
+
+class RaycastTest(unittest.TestCase):
+    """
+    Checks BVH.raycast against testing every triangle with solver.cast.
+    """
+    def setUp(self):
+        self.points, self.triangles = [numpy.array(values) for values in benchmark.sphere((0.0, 0.0, 0.0), 1.0, 400)]
+
+    def assertMatches(self, tree, points, origins, directions, hints=None):
+        nearest, hits, inside = tree.raycast(origins, directions, hints=hints)
+        expected_nearest, expected_inside = solver.cast(origins, directions, solver.prepare((points, self.triangles)))
+        numpy.testing.assert_allclose(nearest, expected_nearest)
+        numpy.testing.assert_array_equal(inside[numpy.isfinite(nearest)], expected_inside[numpy.isfinite(nearest)])
+        numpy.testing.assert_array_equal(hits < 0, numpy.isinf(nearest))
+        return hits
+
+    def testBruteForce(self):
+        origins, directions = rays(256)
+        self.assertMatches(bvh.BVH(self.points, self.triangles), self.points, origins, directions)
+
+    def testHints(self):
+        origins, directions = rays(256)
+        tree = bvh.BVH(self.points, self.triangles)
+        hits = self.assertMatches(tree, self.points, origins, directions)
+
+        # right, stale and missing hints all find the same closest hits
+        self.assertMatches(tree, self.points, origins, directions, hints=hits)
+        self.assertMatches(tree, self.points, origins, directions, hints=numpy.roll(hits, 1))
+        self.assertMatches(tree, self.points, origins, directions, hints=numpy.full(len(origins), -1))
+
+    def testRefit(self):
+        origins, directions = rays(256)
+        tree = bvh.BVH(self.points, self.triangles)
+        moved = self.points * [1.5, 0.5, 1.0] + [0.2, 0.0, -0.1]
+        tree.refit(moved)
+        self.assertMatches(tree, moved, origins, directions)
+
+    def testAxisAligned(self):
+        origins = numpy.random.RandomState(1).uniform(-1.5, 1.5, (64, 3))
+        directions = numpy.repeat(numpy.identity(3), 22, axis=0)[:64] * numpy.repeat([1.0, -1.0], 32)[:, None]
+        self.assertMatches(bvh.BVH(self.points, self.triangles), self.points, origins, directions)
+
+    def testLeafSize(self):
+        origins, directions = rays(64)
+        for leaf_size in [1, 3, 16]:
+            self.assertMatches(bvh.BVH(self.points, self.triangles, leaf_size), self.points, origins, directions)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,318 @@
+import unittest
+from autocollision import builder
+from autocollision import scene
+
+
+def syntheticRig(memory_scene, controls):
+    """
+    Makes a parent control with the given amount of controls around a small collision mesh at the origin.
+
+    Args:
+        memory_scene (scene.MemoryScene): Scene to make the rig in.
+
+        controls (int): Amount of controls to make.
+
+    Returns:
+        (tuple): Handles of the parent control, the controls and the collision meshes.
+    """
+    points = [(-1.0, -1.0, -1.0), (1.0, -1.0, -1.0), (0.0, 1.0, -1.0), (0.0, 0.0, 1.0)]
+    triangles = [(0, 2, 1), (0, 1, 3), (1, 2, 3), (2, 0, 3)]
+    geometry = [memory_scene.createMesh('test_geo', points, triangles)]
+    parent_control = memory_scene.group('test_parent_ctl')
+    created = [memory_scene.group('test' + str(index) + '_ctl', parent_control, (0.5 * index, 1.5, 0.0))
+               for index in range(controls)]
+    return parent_control, created, geometry
+
+
+class BuildCountsTest(unittest.TestCase):
+    """
+    Builds the same rig with few and many controls, so what the build costs per control is the difference.
+    """
+    few = 4
+    many = 8
+
+    def build(self, controls, **options):
+        memory_scene = scene.MemoryScene()
+        parent_control, created, geometry = syntheticRig(memory_scene, controls)
+        memory_scene.calls.clear()
+        nodes = builder.create(memory_scene, 'test', created, parent_control, geometry, **options)
+        return nodes, memory_scene.calls
+
+    def perControl(self, **options):
+        few_nodes, few_calls = self.build(self.few, **options)
+        many_nodes, many_calls = self.build(self.many, **options)
+        controls = self.many - self.few
+        self.assertEqual((len(many_nodes) - len(few_nodes)) % controls, 0)
+        return (len(many_nodes) - len(few_nodes)) // controls, few_calls, many_calls
+
+    def assertBatched(self, few_calls, many_calls, names):
+        for name in names:
+            self.assertEqual(few_calls[name], many_calls[name], name + ' should not be called per control')
+
+    def testDefault(self):
+        nodes, few_calls, many_calls = self.perControl()
+        self.assertEqual(nodes, 8)
+        self.assertBatched(few_calls, many_calls, ['xform', 'uuids', 'findMuscle', 'makeMuscle', 'setData'])
+        self.assertEqual(many_calls['rigKeepOut'], self.many)
+        self.assertEqual(many_calls['boundingBox'], 0)
+
+    def testLean(self):
+        nodes, few_calls, many_calls = self.perControl(lean=True)
+        self.assertEqual(nodes, 5)
+        self.assertBatched(few_calls, many_calls, ['xform', 'uuids', 'findMuscle', 'makeMuscle', 'setData'])
+        self.assertEqual(many_calls['spaceLocator'], 0)
+        self.assertEqual(many_calls['pointConstraint'], 0)
+
+    def testGated(self):
+        nodes, few_calls, many_calls = self.perControl(activation_distance=1.0)
+        self.assertEqual(nodes, 8 + 3)
+        self.assertBatched(few_calls, many_calls, ['xform', 'uuids', 'boundingBox', 'findMuscle', 'makeMuscle',
+                                                   'setData'])
+        self.assertEqual(many_calls['boundingBox'], 1)
+
+    def testLeanGated(self):
+        nodes, few_calls, many_calls = self.perControl(lean=True, activation_distance=1.0)
+        self.assertEqual(nodes, 5 + 3)
+        self.assertBatched(few_calls, many_calls, ['xform', 'uuids', 'boundingBox', 'findMuscle', 'makeMuscle',
+                                                   'setData'])
+
+
+
+class GateTest(unittest.TestCase):
+    """
+    Checks what the gates of a module measure against.
+    """
+    def testEachGeometry(self):
+        memory_scene = scene.MemoryScene()
+        parent_control, controls, geometry = syntheticRig(memory_scene, 2)
+        points = [(4.0 + x, y, z) for x, y, z in geometry[0].points]
+        geometry.append(memory_scene.createMesh('test_prop_geo', points, geometry[0].triangles))
+        builder.create(memory_scene, 'test', controls, parent_control, geometry, activation_distance=1.0)
+
+        # every geometry can move on its own, so each one is measured against every control
+        distances = [node for node in memory_scene.nodes.values() if node.type == 'distanceBetween']
+        self.assertEqual(len(distances), len(controls) * len(geometry))
+        measured = [memory_scene.incoming(distance, 'inMatrix2')[0] for distance in distances]
+        self.assertEqual(sorted([measured.count(mesh) for mesh in geometry]), [len(controls)] * len(geometry))
+
+    def testScaledGeometry(self):
+        memory_scene = scene.MemoryScene()
+        parent_control, controls, geometry = syntheticRig(memory_scene, 1)
+        geometry[0].translation = (0.5, 0.0, 0.0)
+        geometry[0].scale = (2.0, 2.0, 2.0)
+        builder.create(memory_scene, 'test', controls, parent_control, geometry, activation_distance=1.0)
+
+        # the center goes back out through the full world matrix, so it lands on the center of the bounds
+        distance = [node for node in memory_scene.nodes.values() if node.type == 'distanceBetween'][0]
+        center = [offset + 2.0 * value for offset, value in zip([0.5, 0.0, 0.0], distance.attributes['point2'])]
+        for value, expected in zip(center, [0.0, 0.0, 0.0]):
+            self.assertAlmostEqual(value, expected)
+
+
+
+class EditTest(unittest.TestCase):
+    """
+    Adds to and removes from a module, for each kind of build.
+    """
+    options = [{}, {'lean': True}, {'activation_distance': 1.0}]
+
+    def setUp(self):
+        self.scene = scene.MemoryScene()
+        self.parent_control, self.controls, self.geometry = syntheticRig(self.scene, 4)
+        points = [(4.0 + x, y, z) for x, y, z in self.geometry[0].points]
+        self.prop = self.scene.createMesh('test_prop_geo', points, self.geometry[0].triangles)
+
+    def snapshot(self):
+        # gates are built again when geometry changes, so connections are compared by the names of their nodes
+        connections = set([(source.name, source_attribute, destination.name, destination_attribute)
+                           for source, source_attribute, destination, destination_attribute in self.scene.connections])
+        return builder.getManifest(self.scene, 'test'), set(self.scene.nodes), connections
+
+    def testControls(self):
+        for options in self.options:
+            self.setUp()
+            builder.create(self.scene, 'test', self.controls[:2], self.parent_control, self.geometry, **options)
+            before = self.snapshot()
+            builder.addControls(self.scene, 'test', self.controls[2:])
+            self.assertEqual(len(builder.getManifest(self.scene, 'test')['controls']), 4)
+            builder.removeControls(self.scene, 'test', self.controls[2:])
+            self.assertEqual(self.snapshot(), before)
+            self.assertEqual([control.parent for control in self.controls[2:]], [self.parent_control] * 2)
+
+    def testGeometry(self):
+        for options in self.options:
+            self.setUp()
+            builder.create(self.scene, 'test', self.controls, self.parent_control, self.geometry, **options)
+            manifest, nodes, connections = self.snapshot()
+            builder.addGeometry(self.scene, 'test', [self.prop])
+            self.assertEqual(len(builder.getManifest(self.scene, 'test')['geometry']), 2)
+            builder.removeGeometry(self.scene, 'test', [self.prop])
+
+            # the geometry stays a muscle object, other modules may use it
+            muscle = self.scene.findMuscle(self.prop)
+            self.assertEqual(builder.getManifest(self.scene, 'test'), manifest)
+            self.assertEqual(set(self.scene.nodes), nodes | set([muscle.name]))
+            self.assertEqual(set([connection for connection in self.snapshot()[2] if muscle.name not in connection]),
+                             connections)
+            self.assertIsNone(self.prop.parent)
+
+    def testDuplicates(self):
+        builder.create(self.scene, 'test', self.controls[:2], self.parent_control, self.geometry)
+        before = self.snapshot()
+        self.assertRaises(RuntimeError, builder.addControls, self.scene, 'test', self.controls[1:3])
+        self.assertRaises(RuntimeError, builder.addGeometry, self.scene, 'test', self.geometry)
+        self.assertEqual(self.snapshot(), before)
+
+
+
+class LifecycleTest(unittest.TestCase):
+    """
+    Deletes and rebuilds modules through their manifest.
+    """
+    def setUp(self):
+        self.scene = scene.MemoryScene()
+        self.parent_control, self.controls, self.geometry = syntheticRig(self.scene, 4)
+        self.geometry_group = self.scene.group('test_geo_grp')
+        self.scene.parent(self.geometry[0], self.geometry_group)
+        self.original = set(self.scene.nodes)
+
+    def testDelete(self):
+        for options in [{}, {'lean': True}, {'activation_distance': 1.0}]:
+            self.setUp()
+            builder.create(self.scene, 'test', self.controls, self.parent_control, self.geometry, **options)
+            self.assertNotEqual([control.parent for control in self.controls], [self.parent_control] * 4)
+            self.assertNotEqual(self.geometry[0].parent, self.geometry_group)
+            builder.delete(self.scene, 'test')
+
+            # everything goes back under its parent, only the muscle object stays on the geometry
+            self.assertEqual([control.parent for control in self.controls], [self.parent_control] * 4)
+            self.assertEqual(self.geometry[0].parent, self.geometry_group)
+            self.assertEqual(set(self.scene.nodes), self.original | set([self.scene.findMuscle(self.geometry[0]).name]))
+            self.assertFalse(self.scene.exists('test_muscles_master_grp'))
+
+    def testRebuild(self):
+        builder.create(self.scene, 'test', self.controls, self.parent_control, self.geometry, lean=True)
+        manifest = builder.getManifest(self.scene, 'test')
+        nodes = set(self.scene.nodes)
+        builder.rebuild(self.scene, 'test')
+
+        # the same controls and geometry are built with the same options
+        rebuilt = builder.getManifest(self.scene, 'test')
+        self.assertEqual([record['uuid'] for record in rebuilt['controls']],
+                         [control.uuid for control in self.controls])
+        self.assertEqual([record['uuid'] for record in rebuilt['geometry']], [self.geometry[0].uuid])
+        self.assertEqual(rebuilt['options'], manifest['options'])
+        self.assertEqual(set(self.scene.nodes), nodes)
+
+    def testRenamed(self):
+        builder.create(self.scene, 'test', self.controls, self.parent_control, self.geometry)
+        for node, name in [(self.controls[0], 'test_renamed_ctl'), (self.geometry[0], 'test_renamed_geo')]:
+            del self.scene.nodes[node.name]
+            node.name = name
+            self.scene.nodes[name] = node
+
+        # nodes are found by UUID, so renamed ones are still torn down and rebuilt
+        builder.rebuild(self.scene, 'test')
+        manifest = builder.getManifest(self.scene, 'test')
+        self.assertEqual(manifest['controls'][0]['control'], 'test_renamed_ctl')
+        self.assertEqual(manifest['geometry'][0]['geometry'], 'test_renamed_geo')
+        builder.delete(self.scene, 'test')
+        self.assertEqual(self.controls[0].parent, self.parent_control)
+        self.assertEqual(self.geometry[0].parent, self.geometry_group)
+
+
+
+def mirroredRig(memory_scene, namespace=''):
+    """
+    Makes three controls on each side of the x mirror plane, an arm mesh on each side and a body mesh on the plane.
+
+    Args:
+        memory_scene (scene.MemoryScene): Scene to make the rig in.
+
+        namespace (string): Namespace of every node, with its colon.
+
+    Returns:
+        (tuple): Handles of the parent control, the left and right controls, and the body, left and right meshes.
+    """
+    parent_control = memory_scene.group(namespace + 'root_ctl')
+    controls = {}
+    for side, sign in [('L', 1.0), ('R', -1.0)]:
+        controls[side] = [memory_scene.group(namespace + side + '_arm' + str(index) + '_ctl', parent_control,
+                                             (sign * (2.5 + 0.5 * index), 0.2, 0.1), (10.0, sign * 20.0, sign * 30.0))
+                          for index in range(3)]
+
+    # the arms' pivots are off the center of their bounds, so the gate spheres are off center too
+    triangles = [(0, 2, 1), (0, 1, 3), (1, 2, 3), (2, 0, 3)]
+    geometry = [memory_scene.createMesh(namespace + 'body_geo', [(-1.0, -1.0, -1.0), (1.0, -1.0, -1.0),
+                                                                 (0.0, 1.0, -1.0), (0.0, 0.0, 1.0)], triangles)]
+    for side, sign in [('L', 1.0), ('R', -1.0)]:
+        points = [(sign * x, y, z) for x, y, z in [(2.5, -1.0, -1.0), (3.5, -1.0, -1.0), (3.0, 1.0, -1.0),
+                                                   (3.0, 0.0, 1.0)]]
+        mesh = memory_scene.createMesh(namespace + side + '_arm_geo', points, [(a, c, b) for a, b, c in triangles]
+                                       if sign < 0 else triangles)
+        mesh.translation = (sign * 2.0, 0.0, 0.0)
+        geometry.append(mesh)
+
+    return parent_control, controls['L'], controls['R'], geometry
+
+
+class MirrorTest(unittest.TestCase):
+
+    def testNames(self):
+        names = [('L_arm_ctl', 'R_arm_ctl'), ('arm_R_ctl', 'arm_L_ctl'), ('arm_ctl_L', 'arm_ctl_R'),
+                 ('ns:L_arm_ctl', 'ns:R_arm_ctl'), ('ns:sub:arm_L_ctl', 'ns:sub:arm_R_ctl'),
+                 ('|rig:L_arm_grp|rig:L_arm_ctl', '|rig:R_arm_grp|rig:R_arm_ctl'), ('body_geo', 'body_geo'),
+                 ('Left_arm_ctl', 'Left_arm_ctl'), ('L:arm_ctl', 'L:arm_ctl')]
+        for name, mirrored in names:
+            self.assertEqual(builder.mirrorName(name), mirrored)
+            self.assertEqual(builder.mirrorName(mirrored), name)
+
+        self.assertEqual(builder.mirrorName('lf_arm_ctl', ('lf', 'rt')), 'rt_arm_ctl')
+
+    def testLayout(self):
+        memory_scene = scene.MemoryScene()
+        parent_control, left, right, geometry = mirroredRig(memory_scene)
+        options = {'activation_distance': 1.0, 'reach': 1.0}
+        layout = builder.measure(memory_scene, left, parent_control, geometry[:2], **options)
+        mirrored = builder.mirrorLayout(memory_scene, layout)
+
+        # reflecting the left side gives what measuring the right side does
+        expected = builder.measure(memory_scene, right, parent_control, [geometry[0], geometry[2]], **options)
+        self.assertEqual(mirrored['controls'], right)
+        self.assertEqual(mirrored['collision_geometry'], [geometry[0], geometry[2]])
+        self.assertEqual(mirrored['control_uuids'], expected['control_uuids'])
+        self.assertEqual(mirrored['reaches'], expected['reaches'])
+        for key in ['transforms', 'directions', 'spheres']:
+            for value, expected_value in zip(flatten(mirrored[key]), flatten(expected[key])):
+                self.assertAlmostEqual(value, expected_value)
+
+    def testCreateMirrored(self):
+        for namespace in ['', 'ns:']:
+            memory_scene = scene.MemoryScene()
+            parent_control, left, right, geometry = mirroredRig(memory_scene, namespace)
+            builder.createMirrored(memory_scene, 'L_arm', left, parent_control, geometry[:2])
+            left_manifest = builder.getManifest(memory_scene, 'L_arm')
+            right_manifest = builder.getManifest(memory_scene, 'R_arm')
+            self.assertEqual([record['uuid'] for record in right_manifest['controls']],
+                             [control.uuid for control in right])
+            self.assertEqual([record['uuid'] for record in right_manifest['geometry']],
+                             [geometry[0].uuid, geometry[2].uuid])
+
+            # the keepOuts of the right side sit at the reflected position of the left side's
+            for left_record, right_record in zip(left_manifest['controls'], right_manifest['controls']):
+                x, y, z = memory_scene.node(left_record['group']).translation
+                self.assertEqual(memory_scene.node(right_record['group']).translation, (-x, y, z))
+
+
+def flatten(values):
+    """
+    Gets every number in the given nested lists and tuples, in order.
+    """
+    if isinstance(values, (list, tuple)):
+        return [number for value in values for number in flatten(value)]
+
+    return [values]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from autocollision import benchmark
+from autocollision import bvh
+from autocollision import cache
+from autocollision import offline
+from autocollision import solver
+
+
+def sphereMesh(center=(0.0, 0.0, 0.0), radius=1.0, triangles=200):
+    return [numpy.array(values) for values in benchmark.sphere(center, radius, triangles)]
+
+
+def controls(count, seed=0):
+    """
+    Gets positions in and around a unit sphere at the origin, pushed away from the origin.
+    """
+    positions = numpy.random.RandomState(seed).uniform(-1.2, 1.2, (count, 3))
+    return positions, solver.directions(positions, (0.0, 0.0, 0.0))
+
+
+class HintsTest(unittest.TestCase):
+
+    def testSameAsUnhinted(self):
+        points, triangles = sphereMesh()
+        positions, directions = controls(64)
+        hints = [numpy.full(len(positions), -1, dtype=numpy.int64)]
+        tree = bvh.BVH(points, triangles)
+
+        # hints carried from frame to frame never change where controls end up
+        for frame in range(4):
+            moved = points + [0.1 * frame, 0.0, 0.0]
+            tree.refit(moved)
+            numpy.testing.assert_allclose(solver.keepOut(positions, directions, [tree], hints=hints),
+                                          solver.keepOut(positions, directions, [(moved, triangles)]))
+
+        self.assertTrue((hints[0] >= 0).any())
+
+
+class EvaluatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.points, self.triangles = sphereMesh()
+        self.positions, self.directions = controls(32)
+
+    def testCacheHit(self):
+        evaluator = offline.Evaluator([self.triangles])
+        first = evaluator.solve(1, self.positions, self.directions, [self.points])
+        second = evaluator.solve(1, self.positions.copy(), self.directions.copy(), [self.points.copy()])
+        self.assertIs(first, second)
+        self.assertEqual((evaluator.solves, evaluator.cache_hits), (1, 1))
+        self.assertFalse(first.flags.writeable)
+
+    def testChangedInputs(self):
+        evaluator = offline.Evaluator([self.triangles])
+        evaluator.solve(1, self.positions, self.directions, [self.points])
+
+        # any input changing on the same frame solves again
+        moved = self.points + [0.3, 0.0, 0.0]
+        pushed = evaluator.solve(1, self.positions, self.directions, [moved])
+        numpy.testing.assert_allclose(pushed, solver.keepOut(self.positions, self.directions, [(moved, self.triangles)]))
+        evaluator.solve(1, self.positions * 0.5, self.directions, [moved])
+        evaluator.solve(2, self.positions * 0.5, self.directions, [moved])
+        self.assertEqual((evaluator.solves, evaluator.cache_hits), (4, 0))
+
+    def testLeastRecentlyUsed(self):
+        evaluator = offline.Evaluator([self.triangles], cache_size=2)
+        for frame in [1, 2, 1, 3]:
+            evaluator.solve(frame, self.positions, self.directions, [self.points])
+
+        # frame 2 was the least recently used when frame 3 came in
+        evaluator.solve(1, self.positions, self.directions, [self.points])
+        evaluator.solve(2, self.positions, self.directions, [self.points])
+        self.assertEqual((evaluator.solves, evaluator.cache_hits), (4, 2))
+
+    def testNoCache(self):
+        evaluator = offline.Evaluator([self.triangles], cache_size=0)
+        evaluator.solve(1, self.positions, self.directions, [self.points])
+        evaluator.solve(1, self.positions, self.directions, [self.points])
+        self.assertEqual((evaluator.solves, evaluator.cache_hits), (2, 0))
+
+    def testControlCountChange(self):
+        evaluator = offline.Evaluator([self.triangles])
+        evaluator.solve(1, self.positions, self.directions, [self.points])
+        pushed = evaluator.solve(2, self.positions[:5], self.directions[:5], [self.points])
+        numpy.testing.assert_allclose(pushed, solver.keepOut(self.positions[:5], self.directions[:5],
+                                                             [(self.points, self.triangles)]))
+
+
+
+class BakeTest(unittest.TestCase):
+    """
+    Bakes a small export of a sphere moving through still controls.
+    """
+    frames = 12
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        points, triangles = sphereMesh()
+        positions, directions = controls(16)
+        self.mesh_points = numpy.array([points + [0.05 * frame, 0.0, 0.0] for frame in range(self.frames)])
+        self.positions = numpy.repeat(positions[None], self.frames, axis=0)
+        self.directions = numpy.repeat(directions[None], self.frames, axis=0)
+        self.weights = numpy.ones((self.frames, len(positions)))
+        self.weights[:, 0] = 0.5
+        parent_inverses = numpy.tile(numpy.identity(4), (self.frames, len(positions), 1, 1))
+        parent_inverses[:, :, 3, :3] = [-0.1, 0.2, 0.0]
+        self.export = os.path.join(self.directory, 'export')
+        offline.writeExport(self.export, 10, ['control' + str(index) for index in range(len(positions))],
+                            self.positions, self.directions, parent_inverses, self.weights,
+                            [(self.mesh_points, triangles)])
+        self.triangles = triangles
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def bake(self, name, **options):
+        path = offline.bake(self.export, os.path.join(self.directory, name + '.npy'), **options)
+        offsets, metadata = cache.load(path)
+        self.assertEqual((metadata['start_frame'], metadata['end_frame']), (10, 10 + self.frames - 1))
+        return numpy.array(offsets)
+
+    def testSolved(self):
+        offsets = self.bake('serial', workers=1)
+        for frame in [0, self.frames - 1]:
+            pushed = solver.keepOut(self.positions[frame], self.directions[frame],
+                                    [(self.mesh_points[frame], self.triangles)])
+            expected = (pushed + [-0.1, 0.2, 0.0]) * self.weights[frame][:, None]
+            numpy.testing.assert_allclose(offsets[frame], expected, rtol=1e-6, atol=1e-6)
+
+    def testWorkersAndChunks(self):
+        # chunks are written at their frame, so the cache is the same however the frames are split
+        serial = self.bake('serial', workers=1)
+        numpy.testing.assert_array_equal(self.bake('pool', workers=2), serial)
+        numpy.testing.assert_array_equal(self.bake('chunks', workers=3, chunk_size=5), serial)
+        numpy.testing.assert_array_equal(self.bake('frames', workers=2, chunk_size=1), serial)
+
+    def testSingleChunk(self):
+        serial = self.bake('serial', workers=1)
+        numpy.testing.assert_array_equal(self.bake('single', workers=4, chunk_size=self.frames), serial)
+
+    def testNoFrames(self):
+        export = os.path.join(self.directory, 'empty')
+        offline.writeExport(export, 10, ['control'], numpy.zeros((0, 1, 3)), numpy.zeros((0, 1, 3)),
+                            numpy.zeros((0, 1, 4, 4)), numpy.zeros((0, 1)),
+                            [(numpy.zeros((0, 4, 3)), numpy.array([(0, 1, 2)]))])
+        path = offline.bake(export, os.path.join(self.directory, 'empty.npy'), workers=4)
+        self.assertEqual(cache.load(path)[0].shape, (0, 1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
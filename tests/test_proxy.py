@@ -0,0 +1,53 @@
+import unittest
+import numpy
+from autocollision import benchmark
+from autocollision import nearest
+from autocollision import proxy
+
+
+def bruteDistances(positions, points, triangles):
+    """
+    Gets the distance from each position to a mesh by testing every triangle.
+    """
+    corners = numpy.asarray(points)[numpy.asarray(triangles)]
+    distances = []
+    for position in numpy.asarray(positions):
+        repeated = numpy.repeat(position[None], len(corners), axis=0)
+        closest = nearest.closestPoints(repeated, corners[:, 0], corners[:, 1], corners[:, 2])
+        distances.append(numpy.linalg.norm(closest - position, axis=1).min())
+
+    return numpy.array(distances)
+
+
+class ExactDistancesTest(unittest.TestCase):
+
+    def testLongTriangle(self):
+        # the closest vertex belongs to the small triangle, the closest point is on the long one
+        points = numpy.array([(-10.0, 0.0, 0.0), (10.0, 0.0, 0.0), (0.0, -0.1, 0.0),
+                              (0.0, 1.05, 0.0), (1.0, 2.0, 0.0), (-1.0, 2.0, 0.0)])
+        triangles = numpy.array([(0, 2, 1), (3, 4, 5)])
+        self.assertAlmostEqual(nearest.exactDistances([(0.0, 0.5, 0.0)], points, triangles)[0], 0.5)
+
+    def testBruteForce(self):
+        points, triangles = benchmark.sphere((0.0, 0.0, 0.0), 1.0, 200)
+        positions = numpy.random.RandomState(0).normal(size=(64, 3)) * 1.5
+        numpy.testing.assert_allclose(nearest.exactDistances(positions, points, triangles, chunk_size=1000),
+                                      bruteDistances(positions, points, triangles))
+
+
+class DeviationTest(unittest.TestCase):
+
+    def testNeverOptimistic(self):
+        points, triangles = [numpy.array(values) for values in benchmark.sphere((0.0, 0.0, 0.0), 1.0, 400)]
+        proxy_points, proxy_triangles = proxy.cluster(points, triangles, 0.5)
+
+        # no vertex or triangle center of either mesh is further from the other than the deviation
+        corners = numpy.asarray(proxy_points)[numpy.asarray(proxy_triangles)]
+        samples = numpy.concatenate([proxy_points, corners.mean(axis=1)])
+        deviation = proxy.deviation(points, triangles, proxy_points, proxy_triangles)
+        self.assertGreaterEqual(deviation + 1e-9, bruteDistances(samples, points, triangles).max())
+        self.assertGreaterEqual(deviation + 1e-9, bruteDistances(points, proxy_points, proxy_triangles).max())
+
+
+if __name__ == '__main__':
+    unittest.main()
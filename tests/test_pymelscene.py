@@ -0,0 +1,100 @@
+import sys
+import types
+import unittest
+from autocollision import builder
+
+
+class PyNode(object):
+    """
+    Stands in for a PyMel node, keeping its string attributes in a dictionary. Nodes are found again by name.
+    """
+    nodes = {}
+
+    def __new__(cls, name):
+        if name not in cls.nodes:
+            node = object.__new__(cls)
+            node.node_name = name
+            node.attributes = {}
+            cls.nodes[name] = node
+
+        return cls.nodes[name]
+
+    def name(self):
+        return self.node_name
+
+    def hasAttr(self, attribute):
+        return attribute in self.attributes
+
+    def attr(self, attribute):
+        node = self
+
+        class Attribute(object):
+            def set(self, value):
+                node.attributes[attribute] = value
+
+            def get(self):
+                return node.attributes[attribute]
+
+        return Attribute()
+
+
+def addAttr(node, ln, dt):
+    node.attributes[ln] = None
+
+
+def stubModules():
+    """
+    Gets modules standing in for Maya and PyMel, so PymelScene can be imported without Maya. Only the commands the
+    manifest calls go through are stubbed.
+
+    Returns:
+        (dictionary): Stub modules by name.
+    """
+    modules = dict([(name, types.ModuleType(name)) for name in
+                    ['maya', 'maya.api', 'maya.api.OpenMaya', 'maya.cmds', 'maya.mel', 'pymel', 'pymel.core']])
+    modules['pymel.core'].PyNode = PyNode
+    modules['pymel.core'].addAttr = addAttr
+    modules['pymel.core'].objExists = lambda name: name in PyNode.nodes
+    return modules
+
+
+class ManifestTest(unittest.TestCase):
+    """
+    Writes and reads a manifest through PymelScene with Maya and PyMel stubbed.
+    """
+    def setUp(self):
+        self.previous = dict([(name, sys.modules.get(name)) for name in stubModules()])
+        sys.modules.update(stubModules())
+        PyNode.nodes.clear()
+
+        from autocollision import pymelscene
+        self.pymelscene = pymelscene
+
+    def tearDown(self):
+        for name, module in self.previous.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+        # the next import should see whatever Maya modules are really there
+        sys.modules.pop('autocollision.pymelscene', None)
+        sys.modules.pop('autocollision.mayascene', None)
+
+    def testRoundTrip(self):
+        pymel_scene = self.pymelscene.PymelScene()
+        muscles_group = pymel_scene.node('test_muscles_master_grp')
+        manifest = {'controls': [{'control': PyNode('test_ctl'), 'gate': None}], 'options': {'lean': True}}
+        pymel_scene.setData(muscles_group, builder.manifest_attribute, manifest)
+
+        # nodes are stored by name
+        self.assertEqual(builder.getManifest(pymel_scene, 'test'),
+                         {'controls': [{'control': 'test_ctl', 'gate': None}], 'options': {'lean': True}})
+
+    def testMissingData(self):
+        pymel_scene = self.pymelscene.PymelScene()
+        self.assertIsNone(pymel_scene.getData(pymel_scene.node('test_muscles_master_grp'), builder.manifest_attribute))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from autocollision import benchmark
+from autocollision import sdf
+from autocollision import solver
+
+
+def rotation(angle):
+    """
+    Gets the matrix rotating row vectors around the z axis by the given angle in radians.
+    """
+    cosine, sine = numpy.cos(angle), numpy.sin(angle)
+    return numpy.array([(cosine, -sine, 0.0), (sine, cosine, 0.0), (0.0, 0.0, 1.0)])
+
+
+class KeepOutTest(unittest.TestCase):
+    """
+    Checks sdf.keepOut lands within a fraction of a cell of solver.keepOut.
+    """
+    cell_size = 0.1
+
+    @classmethod
+    def setUpClass(cls):
+        cls.points, cls.triangles = [numpy.array(values) for values in benchmark.sphere((0.0, 0.0, 0.0), 1.0, 400)]
+        cls.field = sdf.build(cls.points, cls.triangles, cls.cell_size)
+        cls.positions = numpy.random.RandomState(0).uniform(-1.2, 1.2, (128, 3))
+        cls.directions = solver.directions(cls.positions, (0.0, 0.0, 0.0))
+
+    def testRest(self):
+        numpy.testing.assert_allclose(sdf.keepOut(self.positions, self.directions, [self.field]),
+                                      solver.keepOut(self.positions, self.directions, [(self.points, self.triangles)]),
+                                      atol=self.cell_size * 0.5)
+
+    def testRigidMove(self):
+        # the directions no longer point away from the sphere's center, so pushes cross the surface at an angle
+        moved = numpy.dot(self.points, rotation(0.7).T) + [0.3, -0.2, 0.1]
+        transform = sdf.rigidTransform(self.points, moved)
+        self.assertLess(transform[3], 1e-9)
+        numpy.testing.assert_allclose(sdf.keepOut(self.positions, self.directions, [self.field], [transform[:3]]),
+                                      solver.keepOut(self.positions, self.directions, [(moved, self.triangles)]),
+                                      atol=self.cell_size * 0.5)
+
+    def testDeformed(self):
+        stretched = self.points * [1.5, 1.0, 1.0]
+        self.assertGreater(sdf.rigidTransform(self.points, stretched)[3], self.cell_size * sdf.rigid_tolerance)
+
+
+class FetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testReused(self):
+        points, triangles = [numpy.array(values) for values in benchmark.sphere((0.0, 0.0, 0.0), 1.0, 48)]
+        path = sdf.fetch(self.directory, points, triangles, 0.2)
+        modified = os.path.getmtime(path)
+        self.assertEqual(sdf.fetch(self.directory, points, triangles, 0.2), path)
+        self.assertEqual(os.path.getmtime(path), modified)
+
+        # a new rest shape or cell size gets its own field
+        self.assertNotEqual(sdf.fetch(self.directory, points * 1.1, triangles, 0.2), path)
+        self.assertNotEqual(sdf.fetch(self.directory, points, triangles, 0.1), path)
+        numpy.testing.assert_array_equal(sdf.load(path).distances, sdf.build(points, triangles, 0.2).distances)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import numpy
+from autocollision import benchmark
+from autocollision import nearest
+from autocollision import solver
+
+
+def sphereMesh(center=(0.0, 0.0, 0.0), radius=1.0, triangles=400):
+    return [numpy.array(values) for values in benchmark.sphere(center, radius, triangles)]
+
+
+class KeepOutTest(unittest.TestCase):
+
+    def testPushesOntoSurface(self):
+        points, triangles = sphereMesh()
+        positions = numpy.array([(0.2, 0.1, 0.0), (0.0, 0.0, 0.5), (-0.3, 0.4, -0.2)])
+        directions = solver.directions(positions, (0.0, 0.0, 0.0))
+        pushed = solver.keepOut(positions, directions, [(points, triangles)])
+
+        # pushed along the direction until it sits on the surface
+        numpy.testing.assert_allclose(nearest.exactDistances(pushed, points, triangles), 0.0, atol=1e-9)
+        numpy.testing.assert_allclose(numpy.cross(pushed - positions, directions), 0.0, atol=1e-9)
+        self.assertTrue((((pushed - positions) * directions).sum(axis=1) > 0.0).all())
+
+    def testOutsideStays(self):
+        points, triangles = sphereMesh()
+        positions = numpy.array([(2.0, 0.0, 0.0), (0.0, -1.5, 0.5), (0.1, 0.0, 0.0)])
+        directions = numpy.array([(1.0, 0.0, 0.0), (0.0, -1.0, 0.0), (0.0, 0.0, 0.0)])
+
+        # positions outside and positions without a direction are left alone
+        pushed = solver.keepOut(positions, directions, [(points, triangles)])
+        numpy.testing.assert_array_equal(pushed, positions)
+
+    def testOverlappingMeshes(self):
+        meshes = [sphereMesh(), sphereMesh((1.5, 0.0, 0.0))]
+        positions = numpy.array([(0.5, 0.0, 0.0)])
+        directions = numpy.array([(1.0, 0.0, 0.0)])
+
+        # getting out of the first sphere lands inside the second, which pushes it out again
+        pushed = solver.keepOut(positions, directions, meshes)
+        self.assertGreater(pushed[0, 0], 2.4)
+        numpy.testing.assert_array_equal(solver.keepOut(pushed, directions, meshes), pushed)
+
+    def testChunkSize(self):
+        points, triangles = sphereMesh()
+        positions = numpy.random.RandomState(0).uniform(-1.0, 1.0, (32, 3))
+        directions = solver.directions(positions, (0.0, 0.0, 0.0))
+        numpy.testing.assert_allclose(solver.keepOut(positions, directions, [(points, triangles)], chunk_size=7),
+                                      solver.keepOut(positions, directions, [(points, triangles)]))
+
+
+if __name__ == '__main__':
+    unittest.main()